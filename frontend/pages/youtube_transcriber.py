@@ -7,6 +7,11 @@ import os
 # Get API URLs from environment variables or use defaults
 ML_SERVICE_URL = os.environ.get("ML_SERVICE_URL", "http://ml-service:5000")
 OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "codexcontinue")
+# How long to wait for a preview's refined transcript, in seconds
+REFINEMENT_POLL_TIMEOUT = int(os.environ.get("REFINEMENT_POLL_TIMEOUT", 1800))
+# How long to wait for a long video that the service queued as a background job, in seconds
+QUEUED_JOB_POLL_TIMEOUT = int(os.environ.get("QUEUED_JOB_POLL_TIMEOUT", 3600))
+JOB_POLL_INTERVAL = 3
 
 st.set_page_config(
     page_title="YouTube Transcriber - CodexContinue",
@@ -21,6 +26,71 @@ This tool allows you to transcribe YouTube videos to text and optionally summari
 Simply paste a YouTube URL below and click 'Transcribe'.
 """)
 
+
+
+def show_transcript(transcript_text, segments, version):
+    """Render a transcript with its metadata, download button and segments."""
+    if version == "preview":
+        st.caption("Preview transcript from a fast model")
+    
+    # Show transcript metadata
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Total Segments", len(segments))
+    with col2:
+        total_duration = segments[-1]["end"] if segments else 0
+        st.metric("Duration", f"{total_duration:.2f} seconds")
+    
+    # Display the full transcript
+    st.text_area("Full Transcript", transcript_text, height=400, key=f"transcript_{version}")
+    
+    # Download button for transcript
+    st.download_button(
+        label="Download Transcript",
+        data=transcript_text,
+        file_name="transcript.txt",
+        mime="text/plain",
+        key=f"download_{version}"
+    )
+    
+    # Optional: Display segment details in an expander
+    with st.expander("View Transcript Segments"):
+        for i, segment in enumerate(segments):
+            text = "_[skipped: repeating output]_" if segment.get("gap") else segment['text']
+            st.markdown(f"**{i+1}. [{segment['start']:.2f}s - {segment['end']:.2f}s]:** {text}")
+
+
+def wait_for_job(status_url, timeout):
+    """Poll a refinement or background job until it finishes or timeout seconds pass."""
+    deadline = time.time() + timeout
+    job = None
+    while time.time() < deadline:
+        try:
+            response = requests.get(f"{ML_SERVICE_URL}{status_url}", timeout=10)
+            if response.status_code == 200:
+                job = response.json()
+                if job["status"] in ("done", "failed"):
+                    return job
+        except requests.RequestException:
+            pass
+        time.sleep(JOB_POLL_INTERVAL)
+    return job
+
+
+def fetch_stored_transcript(video_id):
+    """Return the text and segments the service stored for a video."""
+    segments, cursor = [], None
+    while True:
+        params = {"limit": 1000, **({"cursor": cursor} if cursor else {})}
+        response = requests.get(f"{ML_SERVICE_URL}/transcripts/{video_id}", params=params, timeout=30)
+        response.raise_for_status()
+        page = response.json()
+        segments.extend(page["segments"])
+        cursor = page.get("next_cursor")
+        if not cursor:
+            return "".join(segment["text"] for segment in segments).strip(), segments
+
+
 # Input form
 with st.form("youtube_form"):
     youtube_url = st.text_input("YouTube URL", placeholder="https://www.youtube.com/watch?v=...")
@@ -36,6 +106,10 @@ with st.form("youtube_form"):
                                    index=1,
                                    help="Larger models are more accurate but take longer to process")
     
+    preview = st.checkbox("Quick preview",
+                          help="Show a fast draft transcript right away, then replace it with the "
+                               "selected model's transcript when that is ready")
+    
     col1, col2 = st.columns(2)
     with col1:
         transcribe_button = st.form_submit_button("🔊 Transcribe")
@@ -57,7 +131,9 @@ if transcribe_button or transcribe_and_summarize:
                     json={
                         "url": youtube_url, 
                         "language": language,
-                        "generate_summary": transcribe_and_summarize
+                        "whisper_model_size": whisper_model,
+                        "generate_summary": transcribe_and_summarize,
+                        "preview": preview
                     }
                 )
                 
@@ -65,8 +141,14 @@ if transcribe_button or transcribe_and_summarize:
                     result = response.json()
                     transcript_text = result["text"]
                     
+                    refinement = result.get("refinement")
+                    
                     # Display success notification
-                    st.success("Transcription completed successfully!")
+                    if refinement:
+                        st.success("Preview ready. The transcript will be updated when the "
+                                   f"{refinement['whisper_model']} model finishes.")
+                    else:
+                        st.success("Transcription completed successfully!")
                     
                     # Display video in the video tab
                     with tab1:
@@ -78,30 +160,10 @@ if transcribe_button or transcribe_and_summarize:
                     with tab2:
                         st.subheader("Transcript")
                         
-                        # Show transcript metadata
-                        segments = result.get("segments", [])
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            st.metric("Total Segments", len(segments))
-                        with col2:
-                            total_duration = segments[-1]["end"] if segments else 0
-                            st.metric("Duration", f"{total_duration:.2f} seconds")
-                        
-                        # Display the full transcript
-                        st.text_area("Full Transcript", transcript_text, height=400)
-                        
-                        # Download button for transcript
-                        st.download_button(
-                            label="Download Transcript",
-                            data=transcript_text,
-                            file_name="transcript.txt",
-                            mime="text/plain"
-                        )
-                        
-                        # Optional: Display segment details in an expander
-                        with st.expander("View Transcript Segments"):
-                            for i, segment in enumerate(segments):
-                                st.markdown(f"**{i+1}. [{segment['start']:.2f}s - {segment['end']:.2f}s]:** {segment['text']}")
+                        transcript_placeholder = st.empty()
+                        with transcript_placeholder.container():
+                            show_transcript(transcript_text, result.get("segments", []),
+                                            "preview" if refinement else "final")
                     
                     # Handle summary in the summary tab
                     with tab3:
@@ -129,6 +191,55 @@ if transcribe_button or transcribe_and_summarize:
                                 )
                         else:
                             st.info("No summary was requested. Use the 'Transcribe & Summarize' button to generate a summary.")
+                    
+                    # Wait for the refined transcript and swap it in for the preview
+                    if refinement:
+                        with st.spinner(f"Refining the transcript with the {refinement['whisper_model']} model..."):
+                            job = wait_for_job(refinement["status_url"], REFINEMENT_POLL_TIMEOUT)
+                        if job and job["status"] == "done":
+                            with transcript_placeholder.container():
+                                show_transcript(job["result"]["text"], job["result"]["segments"], "refined")
+                            st.success("The transcript has been refined.")
+                        elif job and job["status"] == "failed":
+                            st.warning(f"Refinement failed, the preview is shown: {job.get('error')}")
+                        else:
+                            st.info(f"Refinement is still running. Check {ML_SERVICE_URL}{refinement['status_url']} later.")
+                elif response.status_code == 202:
+                    # Long videos are transcribed as a background job instead of in this request
+                    queued = response.json()
+                    admission = queued.get("admission") or {}
+                    eta = admission.get("eta_seconds")
+                    st.info(f"This video was queued as a background job: {admission.get('reason')}."
+                            + (f" Estimated transcription time: {eta / 60:.0f} minutes." if eta else ""))
+                    
+                    with st.spinner("Waiting for the background job to finish..."):
+                        job = wait_for_job(queued["status_url"], QUEUED_JOB_POLL_TIMEOUT)
+                    item = job["items"][0] if job and job.get("items") else {}
+                    
+                    if item.get("status") == "done":
+                        transcript_text, segments = fetch_stored_transcript(item["video_id"])
+                        with tab1:
+                            st.subheader("Video")
+                            st.video(item["url"])
+                        with tab2:
+                            st.subheader("Transcript")
+                            show_transcript(transcript_text, segments, "final")
+                        with tab3:
+                            st.subheader("Summary")
+                            summary_data = (item.get("details") or {}).get("summary")
+                            if summary_data:
+                                st.markdown(summary_data.get("summary", ""))
+                            else:
+                                st.info("No summary was requested. Use the 'Transcribe & Summarize' button to generate a summary.")
+                        st.success("Transcription completed successfully!")
+                    elif job and job["status"] in ("done", "failed"):
+                        st.error(f"The background job failed: {item.get('error') or job.get('error')}")
+                    else:
+                        st.info(f"The background job is still running. Check {ML_SERVICE_URL}{queued['status_url']} later.")
+                elif response.status_code == 422:
+                    rejected = response.json()
+                    reason = (rejected.get("admission") or {}).get("reason") or rejected.get("error")
+                    st.error(f"This video cannot be transcribed: {reason}")
                 else:
                     if response.status_code == 500 and "model not found" in response.text.lower():
                         st.error("Error: Ollama model not found. The summarization feature requires Ollama to be running with a compatible model.")
@@ -33,18 +33,62 @@ def health():
         "environment": env_vars
     })
 
+@app.route('/ready')
+def ready():
+    """Readiness check: succeeds once the start-up warm-up has loaded every listed model."""
+    from ml.services.warmup import get_warmup
+    
+    status = get_warmup().status()
+    return jsonify(status), 200 if status["ready"] else 503
+
+@app.route('/metrics')
+def metrics():
+    """Expose pipeline metrics in the Prometheus text format."""
+    from ml.services.metrics import render_metrics
+    
+    body, status, content_type = render_metrics()
+    return body, status, {"Content-Type": content_type}
+
 @app.route('/youtube/transcribe', methods=["POST"])
 def transcribe_youtube():
     """Transcribe a YouTube video."""
     data = request.get_json(silent=True) or {}
     url = data.get("url")
     language = data.get("language")
-    whisper_model_size = data.get("whisper_model_size", "base")
+    whisper_model_size = data.get("whisper_model_size")
     generate_summary = data.get("generate_summary", False)
+    ingest_to_rag = data.get("ingest_to_rag", False)
+    use_captions = data.get("use_captions", os.environ.get("TRANSCRIBE_USE_CAPTIONS", "false").lower() == "true")
+    allow_auto_captions = data.get("allow_auto_captions", False)
+    pipelined = data.get("pipelined")
+    preset = data.get("preset")
+    decode_options = data.get("decode_options")
+    rerun_model = data.get("rerun_model")
+    preview = data.get("preview", False)
+    callback_url = data.get("callback_url")
     
     if not url:
         return jsonify({"error": "No URL provided"}), 400
     
+    # Reject unknown presets and invalid decode options before any work is done
+    from ml.services.decode_presets import resolve_decode_options
+    
+    if decode_options is not None and not isinstance(decode_options, dict):
+        return jsonify({"error": "decode_options must be an object"}), 400
+    try:
+        resolve_decode_options(preset, decode_options)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # The refined transcript is POSTed from inside the network, so only allowed hosts may receive it
+    if preview and callback_url:
+        from ml.services.preview_refinement import check_callback_url
+        
+        try:
+            check_callback_url(callback_url)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    
     # Validate URL format (simple check)
     if not url.startswith("http"):
         return jsonify({"error": "Invalid URL format. URL must start with http:// or https://"}), 400
@@ -56,6 +100,67 @@ def transcribe_youtube():
         # Import YouTubeTranscriber - it will handle ffmpeg path detection and setup
         from ml.services.youtube_transcriber import YouTubeTranscriber
         
+        # Probe the video's metadata before committing a worker to it
+        video_info, admission = None, None
+        if os.environ.get("TRANSCRIBE_ADMISSION_ENABLED", "true").lower() == "true":
+            from ml.services.admission import get_admission_controller, REJECT, QUEUE
+            
+            try:
+                video_info = YouTubeTranscriber.extract_info(url)
+            except Exception as e:
+                logger.warning(f"Metadata probe failed, admitting without it: {str(e)}")
+            
+            if video_info is not None:
+                admission = get_admission_controller().decide(
+                    YouTubeTranscriber.probe(url, video_info),
+                    requested_model=whisper_model_size,
+                    use_captions=use_captions,
+                    allow_auto_captions=allow_auto_captions,
+                    language=language,
+                    info=video_info
+                )
+                whisper_model_size = admission["whisper_model"]
+                
+                if admission["action"] == REJECT:
+                    return jsonify({"error": f"Video rejected: {admission['reason']}", "admission": admission}), 422
+                
+                if admission["action"] == QUEUE:
+                    from ml.services.batch_transcriber import get_batch_transcriber
+                    
+                    # Background jobs report through their status URL; they make no callbacks
+                    if preview and callback_url:
+                        return jsonify({
+                            "error": f"Video queued for background transcription ({admission['reason']}), "
+                                     "which cannot make a refinement callback; poll the job instead",
+                            "admission": admission
+                        }), 422
+                    
+                    # The job applies the request's options; only this video is queued, even if
+                    # the URL also names a playlist
+                    job = get_batch_transcriber().submit(
+                        url,
+                        whisper_model_size=whisper_model_size,
+                        language=language,
+                        options={
+                            "use_captions": use_captions,
+                            "allow_auto_captions": allow_auto_captions,
+                            "preset": preset,
+                            "decode_options": decode_options,
+                            "rerun_model": rerun_model,
+                            "generate_summary": generate_summary,
+                            "ingest_to_rag": ingest_to_rag
+                        },
+                        single_video=True
+                    )
+                    return jsonify({
+                        "job": job,
+                        "admission": admission,
+                        "status_url": f"/youtube/batch/{job['job_id']}"
+                    }), 202
+        
+        if not whisper_model_size or whisper_model_size == "auto":
+            whisper_model_size = "base"
+        
         # Instead of managing ffmpeg here, create the transcriber first
         # which will handle path detection internally
         transcriber = YouTubeTranscriber(whisper_model_size=whisper_model_size)
@@ -70,7 +175,20 @@ def transcribe_youtube():
         logger.info(f"Environment PATH: {os.environ.get('PATH')}")
         logger.info(f"Transcriber initialized with ffmpeg_location: {transcriber.ffmpeg_location}")
         
-        result = transcriber.process_video(url, language, generate_summary=generate_summary)
+        result = transcriber.process_video(
+            url,
+            language,
+            generate_summary=generate_summary,
+            use_captions=use_captions,
+            allow_auto_captions=allow_auto_captions,
+            video_info=video_info,
+            pipelined=pipelined,
+            preset=preset,
+            decode_options=decode_options,
+            rerun_model=rerun_model,
+            preview=preview,
+            callback_url=callback_url
+        )
         
         if not result.get("text"):
             return jsonify({"error": "Transcription failed: No text was generated"}), 500
@@ -78,18 +196,44 @@ def transcribe_youtube():
         response_data = {
             "text": result["text"],
             "segments": result["segments"],
-            "source_url": result["source_url"]
+            "source_url": result["source_url"],
+            "video_id": result.get("video_id"),
+            "transcript_source": result.get("transcript_source")
         }
         
+        # A preview is replaced by the requested model's transcript when its refinement finishes
+        if result.get("refinement"):
+            job_id = result["refinement"]["job_id"]
+            response_data["refinement"] = {
+                "job_id": job_id,
+                "status": result["refinement"]["status"],
+                "whisper_model": result["refinement"]["whisper_model"],
+                "status_url": f"/youtube/refinement/{job_id}"
+            }
+        
+        # Index the transcript for retrieval if requested
+        if ingest_to_rag:
+            from ml.services.rag_ingest import ingest_transcript_to_rag
+            
+            response_data["rag_ingest"] = ingest_transcript_to_rag(result)
+        
         # Include summary if it was generated
         if generate_summary and "summary" in result:
             response_data["summary"] = result["summary"]
         
         # Include metadata about the process
         response_data["metadata"] = {
-            "whisper_model": whisper_model_size,
+            "whisper_model": result.get("whisper_model"),
+            "transcript_source": result.get("transcript_source"),
             "ffmpeg_location": ffmpeg_location,
             "language": language,
+            "detected_language": result.get("language"),
+            "processing_time": result.get("processing_time"),
+            "download": result.get("download"),
+            "decode": result.get("decode"),
+            "rerun": result.get("rerun"),
+            "guard": result.get("guard"),
+            "admission": admission,
             "timestamp": result.get("timestamp", "")
         }
         
@@ -106,6 +250,168 @@ def transcribe_youtube():
         logger.error(traceback.format_exc())
         return jsonify({"error": str(e)}), 500
 
+@app.route('/youtube/probe', methods=["POST"])
+def probe_youtube():
+    """Report a video's duration, formats and captions, and how it would be admitted."""
+    data = request.get_json(silent=True) or {}
+    url = data.get("url")
+    
+    if not url:
+        return jsonify({"error": "No URL provided"}), 400
+    if not url.startswith("http") or ("youtube.com" not in url and "youtu.be" not in url):
+        return jsonify({"error": "URL doesn't appear to be a YouTube link"}), 400
+    
+    try:
+        from ml.services.youtube_transcriber import YouTubeTranscriber
+        from ml.services.admission import get_admission_controller
+        
+        info = YouTubeTranscriber.extract_info(url)
+        probe = YouTubeTranscriber.probe(url, info)
+        probe["admission"] = get_admission_controller().decide(
+            probe,
+            requested_model=data.get("whisper_model_size"),
+            use_captions=data.get("use_captions", False),
+            allow_auto_captions=data.get("allow_auto_captions", False),
+            language=data.get("language"),
+            info=info
+        )
+        return jsonify(probe)
+    except Exception as e:
+        logger.error(f"Error probing YouTube video: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/youtube/batch', methods=["POST"])
+def create_batch():
+    """Transcribe every video of a YouTube playlist or channel in the background."""
+    data = request.get_json(silent=True) or {}
+    url = data.get("url")
+    
+    if not url:
+        return jsonify({"error": "No URL provided"}), 400
+    if not url.startswith("http") or ("youtube.com" not in url and "youtu.be" not in url):
+        return jsonify({"error": "URL doesn't appear to be a YouTube link"}), 400
+    
+    try:
+        from ml.services.batch_transcriber import get_batch_transcriber, JOB_OPTIONS
+        
+        job = get_batch_transcriber().submit(
+            url,
+            whisper_model_size=data.get("whisper_model_size", "base"),
+            language=data.get("language"),
+            download_concurrency=int(data.get("download_concurrency", 3)),
+            transcribe_workers=int(data.get("transcribe_workers", 1)),
+            options={name: data.get(name) for name in JOB_OPTIONS}
+        )
+        return jsonify(job), 202
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error creating batch job: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/youtube/batch/<job_id>', methods=["GET"])
+def get_batch(job_id):
+    """Report a batch job's progress with a page of its items."""
+    from ml.services.batch_transcriber import get_batch_transcriber
+    
+    store = get_batch_transcriber().store
+    job = store.get_job(job_id)
+    if job is None:
+        return jsonify({"error": f"No batch job {job_id}"}), 404
+    
+    limit = min(int(request.args.get("limit", 100)), 1000)
+    cursor = request.args.get("cursor")
+    statuses = request.args.get("status")
+    items = store.get_items(
+        job_id,
+        after=int(cursor) if cursor else -1,
+        limit=limit,
+        statuses=statuses.split(",") if statuses else None
+    )
+    job["items"] = items
+    job["next_cursor"] = items[-1]["position"] if len(items) == limit else None
+    return jsonify(job)
+
+@app.route('/youtube/batch/<job_id>/resume', methods=["POST"])
+def resume_batch(job_id):
+    """Resume a batch job, optionally retrying failed items."""
+    from ml.services.batch_transcriber import get_batch_transcriber
+    
+    data = request.get_json(silent=True) or {}
+    job = get_batch_transcriber().resume(job_id, retry_failed=bool(data.get("retry_failed", False)))
+    if job is None:
+        return jsonify({"error": f"No batch job {job_id}"}), 404
+    return jsonify(job), 202
+
+@app.route('/youtube/refinement/<job_id>', methods=["GET"])
+def get_refinement(job_id):
+    """Report a preview's refinement, with the refined transcript once it is done."""
+    from ml.services.preview_refinement import get_preview_refiner
+    
+    job = get_preview_refiner().store.get_job(job_id)
+    if job is None:
+        return jsonify({"error": f"No refinement job {job_id}"}), 404
+    return jsonify(job)
+
+@app.route('/youtube/cache/stats', methods=["GET"])
+def audio_cache_stats():
+    """Report occupancy and hit ratio of the downloaded audio cache."""
+    from ml.services.audio_cache import get_audio_cache
+    
+    return jsonify(get_audio_cache().stats())
+
+@app.route('/transcripts', methods=["GET"])
+def list_transcripts():
+    """List stored transcripts, one page at a time."""
+    from ml.services.transcript_store import get_transcript_store
+    
+    limit = min(int(request.args.get("limit", 50)), 500)
+    return jsonify(get_transcript_store().list_videos(limit=limit, after=request.args.get("cursor")))
+
+@app.route('/transcripts/search', methods=["GET"])
+def search_transcripts():
+    """Search stored transcript segments for a phrase."""
+    from ml.services.transcript_store import get_transcript_store
+    
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "No query provided"}), 400
+    
+    limit = min(int(request.args.get("limit", 20)), 200)
+    cursor = request.args.get("cursor")
+    phrase = request.args.get("mode", "phrase") != "query"
+    
+    try:
+        return jsonify(get_transcript_store().search(
+            query,
+            limit=limit,
+            after=int(cursor) if cursor else None,
+            video_id=request.args.get("video_id"),
+            phrase=phrase
+        ))
+    except Exception as e:
+        # Malformed FTS5 expressions in "query" mode raise sqlite errors
+        logger.error(f"Error searching transcripts: {str(e)}")
+        return jsonify({"error": f"Invalid search: {str(e)}"}), 400
+
+@app.route('/transcripts/<video_id>', methods=["GET"])
+def get_transcript_segments(video_id):
+    """Return a page of a stored transcript's segments."""
+    from ml.services.transcript_store import get_transcript_store
+    
+    store = get_transcript_store()
+    video = store.get_video(video_id)
+    if video is None:
+        return jsonify({"error": f"No transcript stored for {video_id}"}), 404
+    
+    limit = min(int(request.args.get("limit", 200)), 1000)
+    try:
+        page = store.get_segments(video_id, after=request.args.get("cursor"), limit=limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    page["video"] = video
+    return jsonify(page)
+
 if __name__ == '__main__':
     # Log some debug information
     logger.info("Starting ML service...")
@@ -139,4 +445,20 @@ if __name__ == '__main__':
     logger.info(f"Temp directory: {temp_dir}")
     logger.info(f"Starting server on port: {args.port}")
     
+    # Resume batch jobs interrupted by a crash or restart, and preload the Whisper
+    # models (only in the serving process, not in the debug reloader's parent)
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        from ml.services.warmup import get_warmup
+        get_warmup().start()
+        
+        from ml.services.batch_transcriber import get_batch_transcriber
+        resumed = get_batch_transcriber().resume_incomplete()
+        if resumed:
+            logger.info(f"Resumed {len(resumed)} batch jobs")
+        
+        from ml.services.preview_refinement import get_preview_refiner
+        resumed = get_preview_refiner().resume_incomplete()
+        if resumed:
+            logger.info(f"Resumed {len(resumed)} refinements")
+    
     app.run(host='0.0.0.0', port=args.port, debug=True)
@@ -0,0 +1,398 @@
+import re
+import ast
+import json
+import math
+import logging
+import importlib.util
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Rough word-piece approximation used when no tokenizer is available
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+MARKDOWN_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+MARKDOWN_FENCE = re.compile(r"^\s*(```|~~~)")
+YAML_TOP_LEVEL_KEY = re.compile(r"^([^\s#\-][^:]*):(\s|$)")
+
+
+class TokenCounter:
+    def __init__(self, model_name: Optional[str] = None):
+        """Count tokens with the embedding model's tokenizer.
+
+        Args:
+            model_name (str, optional): Hugging Face model whose tokenizer is used.
+                Falls back to a regex approximation if it cannot be loaded.
+        """
+        self.model_name = model_name
+        self._tokenizer = None
+        self._loaded = False
+
+    def _load_tokenizer(self):
+        """Load the fast tokenizer if not already loaded."""
+        if not self._loaded:
+            self._loaded = True
+            if self.model_name and importlib.util.find_spec("transformers") is not None:
+                try:
+                    from transformers import AutoTokenizer
+                    self._tokenizer = AutoTokenizer.from_pretrained(self.model_name, use_fast=True)
+                except Exception as e:
+                    logger.warning(f"Could not load tokenizer {self.model_name}, approximating token counts: {str(e)}")
+        return self._tokenizer
+
+    def count_many(self, texts: Sequence[str]) -> List[int]:
+        """Count the tokens of several texts in one tokenizer call."""
+        if not texts:
+            return []
+        tokenizer = self._load_tokenizer()
+        if tokenizer is None:
+            return [len(TOKEN_PATTERN.findall(text)) for text in texts]
+        encoded = tokenizer(
+            list(texts),
+            add_special_tokens=False,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+            verbose=False
+        )
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def count(self, text: str) -> int:
+        """Count the tokens of a single text."""
+        return self.count_many([text])[0]
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(model_name: Optional[str] = None) -> TokenCounter:
+    """Return a shared token counter for a model."""
+    return TokenCounter(model_name)
+
+
+class StructuredChunker:
+    def __init__(self, max_tokens: int = 240, overlap_tokens: int = 32,
+                 token_counter: Optional[TokenCounter] = None):
+        """Split documents into token-sized chunks along their structure.
+
+        Python is split into top-level definitions and methods, markdown into
+        heading sections, JSON and YAML into top-level keys. Adjacent small
+        units are merged up to ``max_tokens``; units that are still too large
+        are split on paragraphs, lines and finally words, with overlap.
+
+        Args:
+            max_tokens (int): Maximum tokens per chunk. Keep it below the embedding
+                model's sequence length so chunks are not truncated.
+            overlap_tokens (int): Tokens repeated between pieces of a split unit
+            token_counter (TokenCounter, optional): Token counter to size chunks with
+        """
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.counter = token_counter or get_token_counter()
+        self.strategies = {
+            "py": self._python_units,
+            "md": self._markdown_units,
+            "json": self._json_units,
+            "yaml": self._yaml_units,
+            "yml": self._yaml_units,
+        }
+
+    def chunk(self, content: str, file_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Split a document into chunks.
+
+        Args:
+            content (str): Document text
+            file_type (str, optional): File extension without the dot
+
+        Returns:
+            List[Dict[str, Any]]: Chunks with ``text`` and ``metadata`` (line range,
+                and the symbol, section or key they cover where known)
+        """
+        strategy = self.strategies.get((file_type or "").lower(), self._text_units)
+        units = [unit for unit in strategy(content) if unit[0].strip()]
+        return self._pack(units)
+
+    # Units: (text, metadata) pairs in document order
+
+    @staticmethod
+    def _line_unit(lines: List[str], start: int, end: int, **metadata) -> Tuple[str, Dict[str, Any]]:
+        """Build a unit from lines[start:end] (0-based, end exclusive)."""
+        text = "".join(lines[start:end]).rstrip("\n")
+        return text, {"start_line": start + 1, "end_line": end, **metadata}
+
+    def _text_units(self, content: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """Treat the whole document as one unit; packing splits it on paragraphs."""
+        lines = content.splitlines(keepends=True)
+        return [self._line_unit(lines, 0, len(lines))]
+
+    def _python_units(self, content: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """Split Python into module-level code, functions, classes and methods."""
+        try:
+            tree = ast.parse(content)
+        except (SyntaxError, ValueError):
+            return self._text_units(content)
+
+        lines = content.splitlines(keepends=True)
+        units = []
+        cursor = 0
+
+        def definition_start(node, floor: int) -> int:
+            start = min([node.lineno] + [d.lineno for d in node.decorator_list]) - 1
+            # Keep comments directly above a definition with it
+            while start > floor and lines[start - 1].lstrip().startswith("#"):
+                start -= 1
+            return start
+
+        definitions = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+        for node in tree.body:
+            if not isinstance(node, definitions):
+                continue
+            start = definition_start(node, cursor)
+            if start > cursor:
+                units.append(self._line_unit(lines, cursor, start, symbol="<module>"))
+
+            methods = [child for child in node.body if isinstance(child, definitions)] \
+                if isinstance(node, ast.ClassDef) else []
+            if methods:
+                # Class header and attributes, then each method on its own
+                inner = start
+                for method in methods:
+                    method_start = definition_start(method, inner)
+                    if method_start > inner:
+                        units.append(self._line_unit(lines, inner, method_start, symbol=node.name))
+                    units.append(self._line_unit(lines, method_start, method.end_lineno,
+                                                 symbol=f"{node.name}.{method.name}"))
+                    inner = method.end_lineno
+                if node.end_lineno > inner:
+                    units.append(self._line_unit(lines, inner, node.end_lineno, symbol=node.name))
+            else:
+                units.append(self._line_unit(lines, start, node.end_lineno, symbol=node.name))
+            cursor = node.end_lineno
+
+        if cursor < len(lines):
+            units.append(self._line_unit(lines, cursor, len(lines), symbol="<module>"))
+        return units
+
+    def _markdown_units(self, content: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """Split markdown into sections at headings outside code fences."""
+        lines = content.splitlines(keepends=True)
+        units = []
+        headings: List[str] = []
+        section_start = 0
+        in_fence = False
+
+        for index, line in enumerate(lines):
+            if MARKDOWN_FENCE.match(line):
+                in_fence = not in_fence
+                continue
+            match = None if in_fence else MARKDOWN_HEADING.match(line)
+            if not match:
+                continue
+            if index > section_start:
+                units.append(self._line_unit(lines, section_start, index, section=" > ".join(headings)))
+            level = len(match.group(1))
+            headings = headings[:level - 1] + [match.group(2)]
+            section_start = index
+
+        units.append(self._line_unit(lines, section_start, len(lines), section=" > ".join(headings)))
+        return units
+
+    def _json_units(self, content: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """Split JSON into one unit per key (or list item), one level deep if large."""
+        try:
+            data = json.loads(content)
+        except ValueError:
+            return self._text_units(content)
+
+        def units_for(value: Any, path: str, depth: int) -> List[Tuple[str, Dict[str, Any]]]:
+            if isinstance(value, dict):
+                items = [(f"{path}.{key}" if path else str(key), {key: item}, item) for key, item in value.items()]
+            elif isinstance(value, list):
+                items = [(f"{path}[{i}]", item, item) for i, item in enumerate(value)]
+            else:
+                return [(json.dumps(value, indent=2, ensure_ascii=False), {"key": path})]
+
+            texts = [json.dumps(wrapped, indent=2, ensure_ascii=False) for _, wrapped, _ in items]
+            result = []
+            for (key, _, item), text, count in zip(items, texts, self.counter.count_many(texts)):
+                if count > self.max_tokens and depth < 2 and isinstance(item, (dict, list)) and item:
+                    result.extend(units_for(item, key, depth + 1))
+                else:
+                    result.append((text, {"key": key}))
+            return result
+
+        return units_for(data, "", 0)
+
+    def _yaml_units(self, content: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """Split YAML text at top-level keys, keeping comments and formatting."""
+        lines = content.splitlines(keepends=True)
+        units = []
+        start = 0
+        key = ""
+
+        for index, line in enumerate(lines):
+            match = YAML_TOP_LEVEL_KEY.match(line)
+            if not match and not line.startswith("---"):
+                continue
+            # Comments directly above a key belong to it
+            boundary = index
+            while boundary > start and lines[boundary - 1].lstrip().startswith("#"):
+                boundary -= 1
+            if boundary > start:
+                units.append(self._line_unit(lines, start, boundary, key=key))
+            start = boundary
+            key = match.group(1).strip() if match else ""
+
+        units.append(self._line_unit(lines, start, len(lines), key=key))
+        return units
+
+    # Packing
+
+    def _pack(self, units: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Merge adjacent small units and split oversized ones."""
+        chunks = []
+        current: List[Tuple[str, Dict[str, Any]]] = []
+        current_tokens = 0
+
+        def flush():
+            nonlocal current, current_tokens
+            if current:
+                chunks.append({
+                    "text": "\n\n".join(text for text, _ in current),
+                    "metadata": self._merge_metadata([metadata for _, metadata in current])
+                })
+            current, current_tokens = [], 0
+
+        for (text, metadata), count in zip(units, self.counter.count_many([text for text, _ in units])):
+            if count > self.max_tokens:
+                flush()
+                chunks.extend(self._split_unit(text, metadata))
+                continue
+            if current and current_tokens + count > self.max_tokens:
+                flush()
+            current.append((text, metadata))
+            current_tokens += count
+        flush()
+
+        return chunks
+
+    @staticmethod
+    def _merge_metadata(metadatas: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Combine the metadata of merged units."""
+        merged: Dict[str, Any] = {}
+        if "start_line" in metadatas[0]:
+            merged["start_line"] = metadatas[0]["start_line"]
+            merged["end_line"] = metadatas[-1]["end_line"]
+        for field in ("symbol", "key"):
+            values = list(dict.fromkeys(m[field] for m in metadatas if m.get(field)))
+            if values:
+                merged[field] = ", ".join(values)
+        # Section breadcrumbs are long; the first one locates the chunk
+        sections = [m["section"] for m in metadatas if m.get("section")]
+        if sections:
+            merged["section"] = sections[0]
+        return merged
+
+    def _split_unit(self, text: str, metadata: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Split an oversized unit into overlapping pieces, tracking their line ranges."""
+        pieces = self._split_text(text, ("\n\n", "\n", " "))
+        chunks = []
+        search_from = 0
+        for piece in pieces:
+            piece_metadata = dict(metadata)
+            offset = text.find(piece, search_from)
+            if offset >= 0 and "start_line" in metadata:
+                start_line = metadata["start_line"] + text.count("\n", 0, offset)
+                piece_metadata["start_line"] = start_line
+                piece_metadata["end_line"] = start_line + piece.count("\n")
+                search_from = offset + 1
+            chunks.append({"text": piece, "metadata": piece_metadata})
+        return chunks
+
+    def _split_text(self, text: str, separators: Sequence[str]) -> List[str]:
+        """Recursively split text on the given separators until pieces fit."""
+        for index, separator in enumerate(separators):
+            if separator not in text:
+                continue
+            # Keep blank parts so joined pieces stay exact substrings of the text
+            parts = text.split(separator)
+            pieces, counts = [], []
+            for part, count in zip(parts, self.counter.count_many(parts)):
+                if count > self.max_tokens:
+                    sub_pieces = self._split_text(part, separators[index + 1:])
+                    pieces.extend(sub_pieces)
+                    counts.extend(self.counter.count_many(sub_pieces))
+                else:
+                    pieces.append(part)
+                    counts.append(count)
+            return self._pack_pieces(pieces, counts, separator)
+
+        # No separator left: cut evenly by characters
+        parts = max(1, math.ceil(self.counter.count(text) / self.max_tokens))
+        size = math.ceil(len(text) / parts)
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+    def _pack_pieces(self, pieces: List[str], counts: List[int], separator: str) -> List[str]:
+        """Greedily pack pieces up to max_tokens, repeating a tail of overlap_tokens."""
+        packed = []
+        window: List[Tuple[str, int]] = []
+        window_tokens = 0
+
+        for piece, count in zip(pieces, counts):
+            if window and window_tokens + count > self.max_tokens:
+                packed.append(separator.join(p for p, _ in window))
+                # Carry the tail of the window over as overlap
+                while window and (window_tokens > self.overlap_tokens or window_tokens + count > self.max_tokens):
+                    window_tokens -= window.pop(0)[1]
+            window.append((piece, count))
+            window_tokens += count
+
+        if window:
+            packed.append(separator.join(p for p, _ in window))
+        return [piece for piece in packed if piece.strip()]
+
+
+def window_transcript_segments(segments: List[Dict[str, Any]], window_seconds: float = 60.0,
+                               max_tokens: int = 240,
+                               token_counter: Optional[TokenCounter] = None) -> List[Dict[str, Any]]:
+    """Group timestamped transcript segments into time windows.
+
+    A window is closed once it spans ``window_seconds`` or adding the next
+    segment would exceed ``max_tokens``, so every chunk maps back to a
+    contiguous stretch of the video.
+
+    Args:
+        segments (List[Dict[str, Any]]): Whisper-style segments with ``start``, ``end`` and ``text``
+        window_seconds (float): Target duration of each window
+        max_tokens (int): Maximum tokens per window
+        token_counter (TokenCounter, optional): Token counter to size windows with
+
+    Returns:
+        List[Dict[str, Any]]: Windows with ``text``, ``start`` and ``end`` in seconds
+    """
+    counter = token_counter or get_token_counter()
+    segments = [segment for segment in segments if segment.get("text", "").strip()]
+    counts = counter.count_many([segment["text"].strip() for segment in segments])
+
+    windows = []
+    current: List[Dict[str, Any]] = []
+    current_tokens = 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            windows.append({
+                "text": " ".join(segment["text"].strip() for segment in current),
+                "start": float(current[0]["start"]),
+                "end": float(current[-1]["end"]),
+            })
+        current, current_tokens = [], 0
+
+    for segment, count in zip(segments, counts):
+        if current and (current_tokens + count > max_tokens
+                        or float(segment["end"]) - float(current[0]["start"]) > window_seconds):
+            flush()
+        current.append(segment)
+        current_tokens += count
+    flush()
+
+    return windows
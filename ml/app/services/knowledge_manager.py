@@ -4,12 +4,15 @@ from typing import List, Dict, Any, Optional
 import logging
 from pathlib import Path
 
-from .vector_store import VectorStore
+from .chunking import window_transcript_segments, get_token_counter
+from .vector_store import VectorStore, EMBEDDING_MODEL_NAME
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DEFAULT_FILE_TYPES = ["md", "txt", "py", "js", "html", "css", "json", "yaml", "yml"]
+
 class KnowledgeManager:
     def __init__(self, vector_store: VectorStore):
         """Initialize the knowledge manager with a vector store."""
@@ -20,7 +23,7 @@ class KnowledgeManager:
     def import_directory(self, directory_path: str, file_types: Optional[List[str]] = None) -> Dict[str, Any]:
         """Import all supported files from a directory into the knowledge base."""
         if file_types is None:
-            file_types = ["md", "txt", "py", "js", "html", "css", "json", "yaml", "yml"]
+            file_types = DEFAULT_FILE_TYPES
         
         imported_count = 0
         failed_imports = []
@@ -43,7 +46,11 @@ class KnowledgeManager:
         }
     
     def import_file(self, file_path: str) -> Optional[str]:
-        """Import a single file into the knowledge base."""
+        """Import a single file into the knowledge base.
+        
+        Chunks from a previous import of the same file are replaced, so
+        re-importing a changed file does not leave stale chunks behind.
+        """
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
         
@@ -58,8 +65,75 @@ class KnowledgeManager:
             "filename": os.path.basename(file_path)
         }
         
+        # Replace any chunks from a previous import of this file
+        self.vector_store.delete_source(file_path)
+        
         # Process the document and add to vector store
         chunk_ids = self.vector_store.process_document(content, metadata)
         
         logger.info(f"Imported {file_path} into knowledge base with {len(chunk_ids)} chunks")
         return chunk_ids[0] if chunk_ids else None
+    
+    def remove_file(self, file_path: str) -> None:
+        """Remove a file's chunks from the knowledge base."""
+        self.vector_store.delete_source(file_path)
+        logger.info(f"Removed {file_path} from knowledge base")
+    
+    def import_transcript(self, video_id: str, segments: List[Dict[str, Any]], source_url: str,
+                          title: Optional[str] = None, window_seconds: float = 60.0,
+                          batch_size: int = 64) -> Dict[str, Any]:
+        """Import a timestamped transcript into the knowledge base.
+        
+        Segments are grouped into time windows whose metadata points back to
+        the video and timestamps. Importing the same video again replaces its
+        previous windows, so re-ingestion is idempotent.
+        
+        Args:
+            video_id (str): YouTube video ID
+            segments (List[Dict[str, Any]]): Transcript segments with start, end and text
+            source_url (str): URL of the video
+            title (str, optional): Video title
+            window_seconds (float): Target duration of each chunk
+            batch_size (int): Number of chunks embedded per batch
+            
+        Returns:
+            Dict[str, Any]: Number of chunks and the covered duration
+        """
+        windows = window_transcript_segments(
+            segments,
+            window_seconds=window_seconds,
+            token_counter=get_token_counter(EMBEDDING_MODEL_NAME)
+        )
+        
+        # Replace any chunks from a previous import of this video
+        self.vector_store.delete_where({"video_id": video_id})
+        
+        texts, metadatas, ids = [], [], []
+        for index, window in enumerate(windows):
+            metadata = {
+                "source": source_url,
+                "file_type": "transcript",
+                "video_id": video_id,
+                "start": window["start"],
+                "end": window["end"],
+                "chunk_index": index,
+                "timestamp_url": f"https://www.youtube.com/watch?v={video_id}&t={int(window['start'])}s"
+            }
+            if title:
+                metadata["title"] = title
+            texts.append(window["text"])
+            metadatas.append(metadata)
+            ids.append(f"transcript:{video_id}:{index}")
+        
+        # Embed and store in bounded batches
+        for batch_start in range(0, len(texts), batch_size):
+            batch_end = batch_start + batch_size
+            self.vector_store.add_texts(texts[batch_start:batch_end], metadatas[batch_start:batch_end],
+                                        ids=ids[batch_start:batch_end])
+        
+        logger.info(f"Imported transcript {video_id} into knowledge base with {len(texts)} chunks")
+        return {
+            "video_id": video_id,
+            "chunk_count": len(texts),
+            "duration_seconds": windows[-1]["end"] if windows else 0.0
+        }
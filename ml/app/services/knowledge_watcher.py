@@ -0,0 +1,231 @@
+import os
+import time
+import queue
+import logging
+import threading
+import importlib.util
+from typing import List, Dict, Any, Optional, Tuple
+
+from .knowledge_manager import KnowledgeManager, DEFAULT_FILE_TYPES
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# watchdog uses inotify on Linux; without it the watcher polls the directories
+WATCHDOG_AVAILABLE = importlib.util.find_spec("watchdog") is not None
+if WATCHDOG_AVAILABLE:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+else:
+    logger.warning("watchdog is not installed, knowledge watcher will fall back to polling")
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+
+class KnowledgeWatcher:
+    def __init__(self, knowledge_manager: KnowledgeManager, directories: List[str],
+                 file_types: Optional[List[str]] = None, debounce_seconds: float = 2.0,
+                 poll_interval: float = 5.0, use_polling: bool = False):
+        """Watch directories and keep the knowledge base in sync with them.
+
+        Changes are debounced per file, then fed to a single worker that
+        upserts or deletes only the affected files.
+
+        Args:
+            knowledge_manager (KnowledgeManager): Knowledge manager used for ingestion
+            directories (List[str]): Directories to watch recursively
+            file_types (List[str], optional): File extensions to watch
+            debounce_seconds (float): Quiet period before a changed file is ingested
+            poll_interval (float): Seconds between scans when polling
+            use_polling (bool): Force polling even if inotify is available
+        """
+        self.knowledge_manager = knowledge_manager
+        self.directories = [os.path.abspath(d) for d in directories]
+        self.file_types = {ext.lstrip(".") for ext in (file_types or DEFAULT_FILE_TYPES)}
+        self.debounce_seconds = debounce_seconds
+        self.poll_interval = poll_interval
+        self.backend = "polling" if use_polling or not WATCHDOG_AVAILABLE else "inotify"
+
+        # path -> (operation, first event time, last event time)
+        self._pending: Dict[str, Tuple[str, float, float]] = {}
+        # Guards _pending and stats, which status() reads from request threads
+        self._lock = threading.Lock()
+        # (operation, path, first event time)
+        self._queue: "queue.Queue[Tuple[str, str, float]]" = queue.Queue()
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._observer = None
+
+        self.stats = {
+            "upserted": 0,
+            "deleted": 0,
+            "failed": 0,
+            "last_error": None,
+            "last_ingest_lag_seconds": None,
+        }
+
+    def _is_watched(self, path: str) -> bool:
+        """Check whether a path has one of the watched file types."""
+        return os.path.splitext(path)[1].lstrip(".") in self.file_types
+
+    def notify(self, operation: str, path: str):
+        """Record a change to a file; bursts of changes collapse into one entry."""
+        if not self._is_watched(path):
+            return
+        now = time.time()
+        with self._lock:
+            previous = self._pending.get(path)
+            first_seen = previous[1] if previous else now
+            self._pending[path] = (operation, first_seen, now)
+
+    def start(self):
+        """Start watching in background threads."""
+        for directory in self.directories:
+            os.makedirs(directory, exist_ok=True)
+
+        if self.backend == "inotify":
+            handler = _WatchdogHandler(self)
+            self._observer = Observer()
+            for directory in self.directories:
+                self._observer.schedule(handler, directory, recursive=True)
+            self._observer.start()
+        else:
+            self._threads.append(threading.Thread(target=self._poll_loop, name="knowledge-poll", daemon=True))
+
+        self._threads.append(threading.Thread(target=self._debounce_loop, name="knowledge-debounce", daemon=True))
+        self._threads.append(threading.Thread(target=self._worker_loop, name="knowledge-ingest", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+        logger.info(f"Knowledge watcher started ({self.backend}) on: {', '.join(self.directories)}")
+
+    def stop(self):
+        """Stop watching and wait for the background threads."""
+        self._stop_event.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+        for thread in self._threads:
+            thread.join(timeout=self.poll_interval + 1)
+        self._threads = []
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        """Return the modification time and size of every watched file."""
+        snapshot = {}
+        for directory in self.directories:
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    path = os.path.join(root, name)
+                    if not self._is_watched(path):
+                        continue
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def _poll_loop(self):
+        """Detect changes by comparing directory snapshots."""
+        # The first snapshot is the baseline; existing files are assumed to be imported
+        previous = self._snapshot()
+        while not self._stop_event.wait(self.poll_interval):
+            current = self._snapshot()
+            for path, signature in current.items():
+                if previous.get(path) != signature:
+                    self.notify(UPSERT, path)
+            for path in previous.keys() - current.keys():
+                self.notify(DELETE, path)
+            previous = current
+
+    def _debounce_loop(self):
+        """Move files that have been quiet for the debounce period onto the ingest queue."""
+        interval = min(0.5, self.debounce_seconds)
+        while not self._stop_event.wait(interval):
+            now = time.time()
+            with self._lock:
+                ready = [
+                    (path, entry) for path, entry in self._pending.items()
+                    if now - entry[2] >= self.debounce_seconds
+                ]
+                for path, _ in ready:
+                    del self._pending[path]
+            for path, (operation, first_seen, _) in ready:
+                self._queue.put((operation, path, first_seen))
+
+    def _worker_loop(self):
+        """Apply queued upserts and deletes to the knowledge base."""
+        while not self._stop_event.is_set():
+            try:
+                operation, path, first_seen = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                # The file may have changed again since the event; trust the filesystem
+                if operation == UPSERT and os.path.exists(path):
+                    self.knowledge_manager.import_file(path)
+                    counter = "upserted"
+                else:
+                    self.knowledge_manager.remove_file(path)
+                    counter = "deleted"
+                with self._lock:
+                    self.stats[counter] += 1
+                    self.stats["last_ingest_lag_seconds"] = time.time() - first_seen
+            except Exception as e:
+                logger.error(f"Error ingesting {path}: {str(e)}")
+                with self._lock:
+                    self.stats["failed"] += 1
+                    self.stats["last_error"] = {"path": path, "error": str(e)}
+            finally:
+                self._queue.task_done()
+
+    def status(self) -> Dict[str, Any]:
+        """Report the watcher's lag and queue depth."""
+        now = time.time()
+        with self._lock:
+            pending_count = len(self._pending)
+            oldest = min((entry[1] for entry in self._pending.values()), default=None)
+            stats = dict(self.stats)
+        with self._queue.mutex:
+            queued = list(self._queue.queue)
+        if queued:
+            oldest_queued = min(item[2] for item in queued)
+            oldest = oldest_queued if oldest is None else min(oldest, oldest_queued)
+
+        return {
+            "running": any(thread.is_alive() for thread in self._threads),
+            "backend": self.backend,
+            "directories": self.directories,
+            "debouncing": pending_count,
+            "queue_depth": len(queued),
+            "lag_seconds": now - oldest if oldest is not None else 0.0,
+            **stats,
+        }
+
+
+if WATCHDOG_AVAILABLE:
+    class _WatchdogHandler(FileSystemEventHandler):
+        """Forward watchdog file events to a KnowledgeWatcher."""
+
+        def __init__(self, watcher: KnowledgeWatcher):
+            super().__init__()
+            self.watcher = watcher
+
+        def on_created(self, event):
+            if not event.is_directory:
+                self.watcher.notify(UPSERT, event.src_path)
+
+        def on_modified(self, event):
+            if not event.is_directory:
+                self.watcher.notify(UPSERT, event.src_path)
+
+        def on_deleted(self, event):
+            if not event.is_directory:
+                self.watcher.notify(DELETE, event.src_path)
+
+        def on_moved(self, event):
+            if not event.is_directory:
+                self.watcher.notify(DELETE, event.src_path)
+                self.watcher.notify(UPSERT, event.dest_path)
@@ -0,0 +1,72 @@
+import logging
+from typing import Any, Dict, Tuple
+
+# ml/ is on the RAG proxy's path, so the ML service's services package is importable as services
+from services.metrics_base import Counter, Gauge, Histogram, render
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+RETRIEVAL_SECONDS = Histogram(
+    "codexcontinue_retrieval_stage_seconds",
+    "Retrieval latency per stage (embed, search, mmr, rerank, total)",
+    ["stage"],
+    buckets=LATENCY_BUCKETS
+)
+EMBEDDING_BATCH_SIZE = Histogram(
+    "codexcontinue_embedding_batch_size",
+    "Number of texts embedded per call",
+    ["kind"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+)
+UPSTREAM_SECONDS = Histogram(
+    "codexcontinue_upstream_request_seconds",
+    "Latency of requests forwarded to LiteLLM",
+    ["endpoint"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+)
+UPSTREAM_ERRORS = Counter(
+    "codexcontinue_upstream_errors_total",
+    "Requests to LiteLLM that failed",
+    ["endpoint"]
+)
+MODELS_RESIDENT = Gauge(
+    "codexcontinue_models_resident",
+    "Models loaded in this process",
+    ["role", "model"]
+)
+WATCHER_QUEUE_DEPTH = Gauge(
+    "codexcontinue_knowledge_watcher_queue_depth",
+    "File changes waiting in the knowledge watcher",
+    ["kind"]
+)
+WATCHER_LAG_SECONDS = Gauge(
+    "codexcontinue_knowledge_watcher_lag_seconds",
+    "Age of the oldest file change not yet applied"
+)
+
+
+def observe_retrieval(timings: Dict[str, float]):
+    """Record per-stage retrieval timings given in milliseconds."""
+    for stage, value in timings.items():
+        RETRIEVAL_SECONDS.labels(stage[:-3] if stage.endswith("_ms") else stage).observe(value / 1000)
+    RETRIEVAL_SECONDS.labels("total").observe(sum(timings.values()) / 1000)
+
+
+def observe_watcher(status: Dict[str, Any]):
+    """Mirror a knowledge watcher's status in gauges."""
+    WATCHER_QUEUE_DEPTH.labels("debouncing").set(status["debouncing"])
+    WATCHER_QUEUE_DEPTH.labels("queued").set(status["queue_depth"])
+    WATCHER_LAG_SECONDS.set(status["lag_seconds"])
+
+
+def render_metrics() -> Tuple[bytes, int, str]:
+    """Render all metrics in the Prometheus text format.
+
+    Returns:
+        Tuple[bytes, int, str]: Body, HTTP status and content type for the response
+    """
+    return render()
@@ -0,0 +1,50 @@
+from typing import List
+
+import numpy as np
+
+
+def maximal_marginal_relevance(query_embedding, candidate_embeddings, k: int = 5,
+                               lambda_mult: float = 0.5) -> List[int]:
+    """Select k diverse candidates with maximal marginal relevance.
+
+    Each step picks the candidate maximising
+    ``lambda_mult * sim(query, c) - (1 - lambda_mult) * max(sim(c, selected))``.
+    Similarities are cosine similarities computed once up front; the running
+    maximum similarity to the selected set is updated with one vector
+    operation per step, so selection is O(n * k) after the n x n similarity matrix.
+
+    Args:
+        query_embedding: Query embedding of shape (d,)
+        candidate_embeddings: Candidate embeddings of shape (n, d)
+        k (int): Number of candidates to select
+        lambda_mult (float): Trade-off between relevance (1.0) and diversity (0.0)
+
+    Returns:
+        List[int]: Indices of the selected candidates, in selection order
+    """
+    candidates = np.asarray(candidate_embeddings, dtype=np.float32)
+    if candidates.ndim != 2 or candidates.shape[0] == 0 or k <= 0:
+        return []
+
+    query = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+    candidates = candidates / np.maximum(np.linalg.norm(candidates, axis=1, keepdims=True), 1e-12)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+    relevance = candidates @ query
+    similarity = candidates @ candidates.T
+
+    k = min(k, candidates.shape[0])
+    selected = [int(np.argmax(relevance))]
+    max_similarity = similarity[selected[0]].copy()
+    available = np.ones(candidates.shape[0], dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < k:
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+
+    return selected
@@ -0,0 +1,70 @@
+import os
+import logging
+import threading
+from typing import List, Dict, Any, Optional
+
+from .metrics import MODELS_RESIDENT
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+class Reranker:
+    def __init__(self, model_name: Optional[str] = None, max_length: Optional[int] = None):
+        """Initialize a cross-encoder reranker.
+
+        Args:
+            model_name (str, optional): Cross-encoder model to use. Defaults to the
+                RAG_RERANK_MODEL environment variable or a small MiniLM model.
+            max_length (int, optional): Maximum tokens per query/passage pair. Shorter
+                pairs make the forward pass cheaper on CPU.
+        """
+        self.model_name = model_name or os.getenv("RAG_RERANK_MODEL", DEFAULT_RERANK_MODEL)
+        self.max_length = max_length or int(os.getenv("RAG_RERANK_MAX_LENGTH", 256))
+        self.model = None  # Lazy load the model when needed
+        self._model_lock = threading.Lock()
+
+    def _load_model(self):
+        """Load the cross-encoder if not already loaded."""
+        with self._model_lock:
+            if self.model is None:
+                from sentence_transformers import CrossEncoder
+
+                logger.info(f"Loading cross-encoder model: {self.model_name}")
+                self.model = CrossEncoder(self.model_name, max_length=self.max_length, device="cpu")
+                MODELS_RESIDENT.labels("reranker", self.model_name).inc()
+                logger.info("Cross-encoder model loaded successfully")
+        return self.model
+
+    def warm_up(self):
+        """Load the model and score one pair, so the first query does not pay for either."""
+        self._load_model().predict([("warm up", "warm up")], show_progress_bar=False)
+
+    def rerank(self, query: str, hits: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+        """Rerank retrieval hits against the query and keep the best top_k.
+
+        All query/passage pairs are scored in a single batched forward pass.
+
+        Args:
+            query (str): Query text
+            hits (List[Dict[str, Any]]): Hits from ``RetrievalRouter.search``
+            top_k (int): Number of hits to keep
+
+        Returns:
+            List[Dict[str, Any]]: The hits with a ``rerank_score`` (higher is better),
+                best first
+        """
+        if not hits:
+            return []
+
+        model = self._load_model()
+        pairs = [(query, hit["document"].page_content) for hit in hits]
+        scores = model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+
+        for hit, score in zip(hits, scores):
+            hit["rerank_score"] = float(score)
+
+        return sorted(hits, key=lambda hit: hit["rerank_score"], reverse=True)[:top_k]
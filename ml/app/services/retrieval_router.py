@@ -0,0 +1,191 @@
+import os
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
+
+from .metrics import EMBEDDING_BATCH_SIZE, observe_retrieval
+from .mmr import maximal_marginal_relevance
+from .reranker import Reranker
+from .vector_store import VectorStore, get_embedding_model, format_context
+
+if TYPE_CHECKING:
+    from langchain.schema import Document
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class RetrievalRouter:
+    def __init__(self, default_collections: Optional[List[str]] = None, max_workers: Optional[int] = None):
+        """Route retrieval queries across one or more vector store collections.
+
+        Args:
+            default_collections (List[str], optional): Collections searched when a query
+                does not name any. Defaults to the RAG_COLLECTIONS environment variable.
+            max_workers (int, optional): Maximum number of collections searched in parallel
+        """
+        if default_collections is None:
+            default_collections = [
+                name.strip() for name in os.getenv("RAG_COLLECTIONS", "codexcontinue").split(",") if name.strip()
+            ]
+        self.default_collections = default_collections
+
+        self._stores: Dict[str, VectorStore] = {}
+        self._stores_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or int(os.getenv("RAG_ROUTER_WORKERS", 4)),
+            thread_name_prefix="rag-router"
+        )
+
+        # Optional second stage: rerank a larger candidate pool with a cross-encoder
+        self.rerank_enabled = os.getenv("RAG_RERANK", "false").lower() == "true"
+        self.rerank_candidates = int(os.getenv("RAG_RERANK_CANDIDATES", 50))
+        self.reranker = Reranker()
+
+        # Optional diversification of the candidate pool with maximal marginal relevance
+        self.mmr_enabled = os.getenv("RAG_MMR", "false").lower() == "true"
+        self.mmr_lambda = float(os.getenv("RAG_MMR_LAMBDA", 0.5))
+
+        logger.info(f"Retrieval router initialized with collections: {', '.join(self.default_collections)}")
+
+    def get_store(self, collection_name: Optional[str] = None) -> VectorStore:
+        """Return the vector store for a collection, creating it on first use."""
+        collection_name = collection_name or self.default_collections[0]
+        with self._stores_lock:
+            if collection_name not in self._stores:
+                self._stores[collection_name] = VectorStore(collection_name=collection_name)
+            return self._stores[collection_name]
+
+    @property
+    def embedding_model(self):
+        """The embedding model shared by all collections, so their distances are comparable."""
+        return get_embedding_model()
+
+    def search(self, query: str, k: int = 5, filters: Optional[Dict[str, Any]] = None,
+               rerank: Optional[bool] = None, candidate_k: Optional[int] = None,
+               mmr: Optional[bool] = None, mmr_lambda: Optional[float] = None,
+               timings: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
+        """Search the requested collections in parallel and merge the hits by distance.
+
+        Args:
+            query (str): Query text
+            k (int): Number of results to return after merging
+            filters (dict, optional): Retrieval filters with the optional keys
+                ``file_type`` (str or list), ``source_prefix`` (str) and
+                ``collections`` (str or list)
+            rerank (bool, optional): Rerank a larger candidate pool with the cross-encoder
+                and trim it to k. Defaults to the RAG_RERANK setting.
+            candidate_k (int, optional): Size of the candidate pool when reranking or
+                diversifying. Defaults to RAG_RERANK_CANDIDATES.
+            mmr (bool, optional): Select k diverse hits from the candidate pool with
+                maximal marginal relevance. Defaults to the RAG_MMR setting.
+            mmr_lambda (float, optional): MMR trade-off between relevance (1.0) and
+                diversity (0.0). Defaults to RAG_MMR_LAMBDA.
+            timings (dict, optional): Filled with the per-stage latency in milliseconds
+
+        Returns:
+            List[Dict[str, Any]]: Hits with ``document``, ``distance`` and ``collection``
+                (plus ``rerank_score`` when reranked), best first
+        """
+        filters = filters or {}
+        if rerank is None:
+            rerank = self.rerank_enabled
+        if mmr is None:
+            mmr = self.mmr_enabled
+        if mmr_lambda is None:
+            mmr_lambda = self.mmr_lambda
+        pool_k = max(k, candidate_k or self.rerank_candidates) if (rerank or mmr) else k
+        if timings is None:
+            timings = {}
+        collections = filters.get("collections") or self.default_collections
+        if isinstance(collections, str):
+            collections = [collections]
+
+        # Embed the query once and reuse it for every collection
+        stage_start = time.perf_counter()
+        embedding = self.embedding_model.embed_query(query)
+        EMBEDDING_BATCH_SIZE.labels("query").observe(1)
+        timings["embed_ms"] = (time.perf_counter() - stage_start) * 1000
+
+        def search_collection(collection_name: str) -> List[Dict[str, Any]]:
+            store = self.get_store(collection_name)
+            where = store.build_filter(
+                file_type=filters.get("file_type"),
+                source_prefix=filters.get("source_prefix")
+            )
+            if mmr:
+                # Keep the stored embeddings so MMR does not have to re-embed candidates
+                hits = store.similarity_search_by_vector_with_embeddings(embedding, k=pool_k, filter=where)
+                return [
+                    {"document": doc, "distance": distance, "collection": collection_name, "embedding": vector}
+                    for doc, distance, vector in hits
+                ]
+            hits = store.similarity_search_by_vector_with_score(embedding, k=pool_k, filter=where)
+            return [
+                {"document": doc, "distance": distance, "collection": collection_name}
+                for doc, distance in hits
+            ]
+
+        stage_start = time.perf_counter()
+        if len(collections) == 1:
+            results = search_collection(collections[0])
+        else:
+            results = []
+            futures = {name: self._executor.submit(search_collection, name) for name in collections}
+            for name, future in futures.items():
+                try:
+                    results.extend(future.result())
+                except Exception as e:
+                    logger.error(f"Error searching collection {name}: {e}")
+
+        results.sort(key=lambda hit: hit["distance"])
+        results = results[:pool_k]
+        timings["search_ms"] = (time.perf_counter() - stage_start) * 1000
+
+        if mmr and results:
+            # Pick a diverse subset first; the reranker, if enabled, then orders it
+            stage_start = time.perf_counter()
+            selected = maximal_marginal_relevance(
+                embedding, [hit.pop("embedding") for hit in results], k=k, lambda_mult=mmr_lambda
+            )
+            results = [results[i] for i in selected]
+            timings["mmr_ms"] = (time.perf_counter() - stage_start) * 1000
+
+        if rerank:
+            stage_start = time.perf_counter()
+            results = self.reranker.rerank(query, results, top_k=k)
+            timings["rerank_ms"] = (time.perf_counter() - stage_start) * 1000
+
+        observe_retrieval(timings)
+        logger.info(
+            f"Retrieved {len(results)} of {pool_k} candidates, timings (ms): "
+            + ", ".join(f"{stage}={value:.1f}" for stage, value in timings.items())
+        )
+        return results[:k]
+
+    def warm_up(self) -> Dict[str, float]:
+        """Load the models, open the default collections and load their source catalogs.
+
+        Returns:
+            Dict[str, float]: Per-stage timings of the warm-up query in milliseconds
+        """
+        timings: Dict[str, float] = {}
+        self.search("warm up", k=1, timings=timings)
+        if self.rerank_enabled:
+            stage_start = time.perf_counter()
+            self.reranker.warm_up()
+            timings["rerank_ms"] = (time.perf_counter() - stage_start) * 1000
+        # Source-prefix filters read the catalog; load it now rather than on the first filtered query
+        stage_start = time.perf_counter()
+        for collection_name in self.default_collections:
+            self.get_store(collection_name).known_sources()
+        timings["source_catalog_ms"] = (time.perf_counter() - stage_start) * 1000
+        return timings
+
+    def get_relevant_context(self, query: str, k: int = 5, filters: Optional[Dict[str, Any]] = None) -> str:
+        """Get relevant context for a query from the routed collections."""
+        documents: List["Document"] = [hit["document"] for hit in self.search(query, k=k, filters=filters)]
+        return format_context(documents)
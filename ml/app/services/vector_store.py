@@ -1,25 +1,126 @@
 import os
+import time
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple, Union, TYPE_CHECKING
 
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.schema import Document
+# langchain, Chroma and sentence-transformers take seconds to import, so they
+# are imported where they are first used
+if TYPE_CHECKING:
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    from langchain.schema import Document
+
+from .chunking import StructuredChunker, get_token_counter
+from .metrics import EMBEDDING_BATCH_SIZE, MODELS_RESIDENT
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+EMBEDDING_MODEL_NAME = os.getenv("RAG_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+
+# HNSW index settings applied when a collection is created
+HNSW_SETTINGS = {
+    "hnsw:space": ("RAG_HNSW_SPACE", str),
+    "hnsw:M": ("RAG_HNSW_M", int),
+    "hnsw:construction_ef": ("RAG_HNSW_CONSTRUCTION_EF", int),
+    "hnsw:search_ef": ("RAG_HNSW_SEARCH_EF", int),
+}
+
+# Chunks read per request when the source catalog is loaded from a collection
+SOURCE_CATALOG_PAGE_SIZE = 1000
+
+
+def index_settings() -> Optional[Dict[str, Any]]:
+    """Return the configured HNSW settings as Chroma collection metadata."""
+    settings = {
+        key: cast(os.environ[env_var])
+        for key, (env_var, cast) in HNSW_SETTINGS.items()
+        if os.getenv(env_var)
+    }
+    return settings or None
+
+
+def create_embedding_model() -> "HuggingFaceEmbeddings":
+    """Create the embedding model shared by all collections."""
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    
+    # Use a lightweight, efficient model for embeddings
+    model = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+    MODELS_RESIDENT.labels("embedding", EMBEDDING_MODEL_NAME).inc()
+    return model
+
+
+@lru_cache(maxsize=None)
+def get_embedding_model() -> "HuggingFaceEmbeddings":
+    """Return the process-wide embedding model, loading it on first use."""
+    return create_embedding_model()
+
+
 class VectorStore:
-    def __init__(self, collection_name: str = "codexcontinue"):
-        """Initialize the vector store with a specific embedding model."""
-        # Use a lightweight, efficient model for embeddings
-        self.embedding_model = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2"
-        )
+    def __init__(self, collection_name: str = "codexcontinue",
+                 embedding_model: Optional["HuggingFaceEmbeddings"] = None):
+        """Initialize the vector store with a specific embedding model.
+        
+        The embedding model and the Chroma connection are created on first use,
+        so constructing a store is cheap.
+        
+        Args:
+            collection_name (str): Name of the Chroma collection to use
+            embedding_model (HuggingFaceEmbeddings, optional): Embedding model to use instead
+                of the shared one. Stores that share a model produce comparable distances.
+        """
+        self.collection_name = collection_name
+        self._embedding_model = embedding_model
+        self._vectorstore = None
+        self._vectorstore_lock = threading.Lock()
+        
+        # Chunking strategy: "structured" sizes chunks in tokens along the document's
+        # structure, "recursive" keeps the character-based splitter
+        self.chunker = None
+        if os.getenv("RAG_CHUNKER", "structured").lower() == "structured":
+            self.chunker = StructuredChunker(
+                max_tokens=int(os.getenv("RAG_CHUNK_TOKENS", 240)),
+                overlap_tokens=int(os.getenv("RAG_CHUNK_OVERLAP_TOKENS", 32)),
+                token_counter=get_token_counter(EMBEDDING_MODEL_NAME)
+            )
         
-        # Connect to ChromaDB (either local or via the service)
+        # Known document sources, used to push source-prefix filters into the index. The
+        # catalog is replaced rather than mutated, so readers can iterate it without the lock.
+        self._sources: Optional[frozenset] = None
+        self._sources_lock = threading.Lock()
+        self._sources_refresh_lock = threading.Lock()
+        self._sources_loaded_at = 0.0
+        self._sources_refreshing = False
+        # Sources added while a refresh is reading the collection
+        self._sources_added: Optional[set] = None
+        self.sources_ttl = float(os.getenv("RAG_SOURCE_CATALOG_TTL", 300))
+    
+    @property
+    def embedding_model(self) -> "HuggingFaceEmbeddings":
+        """The store's embedding model, loaded on first use."""
+        return self._embedding_model or get_embedding_model()
+    
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the Chroma collection has been opened."""
+        return self._vectorstore is not None
+    
+    @property
+    def vectorstore(self):
+        """The langchain Chroma store, connected on first use."""
+        if self._vectorstore is None:
+            with self._vectorstore_lock:
+                if self._vectorstore is None:
+                    self._vectorstore = self._connect()
+        return self._vectorstore
+    
+    def _connect(self):
+        """Connect to ChromaDB, either local or via the service."""
+        from langchain_community.vectorstores import Chroma
+        
+        collection_name = self.collection_name
         persist_directory = os.getenv("VECTOR_DB_PATH", os.path.join(os.path.expanduser("~"), ".codexcontinue/data/vectorstore"))
         chroma_url = os.getenv("CHROMA_URL", None)
         
@@ -34,47 +135,258 @@ class VectorStore:
                 settings=Settings(allow_reset=True)
             )
             
-            self.vectorstore = Chroma(
+            vectorstore = Chroma(
                 client=client,
                 collection_name=collection_name,
-                embedding_function=self.embedding_model
+                embedding_function=self.embedding_model,
+                collection_metadata=index_settings()
             )
         else:
             # Use local persistence
             os.makedirs(persist_directory, exist_ok=True)
             
-            self.vectorstore = Chroma(
+            vectorstore = Chroma(
                 collection_name=collection_name,
                 embedding_function=self.embedding_model,
-                persist_directory=persist_directory
+                persist_directory=persist_directory,
+                collection_metadata=index_settings()
             )
         
         logger.info(f"Vector store initialized with collection: {collection_name}")
+        return vectorstore
     
-    def add_texts(self, texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None) -> List[str]:
-        """Add texts to the vector store."""
-        return self.vectorstore.add_texts(texts=texts, metadatas=metadatas)
+    def add_texts(self, texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None,
+                  ids: Optional[List[str]] = None) -> List[str]:
+        """Add texts to the vector store.
+        
+        Passing ids makes the write idempotent: existing entries with the same ids are replaced.
+        """
+        EMBEDDING_BATCH_SIZE.labels("document").observe(len(texts))
+        ids = self.vectorstore.add_texts(texts=texts, metadatas=metadatas, ids=ids)
+        self._remember_sources(metadatas)
+        return ids
     
-    def add_documents(self, documents: List[Document]) -> List[str]:
+    def add_documents(self, documents: List["Document"]) -> List[str]:
         """Add documents to the vector store."""
-        return self.vectorstore.add_documents(documents=documents)
+        EMBEDDING_BATCH_SIZE.labels("document").observe(len(documents))
+        ids = self.vectorstore.add_documents(documents=documents)
+        self._remember_sources([doc.metadata for doc in documents])
+        return ids
     
-    def similarity_search(self, query: str, k: int = 5) -> List[Document]:
-        """Search for similar documents to the query."""
-        return self.vectorstore.similarity_search(query=query, k=k)
+    def delete_where(self, where: Dict[str, Any]) -> None:
+        """Delete every chunk whose metadata matches a Chroma where clause.
+        
+        Sources left without chunks are dropped from the source catalog.
+        """
+        collection = self.vectorstore._collection
+        affected = set()
+        if self._sources is not None:
+            matched = collection.get(where=where, include=["metadatas"])
+            affected = {m["source"] for m in matched.get("metadatas") or [] if m and m.get("source")}
+        collection.delete(where=where)
+        self._forget_sources({
+            source for source in affected
+            if not collection.get(where={"source": source}, limit=1, include=[])["ids"]
+        })
     
-    def process_document(self, content: str, metadata: Dict[str, Any], chunk_size: int = 1000) -> List[str]:
-        """Process a document by splitting it into chunks and storing in the vector DB."""
-        # Split the document into chunks
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=200
+    def delete_source(self, source: str) -> None:
+        """Delete every chunk that was imported from the given source."""
+        self.vectorstore._collection.delete(where={"source": source})
+        self._forget_sources({source})
+    
+    def similarity_search(self, query: str, k: int = 5,
+                          filter: Optional[Dict[str, Any]] = None) -> List["Document"]:
+        """Search for similar documents to the query.
+    
+        Args:
+            query (str): Query text
+            k (int): Number of documents to return
+            filter (dict, optional): Chroma ``where`` clause, see ``build_filter``
+        """
+        return self.vectorstore.similarity_search(query=query, k=k, filter=filter)
+    
+    def embed_query(self, query: str) -> List[float]:
+        """Embed a query once so it can be reused across collections."""
+        return self.embedding_model.embed_query(query)
+    
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 5,
+                                               filter: Optional[Dict[str, Any]] = None) -> List[Tuple["Document", float]]:
+        """Search with a precomputed query embedding.
+    
+        Returns:
+            List[Tuple[Document, float]]: Documents with their distance (lower is closer)
+        """
+        return self.vectorstore.similarity_search_by_vector_with_relevance_scores(
+            embedding=embedding, k=k, filter=filter
+        )
+    
+    def similarity_search_by_vector_with_embeddings(self, embedding: List[float], k: int = 5,
+                                                    filter: Optional[Dict[str, Any]] = None) -> List[Tuple["Document", float, List[float]]]:
+        """Search with a precomputed query embedding and return the stored chunk embeddings.
+        
+        The embeddings come straight from the index, so callers such as MMR can
+        compare candidates without embedding them again.
+        
+        Returns:
+            List[Tuple[Document, float, List[float]]]: Documents with their distance and embedding
+        """
+        from langchain.schema import Document
+        
+        results = self.vectorstore._collection.query(
+            query_embeddings=[embedding],
+            n_results=k,
+            where=filter,
+            include=["documents", "metadatas", "distances", "embeddings"]
         )
         
-        chunks = text_splitter.split_text(content)
+        return [
+            (Document(page_content=text, metadata=metadata or {}), distance, vector)
+            for text, metadata, distance, vector in zip(
+                results["documents"][0],
+                results["metadatas"][0],
+                results["distances"][0],
+                results["embeddings"][0]
+            )
+        ]
+    
+    def build_filter(self, file_type: Optional[Union[str, List[str]]] = None,
+                     source_prefix: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Translate retrieval filters into a Chroma ``where`` clause.
+    
+        Chroma has no string prefix operator, so a source prefix is expanded
+        into an ``$in`` over the known sources that match it. Either way the
+        filter is applied by the index before any vector is scored.
+    
+        Returns:
+            Optional[Dict[str, Any]]: The where clause, or None for no filtering
+        """
+        clauses = []
+    
+        if file_type:
+            file_types = [file_type] if isinstance(file_type, str) else list(file_type)
+            file_types = [ft.lstrip(".") for ft in file_types]
+            if len(file_types) == 1:
+                clauses.append({"file_type": file_types[0]})
+            else:
+                clauses.append({"file_type": {"$in": file_types}})
+    
+        if source_prefix:
+            sources = sorted(s for s in self.known_sources() if s.startswith(source_prefix))
+            if not sources:
+                # Nothing can match; keep the clause so the index returns no results
+                sources = [source_prefix]
+            if len(sources) == 1:
+                clauses.append({"source": sources[0]})
+            else:
+                clauses.append({"source": {"$in": sources}})
+    
+        if not clauses:
+            return None
+        if len(clauses) == 1:
+            return clauses[0]
+        return {"$and": clauses}
+    
+    def known_sources(self) -> frozenset:
+        """Return the set of document sources stored in this collection.
+        
+        The catalog is read from the collection on first use (the warm-up does this
+        before the first query) and then kept current by this store's writes and
+        deletes. Chunks written by other processes are picked up by a background
+        refresh once the catalog is older than RAG_SOURCE_CATALOG_TTL seconds
+        (default 300); queries keep using the cached catalog in the meantime.
+        """
+        with self._sources_lock:
+            sources = self._sources
+            if (sources is not None and not self._sources_refreshing
+                    and time.time() - self._sources_loaded_at > self.sources_ttl):
+                self._sources_refreshing = True
+                threading.Thread(target=self._refresh_sources_in_background,
+                                 name=f"sources-{self.collection_name}", daemon=True).start()
+        if sources is None:
+            self._refresh_sources(initial=True)
+            sources = self._sources
+        return sources
+    
+    def _scan_sources(self) -> set:
+        """Read the source of every chunk in the collection, a page at a time."""
+        collection = self.vectorstore._collection
+        sources, offset = set(), 0
+        while True:
+            page = collection.get(include=["metadatas"], limit=SOURCE_CATALOG_PAGE_SIZE, offset=offset)
+            metadatas = page.get("metadatas") or []
+            sources.update(m["source"] for m in metadatas if m and m.get("source"))
+            if len(metadatas) < SOURCE_CATALOG_PAGE_SIZE:
+                return sources
+            offset += SOURCE_CATALOG_PAGE_SIZE
+    
+    def _refresh_sources(self, initial: bool = False):
+        """Rebuild the source catalog from the collection."""
+        with self._sources_refresh_lock:
+            if initial and self._sources is not None:
+                return  # Another thread loaded it while this one waited
+            with self._sources_lock:
+                self._sources_added = set()
+            try:
+                scanned = self._scan_sources()
+            except Exception:
+                with self._sources_lock:
+                    self._sources_added = None
+                    self._sources_refreshing = False
+                raise
+            with self._sources_lock:
+                self._sources = frozenset(scanned | self._sources_added)
+                self._sources_added = None
+                self._sources_loaded_at = time.time()
+                self._sources_refreshing = False
+            logger.info(f"Loaded {len(self._sources)} known sources for collection: {self.collection_name}")
+    
+    def _refresh_sources_in_background(self):
+        try:
+            self._refresh_sources()
+        except Exception as e:
+            logger.warning(f"Refreshing the source catalog of {self.collection_name} failed: {e}")
+    
+    def _remember_sources(self, metadatas: Optional[List[Dict[str, Any]]]):
+        """Record the sources of newly added chunks in the source catalog."""
+        if not metadatas:
+            return
+        added = {m["source"] for m in metadatas if m and m.get("source")}
+        with self._sources_lock:
+            if self._sources_added is not None:
+                self._sources_added |= added
+            if self._sources is not None and not added <= self._sources:
+                self._sources = self._sources | added
+    
+    def _forget_sources(self, removed: set):
+        """Drop sources that no longer have chunks from the source catalog."""
+        with self._sources_lock:
+            if self._sources is not None and removed & self._sources:
+                self._sources = self._sources - removed
+    
+    def process_document(self, content: str, metadata: Dict[str, Any], chunk_size: int = 1000) -> List[str]:
+        """Process a document by splitting it into chunks and storing in the vector DB.
         
-        # Create metadata for each chunk (same metadata for all chunks from the same doc)
-        metadatas = [metadata] * len(chunks)
+        With the structured chunker, ``chunk_size`` is ignored in favour of the
+        token budget and each chunk's metadata records its line range and the
+        symbol, section or key it covers.
+        """
+        if self.chunker is not None:
+            structured_chunks = self.chunker.chunk(content, metadata.get("file_type"))
+            chunks = [chunk["text"] for chunk in structured_chunks]
+            metadatas = [{**metadata, **chunk["metadata"]} for chunk in structured_chunks]
+        else:
+            from langchain.text_splitter import RecursiveCharacterTextSplitter
+            
+            # Split the document into chunks
+            text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=chunk_size,
+                chunk_overlap=200
+            )
+            
+            chunks = text_splitter.split_text(content)
+            
+            # Create metadata for each chunk (same metadata for all chunks from the same doc)
+            metadatas = [metadata] * len(chunks)
         
         # Add to vector store
         ids = self.add_texts(chunks, metadatas)
@@ -82,20 +394,25 @@ class VectorStore:
         
         return ids
     
-    def get_relevant_context(self, query: str, k: int = 5) -> str:
+    def get_relevant_context(self, query: str, k: int = 5,
+                             filter: Optional[Dict[str, Any]] = None) -> str:
         """Get relevant context for a query from the vector store."""
-        documents = self.similarity_search(query, k=k)
-        
-        # Combine the relevant documents into a context string
-        context = "\n\n".join([doc.page_content for doc in documents])
-        
-        # Include source information
-        sources = []
-        for doc in documents:
-            if doc.metadata.get("source"):
-                sources.append(doc.metadata["source"])
-        
-        if sources:
-            context += "\n\nSources: " + ", ".join(set(sources))
-        
-        return context
+        documents = self.similarity_search(query, k=k, filter=filter)
+        return format_context(documents)
+
+
+def format_context(documents: List["Document"]) -> str:
+    """Combine retrieved documents into a context string with their sources."""
+    # Combine the relevant documents into a context string
+    context = "\n\n".join([doc.page_content for doc in documents])
+    
+    # Include source information
+    sources = []
+    for doc in documents:
+        if doc.metadata.get("source"):
+            sources.append(doc.metadata["source"])
+    
+    if sources:
+        context += "\n\nSources: " + ", ".join(set(sources))
+    
+    return context
@@ -4,15 +4,20 @@ RAG Proxy for MCP Server - Integrates vector database retrieval with LiteLLM
 """
 
 import os
+import time
 import logging
+import threading
 from typing import Dict, Any, Optional
 import requests
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 
 # Import our custom services
-from app.services.vector_store import VectorStore
+from app.services.retrieval_router import RetrievalRouter
 from app.services.knowledge_manager import KnowledgeManager
+from app.services.knowledge_watcher import KnowledgeWatcher
+from app.services.vector_store import format_context
+from app.services.metrics import UPSTREAM_SECONDS, UPSTREAM_ERRORS, observe_watcher, render_metrics
 
 # Configure logging
 logging.basicConfig(
@@ -24,25 +29,110 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)
 
-# Initialize the vector store and knowledge manager
-vector_store = VectorStore(collection_name="codexcontinue")
+# Initialize the retrieval router, the default vector store and knowledge manager
+retrieval_router = RetrievalRouter()
+vector_store = retrieval_router.get_store()
 knowledge_manager = KnowledgeManager(vector_store=vector_store)
 
 # Configuration
 LITELLM_API_URL = os.getenv("LITELLM_API_URL", "http://litellm:8000")
 RAG_PROXY_PORT = int(os.getenv("RAG_PROXY_PORT", 5001))
 DEBUG = os.getenv("DEBUG", "true").lower() == "true"
+RAG_TRANSCRIPT_COLLECTION = os.getenv("RAG_TRANSCRIPT_COLLECTION", "transcripts")
+RAG_WATCH_DIRS = [d.strip() for d in os.getenv("RAG_WATCH_DIRS", "").split(",") if d.strip()]
+RAG_WARMUP = os.getenv("RAG_WARMUP", "true").lower() == "true"
 
+# Keep the knowledge base in sync with the watched directories; the watcher is
+# started with the server, in the serving process only
+knowledge_watcher = None
+if RAG_WATCH_DIRS:
+    knowledge_watcher = KnowledgeWatcher(
+        knowledge_manager,
+        RAG_WATCH_DIRS,
+        debounce_seconds=float(os.getenv("RAG_WATCH_DEBOUNCE_SECONDS", 2.0)),
+        poll_interval=float(os.getenv("RAG_WATCH_POLL_INTERVAL", 5.0)),
+        use_polling=os.getenv("RAG_WATCH_POLLING", "false").lower() == "true"
+    )
 
-def get_relevant_context(query: str, k: int = 5) -> str:
+# Readiness is reported separately from liveness: /ready fails until the warm-up
+# has loaded the models, so a load balancer only routes to warm workers
+warmup_status: Dict[str, Any] = {"ready": not RAG_WARMUP, "state": "pending" if RAG_WARMUP else "disabled"}
+
+
+def warm_up():
+    """Load the embedding model (and reranker), open the default collections and run one query."""
+    warmup_status["state"] = "running"
+    start = time.perf_counter()
+    try:
+        warmup_status["timings_ms"] = retrieval_router.warm_up()
+        warmup_status.update(state="ready", ready=True)
+    except Exception as e:
+        logger.error(f"Warm-up failed: {e}")
+        warmup_status.update(state="failed", error=str(e))
+    warmup_status["elapsed_seconds"] = time.perf_counter() - start
+    logger.info(f"Warm-up {warmup_status['state']} after {warmup_status['elapsed_seconds']:.1f}s")
+
+
+RAG_FILTER_KEYS = ("file_type", "source_prefix", "collection", "collections")
+
+
+def parse_rag_filters(raw_filters: Any) -> Optional[Dict[str, Any]]:
+    """Validate retrieval filters from a request body."""
+    if raw_filters is None:
+        return None
+    if not isinstance(raw_filters, dict):
+        raise ValueError("Filters must be an object")
+    
+    unknown = set(raw_filters) - set(RAG_FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"Unsupported filter keys: {', '.join(sorted(unknown))}")
+    
+    # Accept "collection" as a single-collection shorthand
+    filters = dict(raw_filters)
+    if "collection" in filters:
+        filters["collections"] = filters.pop("collection")
+    for key in ("file_type", "collections"):
+        value = filters.get(key)
+        if value is not None and not isinstance(value, (str, list)):
+            raise ValueError(f"Filter '{key}' must be a string or a list of strings")
+    if filters.get("source_prefix") is not None and not isinstance(filters["source_prefix"], str):
+        raise ValueError("Filter 'source_prefix' must be a string")
+    
+    return filters
+
+
+def get_relevant_context(query: str, k: int = 5, filters: Optional[Dict[str, Any]] = None) -> str:
     """Get relevant context from the vector store."""
     try:
-        return vector_store.get_relevant_context(query, k=k)
+        return retrieval_router.get_relevant_context(query, k=k, filters=filters)
     except Exception as e:
         logger.error(f"Error retrieving context: {e}")
         return ""
 
 
+def post_to_litellm(endpoint: str, data: Dict[str, Any]) -> requests.Response:
+    """POST a request to LiteLLM, recording its latency and failures."""
+    start = time.perf_counter()
+    try:
+        response = requests.post(f"{LITELLM_API_URL}/{endpoint}", json=data)
+    except Exception:
+        UPSTREAM_ERRORS.labels(endpoint).inc()
+        raise
+    finally:
+        UPSTREAM_SECONDS.labels(endpoint).observe(time.perf_counter() - start)
+    if response.status_code >= 400:
+        UPSTREAM_ERRORS.labels(endpoint).inc()
+    return response
+
+
+def server_timing(timings_ms: Dict[str, float]) -> str:
+    """Format stage timings as a Server-Timing header value."""
+    return ", ".join(
+        f"{stage[:-3] if stage.endswith('_ms') else stage};dur={value:.1f}"
+        for stage, value in timings_ms.items()
+    )
+
+
 def forward_request_to_litellm(endpoint: str, original_data: Dict[str, Any], 
                               context: Optional[str] = None) -> Dict[str, Any]:
     """
@@ -53,7 +143,7 @@ def forward_request_to_litellm(endpoint: str, original_data: Dict[str, Any],
     
     # If there's no context or we're not supposed to augment, just forward as is
     if not context:
-        return requests.post(f"{LITELLM_API_URL}/{endpoint}", json=augmented_data).json()
+        return post_to_litellm(endpoint, augmented_data).json()
         
     # Handle completion requests (different from chat)
     if endpoint == "v1/completions":
@@ -96,7 +186,7 @@ def forward_request_to_litellm(endpoint: str, original_data: Dict[str, Any],
     
     # Send the augmented request to LiteLLM
     try:
-        response = requests.post(f"{LITELLM_API_URL}/{endpoint}", json=augmented_data)
+        response = post_to_litellm(endpoint, augmented_data)
         return response.json()
     except Exception as e:
         logger.error(f"Error forwarding request to LiteLLM: {e}")
@@ -113,8 +203,12 @@ def home():
             "/v1/chat/completions",
             "/v1/models",
             "/rag/import",
+            "/rag/import/transcript",
             "/rag/query",
-            "/health"
+            "/rag/watch/status",
+            "/metrics",
+            "/health",
+            "/ready"
         ]
     })
 
@@ -123,8 +217,12 @@ def home():
 def health():
     """Health check endpoint."""
     try:
-        # Check vector store health
-        vector_store.similarity_search("health check", k=1)
+        # Check vector store health without loading it: the embedding model and
+        # Chroma are loaded by the first request that needs them
+        vector_store_status = "not loaded"
+        if vector_store.is_loaded:
+            vector_store.similarity_search("health check", k=1)
+            vector_store_status = "available"
         
         # Check LiteLLM health
         litellm_status = "unavailable"
@@ -137,7 +235,7 @@ def health():
         
         return jsonify({
             "status": "healthy",
-            "vector_store": "available",
+            "vector_store": vector_store_status,
             "litellm": litellm_status,
         })
     except Exception as e:
@@ -145,6 +243,12 @@ def health():
         return jsonify({"status": "unhealthy", "error": str(e)}), 500
 
 
+@app.route('/ready')
+def ready():
+    """Readiness check: succeeds once the start-up warm-up has finished."""
+    return jsonify(warmup_status), 200 if warmup_status["ready"] else 503
+
+
 @app.route('/v1/completions', methods=['POST'])
 def completions():
     """Proxy for the completions endpoint with RAG augmentation."""
@@ -158,16 +262,26 @@ def completions():
         
         # Check if RAG should be used
         use_rag = data.pop('use_rag', True)
+        try:
+            rag_filters = parse_rag_filters(data.pop('rag_filters', None))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         # Get context if RAG is enabled
         context = None
+        retrieval_start = time.perf_counter()
         if use_rag:
-            context = get_relevant_context(prompt)
+            context = get_relevant_context(prompt, filters=rag_filters)
+        retrieval_ms = (time.perf_counter() - retrieval_start) * 1000
         
         # Forward to LiteLLM
+        upstream_start = time.perf_counter()
         result = forward_request_to_litellm("v1/completions", data, context)
+        upstream_ms = (time.perf_counter() - upstream_start) * 1000
         
-        return jsonify(result)
+        response = jsonify(result)
+        response.headers["Server-Timing"] = server_timing({"retrieval": retrieval_ms, "upstream": upstream_ms})
+        return response
         
     except Exception as e:
         logger.error(f"Error in completions endpoint: {e}")
@@ -187,20 +301,30 @@ def chat_completions():
         
         # Check if RAG should be used
         use_rag = data.pop('use_rag', True)
+        try:
+            rag_filters = parse_rag_filters(data.pop('rag_filters', None))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         # Get context based on the last user message
         context = None
+        retrieval_start = time.perf_counter()
         if use_rag:
             # Extract the user's latest message for context retrieval
             user_messages = [msg["content"] for msg in messages if msg.get("role") == "user"]
             if user_messages:
                 latest_user_message = user_messages[-1]
-                context = get_relevant_context(latest_user_message)
+                context = get_relevant_context(latest_user_message, filters=rag_filters)
+        retrieval_ms = (time.perf_counter() - retrieval_start) * 1000
         
         # Forward to LiteLLM
+        upstream_start = time.perf_counter()
         result = forward_request_to_litellm("v1/chat/completions", data, context)
+        upstream_ms = (time.perf_counter() - upstream_start) * 1000
         
-        return jsonify(result)
+        response = jsonify(result)
+        response.headers["Server-Timing"] = server_timing({"retrieval": retrieval_ms, "upstream": upstream_ms})
+        return response
         
     except Exception as e:
         logger.error(f"Error in chat completions endpoint: {e}")
@@ -235,8 +359,14 @@ def import_knowledge():
         if file_types is not None and not isinstance(file_types, list):
             file_types = [file_types]
         
+        # Import into a named collection if requested
+        collection = data.get('collection')
+        manager = knowledge_manager
+        if collection:
+            manager = KnowledgeManager(vector_store=retrieval_router.get_store(collection))
+        
         # Import documents
-        result = knowledge_manager.import_directory(directory_path, file_types)
+        result = manager.import_directory(directory_path, file_types)
         
         return jsonify({
             "success": True,
@@ -249,6 +379,44 @@ def import_knowledge():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/rag/import/transcript', methods=['POST'])
+def import_transcript():
+    """Import a timestamped video transcript into the RAG knowledge base."""
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        video_id = data.get('video_id')
+        segments = data.get('segments')
+        if not video_id:
+            return jsonify({"error": "video_id is required"}), 400
+        if not isinstance(segments, list) or not segments:
+            return jsonify({"error": "segments are required"}), 400
+        
+        source_url = data.get('source_url') or f"https://www.youtube.com/watch?v={video_id}"
+        collection = data.get('collection') or RAG_TRANSCRIPT_COLLECTION
+        window_seconds = float(data.get('window_seconds', 60.0))
+        
+        manager = KnowledgeManager(vector_store=retrieval_router.get_store(collection))
+        result = manager.import_transcript(
+            video_id,
+            segments,
+            source_url,
+            title=data.get('title'),
+            window_seconds=window_seconds
+        )
+        
+        return jsonify({
+            "success": True,
+            "message": f"Successfully imported transcript for {video_id}",
+            "collection": collection,
+            "stats": result
+        })
+        
+    except Exception as e:
+        logger.error(f"Error importing transcript: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route('/rag/query', methods=['POST'])
 def query_knowledge():
     """Query the RAG knowledge base directly."""
@@ -262,20 +430,69 @@ def query_knowledge():
             
         # Optional parameters
         k = int(data.get('k', 5))
+        try:
+            filters = parse_rag_filters(data.get('filters'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        # Get context for the query
-        context = get_relevant_context(query, k=k)
+        rerank = data.get('rerank')
+        candidate_k = data.get('candidate_k')
+        if candidate_k is not None:
+            candidate_k = int(candidate_k)
+        mmr = data.get('mmr')
+        mmr_lambda = data.get('mmr_lambda')
+        if mmr_lambda is not None:
+            mmr_lambda = float(mmr_lambda)
+            if not 0.0 <= mmr_lambda <= 1.0:
+                return jsonify({"error": "mmr_lambda must be between 0 and 1"}), 400
         
-        return jsonify({
+        # Search the routed collections and build the context from the merged hits
+        timings = {}
+        hits = retrieval_router.search(query, k=k, filters=filters, rerank=rerank,
+                                       candidate_k=candidate_k, mmr=mmr, mmr_lambda=mmr_lambda,
+                                       timings=timings)
+        context = format_context([hit["document"] for hit in hits])
+        
+        response = jsonify({
             "success": True,
-            "context": context
+            "context": context,
+            "results": [
+                {
+                    "content": hit["document"].page_content,
+                    "metadata": hit["document"].metadata,
+                    "distance": hit["distance"],
+                    "rerank_score": hit.get("rerank_score"),
+                    "collection": hit["collection"]
+                }
+                for hit in hits
+            ],
+            "timings_ms": timings
         })
+        response.headers["Server-Timing"] = server_timing(timings)
+        return response
         
     except Exception as e:
         logger.error(f"Error querying knowledge: {e}")
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/rag/watch/status', methods=['GET'])
+def watch_status():
+    """Report the knowledge watcher's lag and queue depth."""
+    if knowledge_watcher is None:
+        return jsonify({"running": False, "message": "No directories configured in RAG_WATCH_DIRS"})
+    return jsonify(knowledge_watcher.status())
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Expose retrieval and proxy metrics in the Prometheus text format."""
+    if knowledge_watcher is not None:
+        observe_watcher(knowledge_watcher.status())
+    body, status, content_type = render_metrics()
+    return body, status, {"Content-Type": content_type}
+
+
 if __name__ == '__main__':
     # Create necessary directories
     vector_db_path = os.getenv("VECTOR_DB_PATH", os.path.join(os.path.expanduser("~"), ".codexcontinue/data/vectorstore"))
@@ -290,5 +507,13 @@ if __name__ == '__main__':
     logger.info(f"Vector store directory: {vector_db_path}")
     logger.info(f"Knowledge base directory: {knowledge_base_path}")
     
+    # Warm up in the background and start watching, in the serving process only: with
+    # DEBUG the reloader's parent imports this module too, and would ingest every change again
+    if not DEBUG or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        if RAG_WARMUP:
+            threading.Thread(target=warm_up, name="warmup", daemon=True).start()
+        if knowledge_watcher is not None:
+            knowledge_watcher.start()
+    
     # Start the server
     app.run(host='0.0.0.0', port=RAG_PROXY_PORT, debug=DEBUG)
\ No newline at end of file
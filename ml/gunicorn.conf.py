@@ -0,0 +1,120 @@
+"""
+Production settings for serving the ML service with several worker processes
+
+    gunicorn --config ml/gunicorn.conf.py ml.wsgi:app
+
+The master process imports the app and loads the Whisper models listed in
+TRANSCRIBE_WARMUP_MODELS before forking, so every worker maps the same weight
+pages copy-on-write instead of loading a private copy. Inference never writes
+to the weights, so the pages stay shared; each worker then only pays for its
+activations and the Python heap. Each worker runs the warm-up inference itself
+before accepting requests, and its BLAS/OpenMP thread pools are sized so that
+all workers together use the machine's cores once.
+
+GPU models cannot be shared this way (CUDA does not survive a fork), so with
+TRANSCRIBE_WARMUP_USE_GPU=true each worker loads its own models.
+
+Prometheus metrics run in multiprocess mode: each worker writes its samples to
+PROMETHEUS_MULTIPROC_DIR and /metrics merges them, whichever worker answers.
+"""
+
+import os
+import gc
+import logging
+import tempfile
+
+logger = logging.getLogger("gunicorn.error")
+
+bind = f"0.0.0.0:{os.getenv('ML_SERVICE_PORT', 5000)}"
+workers = int(os.getenv("ML_WORKERS", 2))
+# A second thread keeps /health, /ready and probes answering while a transcription runs.
+# Concurrent transcriptions in one worker load a private model, so scale with workers.
+worker_class = "gthread"
+threads = int(os.getenv("ML_WORKER_THREADS", 2))
+# Transcriptions of long videos hold a request open for minutes
+timeout = int(os.getenv("ML_WORKER_TIMEOUT", 900))
+graceful_timeout = 60
+preload_app = True
+
+# Compute threads per worker. BLAS and OpenMP size their pools from these variables
+# when they are first loaded, which happens in the master while the app is imported,
+# so they are set before that.
+compute_threads = int(os.getenv("ML_WORKER_COMPUTE_THREADS", max(1, (os.cpu_count() or 1) // workers)))
+for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS"):
+    os.environ.setdefault(variable, str(compute_threads))
+
+# prometheus-client picks its multiprocess storage when it is imported, with the app, so
+# this is set here too. Samples left by an earlier run would be merged in, so they are removed.
+prometheus_multiproc_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "codexcontinue-prometheus"))
+os.makedirs(prometheus_multiproc_dir, exist_ok=True)
+for name in os.listdir(prometheus_multiproc_dir):
+    if name.endswith(".db"):
+        os.remove(os.path.join(prometheus_multiproc_dir, name))
+
+
+def when_ready(server):
+    """Load the Whisper weights in the master, after the app is imported and before any worker is forked."""
+    from ml.services.warmup import get_warmup
+
+    warmup = get_warmup()
+    if warmup.use_gpu:
+        logger.warning("GPU models cannot be shared across a fork; each worker loads its own")
+        return
+
+    try:
+        import torch
+        # Keep the master single-threaded: an OpenMP pool started before the fork
+        # is not usable in the children
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+
+    warmup.run(inference=False)
+    # Move everything allocated so far out of the collector's reach, so collections in
+    # the workers do not write to (and un-share) the pages holding these objects
+    gc.freeze()
+    logger.info(f"Preloaded Whisper models in the master: {', '.join(warmup.model_sizes) or 'none'}")
+
+
+def post_fork(server, worker):
+    """Size the worker's torch thread pool."""
+    try:
+        import torch
+        torch.set_num_threads(compute_threads)
+    except ImportError:
+        pass
+
+
+def post_worker_init(worker):
+    """Warm the worker up before it accepts requests, and resume interrupted background jobs in the first one."""
+    from ml.services.warmup import get_warmup, PENDING
+
+    warmup = get_warmup()
+    if warmup.state == PENDING:
+        # Nothing was preloaded in the master (GPU models)
+        warmup.run()
+    else:
+        warmup.warm_up_loaded()
+
+    if worker.age == 1:
+        from ml.services.batch_transcriber import get_batch_transcriber
+
+        resumed = get_batch_transcriber().resume_incomplete()
+        if resumed:
+            logger.info(f"Resumed {len(resumed)} batch jobs")
+
+        from ml.services.preview_refinement import get_preview_refiner
+
+        resumed = get_preview_refiner().resume_incomplete()
+        if resumed:
+            logger.info(f"Resumed {len(resumed)} refinements")
+
+
+def child_exit(server, worker):
+    """Drop an exited worker's live gauges from the merged metrics."""
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
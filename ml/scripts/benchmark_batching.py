@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark cross-request Whisper batching against per-job transcription
+
+Runs N concurrent transcriptions of the same fixture two ways: each job
+calling model.transcribe on its own model (the default path), and all jobs
+feeding 30-second windows to one InferenceBatcher. Reports aggregate
+throughput in audio-hours per wall-hour for each concurrency and batch size,
+and how closely the batched transcript matches the per-job one (batched
+windows are decoded without the previous window as a prompt).
+
+Fixtures are generated like benchmark_transcription.py (synthesized speech
+when espeak is installed, a speech-like tone otherwise) or taken from
+--fixtures-dir, in which case the first file is used.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import difflib
+import tempfile
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Allow running from the repository root or from ml/scripts
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR.parents[1]))
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from benchmark_transcription import prepare_fixtures, git_commit  # noqa: E402
+
+
+def run_concurrently(jobs, transcribe, path):
+    """Run jobs transcriptions of path at once and return (wall seconds, first transcript)."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = list(executor.map(lambda _: transcribe(path), range(jobs)))
+    return time.perf_counter() - start, results[0]["text"]
+
+
+def similarity(reference, text):
+    """Word-level similarity of two transcripts (1.0 is identical)."""
+    return difflib.SequenceMatcher(None, reference.lower().split(), text.lower().split()).ratio()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched against per-job Whisper transcription")
+    parser.add_argument("--model", default="base", help="Whisper model size")
+    parser.add_argument("--device", default="cpu", help="Device to run the model on")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 8], help="Simultaneous jobs")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[4, 8, 16], help="Maximum windows per batch")
+    parser.add_argument("--max-wait-ms", type=float, default=50, help="Longest a window waits for its batch")
+    parser.add_argument("--duration", type=int, default=120, help="Length in seconds of the generated fixture")
+    parser.add_argument("--fixtures-dir", help="Use the first audio file in this directory instead")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    # The per-job path needs one idle model per concurrent job
+    os.environ["WHISPER_POOL_MAX_IDLE"] = str(max(args.concurrency))
+    from ml.services.model_pool import get_model_pool
+    from ml.services.inference_batcher import InferenceBatcher
+
+    work_dir = tempfile.mkdtemp(prefix="batching-benchmark-")
+    name, path, seconds = prepare_fixtures([args.duration], args.fixtures_dir, work_dir)[0]
+    print(f"Fixture: {name} ({seconds:.0f}s), model {args.model} on {args.device}")
+
+    pool = get_model_pool()
+    models = [pool.acquire(args.model, args.device) for _ in range(max(args.concurrency))]
+    for model in models:
+        pool.release(args.model, args.device, model)
+    pool.warm_up_idle()
+
+    def per_job(audio_file):
+        with pool.checkout(args.model, args.device) as model:
+            return model.transcribe(audio_file, fp16=args.device == "cuda")
+
+    results = {"commit": git_commit(), "model": args.model, "device": args.device, "fixture": name,
+               "audio_seconds": seconds, "max_wait_ms": args.max_wait_ms, "runs": []}
+    for jobs in args.concurrency:
+        wall, reference = run_concurrently(jobs, per_job, path)
+        baseline = jobs * seconds / wall
+        results["runs"].append({"mode": "per-job", "jobs": jobs, "wall_seconds": wall,
+                                "audio_hours_per_hour": baseline})
+        print(f"{jobs:>3} jobs  per-job       : {baseline:7.1f} audio-h/h ({wall:.1f}s)")
+
+        for batch_size in args.batch_sizes:
+            batcher = InferenceBatcher(args.model, args.device, batch_size=batch_size, max_wait_ms=args.max_wait_ms)
+            wall, text = run_concurrently(jobs, batcher.transcribe, path)
+            throughput = jobs * seconds / wall
+            match = similarity(reference, text)
+            results["runs"].append({"mode": "batched", "jobs": jobs, "batch_size": batch_size, "wall_seconds": wall,
+                                    "audio_hours_per_hour": throughput, "similarity": match})
+            print(f"{jobs:>3} jobs  batch size {batch_size:>3}: {throughput:7.1f} audio-h/h ({wall:.1f}s), "
+                  f"{throughput / baseline:.2f}x, transcript similarity {match:.2f}")
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
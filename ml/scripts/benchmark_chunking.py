@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Benchmark the structured chunker against the character-based splitter
+
+Measures chunking speed over a directory tree and, optionally, retrieval
+quality on queries generated from the tree itself: Python docstrings should
+retrieve their function and markdown headings should retrieve their section.
+"""
+
+import re
+import sys
+import ast
+import json
+import time
+import random
+import argparse
+from pathlib import Path
+
+# Allow running from the repository root or from ml/scripts
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.chunking import StructuredChunker, get_token_counter  # noqa: E402
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_MAX_TOKENS = 256
+DEFAULT_FILE_TYPES = ["md", "txt", "py", "js", "html", "css", "json", "yaml", "yml"]
+MARKDOWN_HEADING = re.compile(r"^#{1,6}\s+(.+?)\s*$", re.MULTILINE)
+
+
+def collect_files(directory, file_types):
+    """Collect readable files with the given extensions"""
+    documents = []
+    for path in sorted(Path(directory).rglob("*")):
+        if not path.is_file() or path.suffix[1:] not in file_types:
+            continue
+        if any(part.startswith(".") or part in ("node_modules", "__pycache__") for part in path.parts):
+            continue
+        try:
+            documents.append((str(path), path.suffix[1:], path.read_text(encoding="utf-8")))
+        except (UnicodeDecodeError, OSError):
+            continue
+    return documents
+
+
+def recursive_chunks(documents, chunk_size):
+    """Chunk with the character-based splitter used before the structured chunker"""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=200)
+    return [(path, text) for path, _, content in documents for text in splitter.split_text(content)]
+
+
+def structured_chunks(documents, chunker):
+    """Chunk with the structured, token-sized chunker"""
+    return [
+        (path, chunk["text"])
+        for path, file_type, content in documents
+        for chunk in chunker.chunk(content, file_type)
+    ]
+
+
+def time_strategy(name, chunk_fn, counter):
+    """Time a chunking strategy and summarise its chunk sizes"""
+    start = time.perf_counter()
+    chunks = chunk_fn()
+    seconds = time.perf_counter() - start
+
+    token_counts = counter.count_many([text for _, text in chunks])
+    truncated = sum(1 for count in token_counts if count > EMBEDDING_MAX_TOKENS - 2)
+    return chunks, {
+        "strategy": name,
+        "seconds": seconds,
+        "chunks": len(chunks),
+        "mean_tokens": sum(token_counts) / len(token_counts) if token_counts else 0,
+        "max_tokens": max(token_counts, default=0),
+        "truncated_chunks": truncated,
+        "truncated_ratio": truncated / len(chunks) if chunks else 0,
+    }
+
+
+def build_queries(documents, max_queries, seed):
+    """Build labelled queries: (query, source path, marker the answer chunk must contain)"""
+    queries = []
+    for path, file_type, content in documents:
+        if file_type == "py":
+            try:
+                tree = ast.parse(content)
+            except SyntaxError:
+                continue
+            for node in ast.walk(tree):
+                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                    docstring = ast.get_docstring(node)
+                    if docstring and len(docstring.split()) >= 4:
+                        keyword = "class" if isinstance(node, ast.ClassDef) else "def"
+                        queries.append((docstring.splitlines()[0], path, f"{keyword} {node.name}"))
+        elif file_type == "md":
+            for match in MARKDOWN_HEADING.finditer(content):
+                heading = match.group(1).strip("# ")
+                if len(heading.split()) >= 3:
+                    queries.append((heading, path, match.group(0)))
+
+    random.Random(seed).shuffle(queries)
+    return queries[:max_queries]
+
+
+def evaluate_retrieval(chunks, queries, model, k):
+    """Compute recall@k and MRR of queries against a chunk set"""
+    import numpy as np
+
+    chunk_embeddings = model.encode([text for _, text in chunks], batch_size=64,
+                                    normalize_embeddings=True, show_progress_bar=False)
+    query_embeddings = model.encode([query for query, _, _ in queries], batch_size=64,
+                                    normalize_embeddings=True, show_progress_bar=False)
+    scores = query_embeddings @ chunk_embeddings.T
+    top = np.argsort(-scores, axis=1)[:, :k]
+
+    hits, reciprocal_ranks = 0, 0.0
+    for (_, path, marker), ranked in zip(queries, top):
+        for rank, index in enumerate(ranked, start=1):
+            chunk_path, text = chunks[index]
+            if chunk_path == path and marker in text:
+                hits += 1
+                reciprocal_ranks += 1.0 / rank
+                break
+
+    return {
+        "queries": len(queries),
+        f"recall@{k}": hits / len(queries) if queries else 0,
+        "mrr": reciprocal_ranks / len(queries) if queries else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark structured chunking against the character splitter")
+    parser.add_argument("--directory", default=str(Path(__file__).resolve().parents[2]),
+                        help="Directory to chunk (default: this repository)")
+    parser.add_argument("--file-types", nargs="+", default=DEFAULT_FILE_TYPES, help="File extensions to include")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Character chunk size for the recursive splitter")
+    parser.add_argument("--max-tokens", type=int, default=240, help="Token budget for the structured chunker")
+    parser.add_argument("--overlap-tokens", type=int, default=32, help="Token overlap for the structured chunker")
+    parser.add_argument("--quality", action="store_true", help="Also measure retrieval quality (needs sentence-transformers)")
+    parser.add_argument("--max-queries", type=int, default=200, help="Maximum number of generated queries")
+    parser.add_argument("--k", type=int, default=5, help="Cut-off for recall@k")
+    parser.add_argument("--seed", type=int, default=13, help="Seed for query sampling")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    documents = collect_files(args.directory, set(args.file_types))
+    total_bytes = sum(len(content.encode("utf-8")) for _, _, content in documents)
+    print(f"Collected {len(documents)} files ({total_bytes / 1e6:.2f} MB) from {args.directory}")
+
+    counter = get_token_counter(EMBEDDING_MODEL_NAME)
+    counter.count("warm up")  # Load the tokenizer outside the timed region
+    chunker = StructuredChunker(max_tokens=args.max_tokens, overlap_tokens=args.overlap_tokens,
+                                token_counter=counter)
+
+    strategies = {
+        "structured": lambda: structured_chunks(documents, chunker),
+    }
+    try:
+        import langchain.text_splitter  # noqa: F401
+        strategies["recursive"] = lambda: recursive_chunks(documents, args.chunk_size)
+    except ImportError:
+        print("langchain is not installed, skipping the recursive splitter")
+
+    results = {"directory": args.directory, "files": len(documents), "bytes": total_bytes, "strategies": []}
+    chunk_sets = {}
+    for name, chunk_fn in strategies.items():
+        chunks, stats = time_strategy(name, chunk_fn, counter)
+        stats["mb_per_second"] = total_bytes / 1e6 / stats["seconds"] if stats["seconds"] else 0
+        chunk_sets[name] = chunks
+        results["strategies"].append(stats)
+        print(f"{name:>10}: {stats['chunks']} chunks in {stats['seconds']:.2f}s "
+              f"({stats['mb_per_second']:.2f} MB/s), mean {stats['mean_tokens']:.0f} tokens, "
+              f"{stats['truncated_ratio']:.1%} over the embedding limit")
+
+    if args.quality:
+        from sentence_transformers import SentenceTransformer
+
+        queries = build_queries(documents, args.max_queries, args.seed)
+        model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+        print(f"Evaluating retrieval with {len(queries)} generated queries")
+        for stats in results["strategies"]:
+            quality = evaluate_retrieval(chunk_sets[stats["strategy"]], queries, model, args.k)
+            stats["quality"] = quality
+            print(f"{stats['strategy']:>10}: recall@{args.k} {quality[f'recall@{args.k}']:.3f}, MRR {quality['mrr']:.3f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
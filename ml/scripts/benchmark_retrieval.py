@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Benchmark VectorStore ingestion, retrieval quality and query latency
+
+Indexes a corpus (this repository by default) into a throwaway Chroma
+collection and evaluates it with labelled queries generated from the corpus
+itself: Python docstrings should retrieve their definition and markdown
+headings their section. Every combination of chunker, embedding model and
+HNSW settings runs in its own process with its own index directory, so
+memory and disk figures are not shared between configurations.
+
+Reports ingest throughput, index size on disk, RSS, recall@k, MRR and query
+latency percentiles.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import itertools
+import subprocess
+from pathlib import Path
+
+# Allow running from the repository root or from ml/scripts
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR.parent))
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from benchmark_chunking import DEFAULT_FILE_TYPES, collect_files, build_queries  # noqa: E402
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+HNSW_ENV = {
+    "space": "RAG_HNSW_SPACE",
+    "M": "RAG_HNSW_M",
+    "construction_ef": "RAG_HNSW_CONSTRUCTION_EF",
+    "search_ef": "RAG_HNSW_SEARCH_EF",
+}
+
+
+def current_rss_mb():
+    """Return the current resident set size in MB."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_mb():
+    """Return the peak resident set size of this process in MB."""
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def directory_size(path):
+    """Return the total size of the files under a directory in bytes."""
+    return sum(file.stat().st_size for file in Path(path).rglob("*") if file.is_file())
+
+
+def percentiles(values):
+    """Return p50/p95/p99 and the mean of a list of milliseconds."""
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "mean": None}
+    values = sorted(values)
+
+    def rank(p):
+        return values[min(len(values) - 1, max(0, int(round(p / 100 * len(values))) - 1))]
+
+    return {"p50": rank(50), "p95": rank(95), "p99": rank(99), "mean": sum(values) / len(values)}
+
+
+def parse_chunker(spec):
+    """Parse "structured:240" or "recursive:1000" into (chunker, size)."""
+    name, _, size = spec.partition(":")
+    if name not in ("structured", "recursive"):
+        raise argparse.ArgumentTypeError(f"Unknown chunker: {name}")
+    return name, int(size or (240 if name == "structured" else 1000))
+
+
+def parse_hnsw(spec):
+    """Parse "M=32,search_ef=50" into HNSW settings ("default" for none)."""
+    if spec == "default":
+        return {}
+    settings = {}
+    for entry in spec.split(","):
+        key, _, value = entry.partition("=")
+        if key not in HNSW_ENV:
+            raise argparse.ArgumentTypeError(f"Unknown HNSW setting: {key}")
+        settings[key] = value
+    return settings
+
+
+def run_configuration(config, documents, queries, k):
+    """Index the corpus and evaluate the queries in this process."""
+    index_dir = tempfile.mkdtemp(prefix="retrieval-benchmark-")
+    os.environ["VECTOR_DB_PATH"] = index_dir
+    os.environ["RAG_EMBEDDING_MODEL"] = config["embedding_model"]
+    os.environ["RAG_CHUNKER"] = config["chunker"]
+    if config["chunker"] == "structured":
+        os.environ["RAG_CHUNK_TOKENS"] = str(config["chunk_size"])
+    for key, value in config["hnsw"].items():
+        os.environ[HNSW_ENV[key]] = str(value)
+
+    from app.services.vector_store import VectorStore
+
+    rss_start = current_rss_mb()
+    start = time.perf_counter()
+    store = VectorStore(collection_name="benchmark")
+    store.embed_query("warm up")
+    model_load_seconds = time.perf_counter() - start
+    rss_model = current_rss_mb()
+
+    chunks = 0
+    start = time.perf_counter()
+    for path, file_type, content in documents:
+        chunks += len(store.process_document(content, {"source": path, "file_type": file_type},
+                                             chunk_size=config["chunk_size"]))
+    ingest_seconds = time.perf_counter() - start
+    corpus_bytes = sum(len(content.encode("utf-8")) for _, _, content in documents)
+
+    latencies, hits, reciprocal_ranks = [], 0, 0.0
+    for query, path, marker in queries:
+        start = time.perf_counter()
+        results = store.similarity_search(query, k=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        for rank, document in enumerate(results, start=1):
+            if document.metadata.get("source") == path and marker in document.page_content:
+                hits += 1
+                reciprocal_ranks += 1.0 / rank
+                break
+
+    result = {
+        **config,
+        "documents": len(documents),
+        "chunks": chunks,
+        "model_load_seconds": model_load_seconds,
+        "ingest_seconds": ingest_seconds,
+        "ingest_chunks_per_second": chunks / ingest_seconds if ingest_seconds else 0,
+        "ingest_mb_per_second": corpus_bytes / 1e6 / ingest_seconds if ingest_seconds else 0,
+        "index_bytes": directory_size(index_dir),
+        "model_rss_mb": rss_model - rss_start if rss_start is not None else None,
+        "index_rss_mb": current_rss_mb() - rss_model if rss_model is not None else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "queries": len(queries),
+        f"recall@{k}": hits / len(queries) if queries else 0,
+        "mrr": reciprocal_ranks / len(queries) if queries else 0,
+        "query_latency_ms": percentiles(latencies),
+    }
+    shutil.rmtree(index_dir, ignore_errors=True)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark VectorStore retrieval quality and latency")
+    parser.add_argument("--directory", default=str(SCRIPTS_DIR.parents[1]),
+                        help="Corpus directory (default: this repository)")
+    parser.add_argument("--file-types", nargs="+", default=DEFAULT_FILE_TYPES, help="File extensions to include")
+    parser.add_argument("--chunkers", nargs="+", type=parse_chunker, default=[("structured", 240)],
+                        help="Chunkers as structured:<tokens> or recursive:<characters>")
+    parser.add_argument("--embedding-models", nargs="+", default=[DEFAULT_EMBEDDING_MODEL],
+                        help="Sentence-transformers embedding models")
+    parser.add_argument("--hnsw", nargs="+", type=parse_hnsw, default=[{}],
+                        help="HNSW settings per configuration, e.g. M=32,search_ef=100 or default")
+    parser.add_argument("--max-queries", type=int, default=200, help="Maximum number of generated queries")
+    parser.add_argument("--k", type=int, default=5, help="Cut-off for recall@k")
+    parser.add_argument("--seed", type=int, default=13, help="Seed for query sampling")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    documents = collect_files(args.directory, set(args.file_types))
+    queries = build_queries(documents, args.max_queries, args.seed)
+
+    if args.worker:
+        # Child process: run one configuration and print its result as JSON
+        result = run_configuration(json.loads(args.worker), documents, queries, args.k)
+        print("BENCHMARK_RESULT " + json.dumps(result))
+        return
+
+    total_bytes = sum(len(content.encode("utf-8")) for _, _, content in documents)
+    print(f"Corpus: {len(documents)} files ({total_bytes / 1e6:.2f} MB), {len(queries)} labelled queries")
+
+    results = {"directory": args.directory, "files": len(documents), "bytes": total_bytes,
+               "queries": len(queries), "k": args.k, "configurations": []}
+    for (chunker, chunk_size), model, hnsw in itertools.product(args.chunkers, args.embedding_models, args.hnsw):
+        config = {"chunker": chunker, "chunk_size": chunk_size, "embedding_model": model, "hnsw": hnsw}
+        label = f"{chunker}:{chunk_size} {model.rsplit('/', 1)[-1]} {','.join(f'{k}={v}' for k, v in hnsw.items()) or 'default'}"
+        worker_args = [sys.executable, __file__, "--worker", json.dumps(config), "--directory", args.directory,
+                       "--file-types", *args.file_types, "--max-queries", str(args.max_queries),
+                       "--k", str(args.k), "--seed", str(args.seed)]
+        process = subprocess.run(worker_args, capture_output=True, text=True)
+        lines = [line for line in process.stdout.splitlines() if line.startswith("BENCHMARK_RESULT ")]
+        if process.returncode != 0 or not lines:
+            error = (process.stderr.strip().splitlines() or ["unknown error"])[-1]
+            print(f"{label}: failed: {error}")
+            results["configurations"].append({**config, "error": error})
+            continue
+
+        stats = json.loads(lines[-1][len("BENCHMARK_RESULT "):])
+        results["configurations"].append(stats)
+        latency = stats["query_latency_ms"]
+        print(f"{label}: {stats['chunks']} chunks, ingest {stats['ingest_chunks_per_second']:.0f} chunks/s, "
+              f"index {stats['index_bytes'] / 1e6:.1f} MB, peak RSS {stats['peak_rss_mb']:.0f} MB, "
+              f"recall@{args.k} {stats[f'recall@{args.k}']:.3f}, MRR {stats['mrr']:.3f}, "
+              f"latency p50/p95/p99 {latency['p50']:.1f}/{latency['p95']:.1f}/{latency['p99']:.1f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Benchmark service start-up: import time, memory and first request latency
+
+Each target is imported in a fresh process, so the figures are what a new
+container or worker pays before it can answer its first request:
+
+- ml-service: the Flask app in ml/app.py
+- rag-proxy: the RAG proxy in ml/app_mcp_rag.py
+- transcriber: ml.services.youtube_transcriber with a YouTubeTranscriber
+
+For each target it reports the wall-clock time of the whole process, the
+import time, RSS after import, the heavy libraries that ended up loaded and
+the latency of the first /health request. Use --output on one commit and
+--compare on another to see the effect of a change.
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import resource
+import subprocess
+from pathlib import Path
+
+# Allow running from the repository root or from ml/scripts
+REPO_ROOT = Path(__file__).resolve().parents[2]
+ML_DIR = REPO_ROOT / "ml"
+
+TARGETS = ["ml-service", "rag-proxy", "transcriber"]
+HEAVY_MODULES = ["torch", "whisper", "yt_dlp", "transformers", "sentence_transformers",
+                 "langchain", "langchain_community", "chromadb"]
+
+
+def current_rss_mb():
+    """Return the current resident set size in MB."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+def peak_rss_mb():
+    """Return the peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def import_target(target):
+    """Import a target and return a Flask app to send /health to, if it has one."""
+    if target == "ml-service":
+        import importlib.util
+
+        sys.path.insert(0, str(REPO_ROOT))
+        # ml/app.py is shadowed by the ml/app package, so load it by path
+        spec = importlib.util.spec_from_file_location("ml_service_app", ML_DIR / "app.py")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module.app
+    if target == "rag-proxy":
+        sys.path.insert(0, str(ML_DIR))
+        import app_mcp_rag
+        return app_mcp_rag.app
+    if target == "transcriber":
+        sys.path.insert(0, str(REPO_ROOT))
+        from ml.services.youtube_transcriber import YouTubeTranscriber
+        YouTubeTranscriber()
+        return None
+    raise ValueError(f"Unknown target: {target}")
+
+
+def run_target(target):
+    """Import one target in this process and measure it."""
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    app = import_target(target)
+    import_seconds = time.perf_counter() - start
+    rss_after = current_rss_mb()
+
+    first_request_ms = None
+    if app is not None:
+        client = app.test_client()
+        start = time.perf_counter()
+        response = client.get("/health")
+        first_request_ms = (time.perf_counter() - start) * 1000
+        if response.status_code != 200:
+            raise RuntimeError(f"/health returned {response.status_code}: {response.get_data(as_text=True)}")
+
+    return {
+        "target": target,
+        "import_seconds": import_seconds,
+        "import_rss_mb": rss_after - rss_before,
+        "rss_mb": current_rss_mb(),
+        "peak_rss_mb": peak_rss_mb(),
+        "first_request_ms": first_request_ms,
+        "heavy_modules": [name for name in HEAVY_MODULES if name in sys.modules],
+    }
+
+
+def git_commit():
+    """Return the current commit, so results can be compared between commits."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Print start-up time and memory changes against an earlier results file."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {entry["target"]: entry for entry in baseline["targets"] if "error" not in entry}
+    print(f"\nCompared with {baseline.get('commit') or baseline_path}:")
+    for entry in results["targets"]:
+        old = previous.get(entry["target"])
+        if "error" in entry or old is None:
+            continue
+        print(f"  {entry['target']:>12}: process {entry['process_seconds'] - old['process_seconds']:+.2f}s, "
+              f"import {entry['import_seconds'] - old['import_seconds']:+.2f}s, "
+              f"RSS {entry['rss_mb'] - old['rss_mb']:+.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark service import time, memory and first request latency")
+    parser.add_argument("--targets", nargs="+", default=TARGETS, choices=TARGETS, help="Services to start")
+    parser.add_argument("--repeats", type=int, default=3, help="Fresh processes per target; the fastest is kept")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        # Child process: import one target and print its measurements as JSON
+        print("BENCHMARK_RESULT " + json.dumps(run_target(args.worker)))
+        return
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "repeats": args.repeats,
+        "targets": [],
+    }
+    # Keep the services from reaching out to upstreams that are not running
+    env = {**os.environ, "TRANSCRIPT_STORE_ENABLED": os.getenv("TRANSCRIPT_STORE_ENABLED", "false")}
+    for target in args.targets:
+        runs, error = [], None
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            process = subprocess.run([sys.executable, __file__, "--worker", target],
+                                     capture_output=True, text=True, env=env)
+            process_seconds = time.perf_counter() - start
+            lines = [line for line in process.stdout.splitlines() if line.startswith("BENCHMARK_RESULT ")]
+            if process.returncode != 0 or not lines:
+                error = (process.stderr.strip().splitlines() or ["unknown error"])[-1]
+                break
+            runs.append({**json.loads(lines[-1][len("BENCHMARK_RESULT "):]), "process_seconds": process_seconds})
+
+        if error:
+            print(f"{target:>12}: failed: {error}")
+            results["targets"].append({"target": target, "error": error})
+            continue
+
+        entry = min(runs, key=lambda run: run["process_seconds"])
+        results["targets"].append(entry)
+        first_request = f"{entry['first_request_ms']:.0f} ms" if entry["first_request_ms"] is not None else "n/a"
+        print(f"{target:>12}: process {entry['process_seconds']:.2f}s, import {entry['import_seconds']:.2f}s, "
+              f"RSS {entry['rss_mb']:.0f} MB, first /health {first_request}, "
+              f"heavy modules: {', '.join(entry['heavy_modules']) or 'none'}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
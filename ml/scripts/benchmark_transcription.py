@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the YouTube transcription pipeline
+
+Runs YouTubeTranscriber.process_video on local audio fixtures with yt-dlp
+replaced by a stub that "downloads" the fixture, so no network access is
+needed and runs are repeatable. For each Whisper model size, backend and
+decode preset it measures model load time, audio decode time, transcription
+time, real-time factor and peak RSS. Each configuration runs in its own process so peak RSS
+and model load time are not polluted by earlier runs.
+
+Fixtures are generated as WAV files (synthesized speech when espeak is
+installed, a speech-like modulated tone otherwise), or taken from
+--fixtures-dir.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import wave
+import shutil
+import tempfile
+import platform
+import argparse
+import resource
+import subprocess
+from pathlib import Path
+
+# Allow running from the repository root or from ml/scripts
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+SAMPLE_RATE = 16000
+SENTENCE = ("The quick brown fox jumps over the lazy dog while the committee "
+            "reviews the quarterly results and plans the next release. ")
+
+
+def current_rss_mb():
+    """Return the current resident set size in MB."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+def peak_rss_mb():
+    """Return the peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def write_tone_fixture(path, seconds):
+    """Write a speech-like signal: a gliding tone gated into syllable-length bursts."""
+    import numpy as np
+
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 140 + 40 * np.sin(2 * math.pi * 0.7 * t)
+    carrier = np.sin(2 * math.pi * np.cumsum(pitch) / SAMPLE_RATE)
+    syllables = (np.sin(2 * math.pi * 4 * t) > -0.2).astype(np.float32)
+    noise = np.random.default_rng(0).normal(0, 0.02, t.shape)
+    signal = 0.3 * carrier * syllables + noise
+
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes((np.clip(signal, -1, 1) * 32767).astype("<i2").tobytes())
+
+
+def write_speech_fixture(path, seconds, espeak):
+    """Synthesize speech with espeak, padded or trimmed to the requested length."""
+    import numpy as np
+
+    words_per_second = 2.5
+    text = SENTENCE * max(1, math.ceil(seconds * words_per_second / len(SENTENCE.split())))
+    with tempfile.NamedTemporaryFile(suffix=".wav") as raw:
+        subprocess.run([espeak, "-w", raw.name, text], check=True, capture_output=True)
+        with wave.open(raw.name, "rb") as f:
+            rate = f.getframerate()
+            samples = np.frombuffer(f.readframes(f.getnframes()), dtype="<i2").astype(np.float32)
+
+    # Resample to 16 kHz and fit to the requested duration
+    target = int(seconds * SAMPLE_RATE)
+    positions = np.arange(int(len(samples) * SAMPLE_RATE / rate)) * rate / SAMPLE_RATE
+    samples = np.interp(positions, np.arange(len(samples)), samples)
+    samples = np.resize(samples, target) if len(samples) < target else samples[:target]
+
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(samples.astype("<i2").tobytes())
+
+
+def prepare_fixtures(durations, fixtures_dir, work_dir):
+    """Return (name, path, seconds) fixtures, generating any that are missing."""
+    if fixtures_dir:
+        fixtures = []
+        for path in sorted(Path(fixtures_dir).iterdir()):
+            if path.suffix.lower() in (".wav", ".mp3", ".m4a", ".webm", ".opus", ".flac"):
+                fixtures.append((path.stem, str(path), probe_duration(path)))
+        return fixtures
+
+    espeak = shutil.which("espeak-ng") or shutil.which("espeak")
+    kind = "speech" if espeak else "tone"
+    fixtures = []
+    for seconds in durations:
+        path = Path(work_dir) / f"{kind}-{seconds}s.wav"
+        if not path.exists():
+            if espeak:
+                write_speech_fixture(path, seconds, espeak)
+            else:
+                write_tone_fixture(path, seconds)
+        fixtures.append((path.stem, str(path), float(seconds)))
+    return fixtures
+
+
+def probe_duration(path):
+    """Return the duration of an audio file in seconds."""
+    if path.suffix.lower() == ".wav":
+        with wave.open(str(path), "rb") as f:
+            return f.getnframes() / f.getframerate()
+    output = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", str(path)],
+        check=True, capture_output=True, text=True
+    )
+    return float(output.stdout.strip())
+
+
+class StubYoutubeDL:
+    """Stands in for yt_dlp.YoutubeDL: "downloads" a local fixture into the cache."""
+
+    fixture = None
+
+    def __init__(self, options):
+        self.options = options
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def download(self, urls):
+        # The transcriber expects the extracted audio at <outtmpl>.mp3; ffmpeg
+        # detects the real container, so the fixture is copied as-is
+        shutil.copyfile(self.fixture, f"{self.options['outtmpl']}.mp3")
+
+    def extract_info(self, url, download=False):
+        return {"id": url.rsplit("=", 1)[-1], "duration": None, "subtitles": {}, "automatic_captions": {}}
+
+
+def run_configuration(model_size, backend, fixtures, repeats, preset=None, rerun_model=None):
+    """Benchmark one model size and backend in this process."""
+    work_dir = tempfile.mkdtemp(prefix="transcription-benchmark-")
+    os.environ["TRANSCRIPT_STORE_ENABLED"] = "false"
+    os.environ["TRANSCRIPT_DB_PATH"] = os.path.join(work_dir, "transcripts.db")
+
+    from ml.services import youtube_transcriber
+    from ml.services.audio_cache import AudioCache
+    from ml.services.model_pool import get_model_pool
+
+    try:
+        whisper = youtube_transcriber.import_whisper()
+    except ImportError:
+        raise RuntimeError("openai-whisper is not installed")
+
+    # Replace yt-dlp with the stub for every download the transcriber makes
+    youtube_transcriber.yt_dlp = type("yt_dlp", (), {"YoutubeDL": StubYoutubeDL})
+
+    transcriber = youtube_transcriber.YouTubeTranscriber(whisper_model_size=model_size, use_gpu=backend != "cpu")
+    transcriber.temp_dir = work_dir
+    transcriber.audio_cache = AudioCache(work_dir, max_bytes=10 * 1024 ** 3, max_age_days=0)
+
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    get_model_pool().preload(model_size, transcriber.device, warm_up=False)
+    load_seconds = time.perf_counter() - start
+    device = transcriber.device
+
+    results = []
+    for name, path, seconds in fixtures:
+        StubYoutubeDL.fixture = path
+        start = time.perf_counter()
+        whisper.load_audio(path)
+        decode_seconds = time.perf_counter() - start
+
+        runs = []
+        for repeat in range(repeats):
+            # A fresh video ID per run so every run goes through the stubbed download
+            url = f"https://www.youtube.com/watch?v=bench-{name}-{repeat}"
+            result = transcriber.process_video(url, preset=preset, rerun_model=rerun_model)
+            if result.get("error"):
+                raise RuntimeError(result["error_message"])
+            runs.append({**result["processing_time"], "rerun": result.get("rerun")})
+
+        transcribe = sorted(run["transcribe_seconds"] for run in runs)
+        median = transcribe[len(transcribe) // 2]
+        results.append({
+            "fixture": name,
+            "audio_seconds": seconds,
+            "decode_seconds": decode_seconds,
+            "download_seconds": min(run["download_seconds"] for run in runs),
+            "transcribe_seconds": transcribe,
+            "transcribe_seconds_median": median,
+            "real_time_factor": median / seconds if seconds else None,
+        })
+        if rerun_model:
+            # Second-pass cost and coverage, to weigh against running the larger model throughout
+            rerun = sorted(run.get("rerun_seconds", 0.0) for run in runs)
+            results[-1]["rerun_seconds_median"] = rerun[len(rerun) // 2]
+            results[-1]["audio_share_rerun"] = (runs[0]["rerun"] or {}).get("audio_share_rerun")
+            results[-1]["two_tier_real_time_factor"] = (median + rerun[len(rerun) // 2]) / seconds if seconds else None
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return {
+        "model": model_size,
+        "backend": backend,
+        "preset": preset,
+        "rerun_model": rerun_model,
+        "device": device,
+        "model_load_seconds": load_seconds,
+        "model_rss_mb": current_rss_mb() - rss_before,
+        "peak_rss_mb": peak_rss_mb(),
+        "fixtures": results,
+    }
+
+
+def git_commit():
+    """Return the current commit, so results can be compared between commits."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Print real-time factor and peak RSS changes against an earlier results file."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {
+        (config["model"], config["backend"], config.get("preset"), fixture["fixture"]): (fixture, config)
+        for config in baseline["configurations"] if "error" not in config
+        for fixture in config["fixtures"]
+    }
+    print(f"\nCompared with {baseline.get('commit') or baseline_path}:")
+    for config in results["configurations"]:
+        if "error" in config:
+            continue
+        for fixture in config["fixtures"]:
+            key = (config["model"], config["backend"], config.get("preset"), fixture["fixture"])
+            if key not in previous:
+                continue
+            old_fixture, old_config = previous[key]
+            rtf_change = fixture["real_time_factor"] / old_fixture["real_time_factor"] - 1
+            rss_change = config["peak_rss_mb"] - old_config["peak_rss_mb"]
+            print(f"  {key[0]:>6} {key[1]:>4} {key[2] or 'default':>8} {key[3]:>12}: "
+                  f"RTF {rtf_change:+.1%}, peak RSS {rss_change:+.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark transcription offline with local audio fixtures")
+    parser.add_argument("--models", nargs="+", default=["tiny", "base"], help="Whisper model sizes")
+    parser.add_argument("--backends", nargs="+", default=["cpu"], choices=["cpu", "gpu"],
+                        help="cpu, or gpu to use CUDA/MPS when available")
+    parser.add_argument("--presets", nargs="+", default=["balanced"], choices=["fast", "balanced", "accurate"],
+                        help="Decode presets to compare")
+    parser.add_argument("--rerun-model", help="Also re-run low-confidence passages with this larger model")
+    parser.add_argument("--durations", nargs="+", type=int, default=[10, 60, 300],
+                        help="Lengths in seconds of the generated fixtures")
+    parser.add_argument("--fixtures-dir", help="Use the audio files in this directory instead of generated ones")
+    parser.add_argument("--repeats", type=int, default=3, help="Transcriptions per fixture")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        # Child process: run one configuration and print its result as JSON
+        spec = json.loads(args.worker)
+        result = run_configuration(spec["model"], spec["backend"], spec["fixtures"], spec["repeats"], spec["preset"],
+                                   spec.get("rerun_model"))
+        print("BENCHMARK_RESULT " + json.dumps(result))
+        return
+
+    fixture_dir = tempfile.mkdtemp(prefix="transcription-fixtures-")
+    fixtures = prepare_fixtures(args.durations, args.fixtures_dir, fixture_dir)
+    print(f"Fixtures: {', '.join(f'{name} ({seconds:.0f}s)' for name, _, seconds in fixtures)}")
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "repeats": args.repeats,
+        "configurations": [],
+    }
+    for model in args.models:
+        for backend in args.backends:
+            for preset in args.presets:
+                spec = {"model": model, "backend": backend, "preset": preset, "fixtures": fixtures,
+                        "repeats": args.repeats, "rerun_model": args.rerun_model}
+                process = subprocess.run(
+                    [sys.executable, __file__, "--worker", json.dumps(spec)],
+                    capture_output=True, text=True
+                )
+                lines = [line for line in process.stdout.splitlines() if line.startswith("BENCHMARK_RESULT ")]
+                if process.returncode != 0 or not lines:
+                    error = (process.stderr.strip().splitlines() or ["unknown error"])[-1]
+                    print(f"{model:>6} {backend:>4} {preset:>8}: failed: {error}")
+                    results["configurations"].append({"model": model, "backend": backend, "preset": preset,
+                                                      "error": error})
+                    continue
+
+                config = json.loads(lines[-1][len("BENCHMARK_RESULT "):])
+                results["configurations"].append(config)
+                print(f"{model:>6} {backend:>4} {preset:>8} ({config['device']}): "
+                      f"load {config['model_load_seconds']:.2f}s, model +{config['model_rss_mb']:.0f} MB, "
+                      f"peak RSS {config['peak_rss_mb']:.0f} MB")
+                for fixture in config["fixtures"]:
+                    print(f"    {fixture['fixture']:>12}: decode {fixture['decode_seconds']:.2f}s, "
+                          f"transcribe {fixture['transcribe_seconds_median']:.2f}s, "
+                          f"RTF {fixture['real_time_factor']:.3f}")
+                    if "audio_share_rerun" in fixture:
+                        print(f"    {'':>12}  re-ran {fixture['audio_share_rerun'] or 0:.0%} of the audio with "
+                              f"{args.rerun_model} in {fixture['rerun_seconds_median']:.2f}s, "
+                              f"two-tier RTF {fixture['two_tier_real_time_factor']:.3f}")
+
+    shutil.rmtree(fixture_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Load test for the RAG proxy against a local stand-in for LiteLLM
+
+Starts a stub OpenAI-compatible upstream with configurable latency, errors
+and streaming, optionally starts the proxy pointed at it, and drives
+/v1/chat/completions and /rag/query at a fixed request rate and concurrency.
+
+Requests are scheduled open-loop: latency is measured from the time a
+request was due, so queueing inside the harness when the proxy falls behind
+shows up in the numbers instead of silently lowering the rate. The proxy's
+Server-Timing header splits each request into retrieval and upstream time.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+ML_DIR = Path(__file__).resolve().parents[1]
+
+DEFAULT_QUERIES = [
+    "How do I start the ML service with GPU support?",
+    "What does the YouTube transcriber do with downloaded audio?",
+    "How are documents chunked before they are embedded?",
+    "Which environment variables configure the RAG proxy?",
+    "How do I import a directory into the knowledge base?",
+    "How is the Ollama model selected for summaries?",
+    "What happens when a batch transcription job is interrupted?",
+    "How can I filter retrieval results by file type?",
+]
+
+
+class StubUpstream(BaseHTTPRequestHandler):
+    """OpenAI-compatible endpoints that answer after a configurable delay."""
+
+    latency_ms = 200.0
+    jitter_ms = 50.0
+    error_rate = 0.0
+    stream_tokens = 20
+    stream_token_ms = 10.0
+    requests_served = 0
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [{"id": "stub-model", "object": "model"}]})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with StubUpstream.lock:
+            StubUpstream.requests_served += 1
+
+        time.sleep(max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) / 1000)
+        if random.random() < self.error_rate:
+            self._send_json(500, {"error": {"message": "stub upstream error"}})
+            return
+
+        chat = self.path.endswith("/chat/completions")
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for index in range(self.stream_tokens):
+                time.sleep(self.stream_token_ms / 1000)
+                delta = {"delta": {"content": f"token{index} "}} if chat else {"text": f"token{index} "}
+                chunk = {"object": "chat.completion.chunk" if chat else "text_completion",
+                         "choices": [{"index": 0, **delta, "finish_reason": None}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+            return
+
+        text = " ".join(f"token{index}" for index in range(self.stream_tokens))
+        choice = {"index": 0, "message": {"role": "assistant", "content": text}} if chat else {"index": 0, "text": text}
+        self._send_json(200, {
+            "object": "chat.completion" if chat else "text_completion",
+            "model": body.get("model", "stub-model"),
+            "choices": [{**choice, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": self.stream_tokens, "total_tokens": self.stream_tokens},
+        })
+
+
+def start_stub(port):
+    """Serve the stub upstream on a background thread."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubUpstream)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="stub-upstream", daemon=True).start()
+    return server
+
+
+def start_proxy(port, upstream_url, timeout):
+    """Start the RAG proxy pointed at the stub and wait until it answers."""
+    env = dict(os.environ, LITELLM_API_URL=upstream_url, RAG_PROXY_PORT=str(port), DEBUG="false")
+    process = subprocess.Popen([sys.executable, "app_mcp_rag.py"], cwd=ML_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Proxy exited: {process.stderr.read()[-2000:]}")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                return process
+        except requests.RequestException:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"Proxy did not start within {timeout}s")
+
+
+def parse_server_timing(header):
+    """Parse a Server-Timing header into {stage: milliseconds}."""
+    timings = {}
+    for entry in (header or "").split(","):
+        name, _, params = entry.strip().partition(";")
+        if name and params.startswith("dur="):
+            timings[name] = float(params[4:])
+    return timings
+
+
+def build_request(kind, query, stream):
+    """Return (path, body) for a request of the given kind."""
+    if kind == "chat":
+        return "/v1/chat/completions", {
+            "model": "stub-model",
+            "messages": [{"role": "user", "content": query}],
+            "stream": stream,
+        }
+    return "/rag/query", {"query": query, "k": 5}
+
+
+def percentiles(values):
+    """Return p50/p95/p99 and the mean of a list of milliseconds."""
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "mean": None}
+    values = sorted(values)
+
+    def rank(p):
+        return values[min(len(values) - 1, max(0, int(round(p / 100 * len(values))) - 1))]
+
+    return {"p50": rank(50), "p95": rank(95), "p99": rank(99), "mean": sum(values) / len(values)}
+
+
+def run_load(proxy_url, mix, rate, duration, concurrency, queries, stream, timeout, seed):
+    """Send requests open-loop at the given rate and collect per-request samples."""
+    rng = random.Random(seed)
+    kinds, weights = zip(*mix.items())
+    total = int(rate * duration)
+    plan = [(rng.choices(kinds, weights)[0], rng.choice(queries)) for _ in range(total)]
+    sessions = threading.local()
+    samples = []
+    samples_lock = threading.Lock()
+
+    def send(index, due, kind, query):
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        if not hasattr(sessions, "session"):
+            sessions.session = requests.Session()
+
+        path, body = build_request(kind, query, stream)
+        sample = {"kind": kind, "error": None}
+        sent = time.perf_counter()
+        try:
+            response = sessions.session.post(f"{proxy_url}{path}", json=body, timeout=timeout)
+            payload = response.json()
+            if response.status_code >= 400:
+                sample["error"] = f"HTTP {response.status_code}"
+            elif isinstance(payload, dict) and payload.get("error"):
+                sample["error"] = "upstream error"
+            sample["timings"] = parse_server_timing(response.headers.get("Server-Timing"))
+        except requests.RequestException as e:
+            sample["error"] = type(e).__name__
+        except ValueError:
+            sample["error"] = "invalid JSON"
+        done = time.perf_counter()
+        # Latency from when the request was due includes time spent waiting for a free worker
+        sample["latency_ms"] = (done - due) * 1000
+        sample["service_ms"] = (done - sent) * 1000
+        with samples_lock:
+            samples.append(sample)
+
+    start = time.perf_counter() + 0.1
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for index, (kind, query) in enumerate(plan):
+            pool.submit(send, index, start + index / rate, kind, query)
+    elapsed = time.perf_counter() - start
+    return samples, elapsed
+
+
+def summarize(samples, elapsed):
+    """Aggregate samples per endpoint kind."""
+    summary = {}
+    for kind in sorted({sample["kind"] for sample in samples}):
+        kind_samples = [sample for sample in samples if sample["kind"] == kind]
+        ok = [sample for sample in kind_samples if sample["error"] is None]
+        errors = {}
+        for sample in kind_samples:
+            if sample["error"]:
+                errors[sample["error"]] = errors.get(sample["error"], 0) + 1
+
+        retrieval, upstream, overhead = [], [], []
+        for sample in ok:
+            timings = sample.get("timings", {})
+            if kind == "chat":
+                retrieval_ms = timings.get("retrieval", 0.0)
+                upstream_ms = timings.get("upstream", 0.0)
+            else:
+                retrieval_ms, upstream_ms = sum(timings.values()), 0.0
+            retrieval.append(retrieval_ms)
+            upstream.append(upstream_ms)
+            overhead.append(max(0.0, sample["service_ms"] - retrieval_ms - upstream_ms))
+
+        summary[kind] = {
+            "requests": len(kind_samples),
+            "errors": errors,
+            "error_rate": (len(kind_samples) - len(ok)) / len(kind_samples),
+            "throughput_rps": len(ok) / elapsed if elapsed else 0,
+            "latency_ms": percentiles([sample["latency_ms"] for sample in ok]),
+            "service_ms": percentiles([sample["service_ms"] for sample in ok]),
+            "retrieval_ms": percentiles(retrieval),
+            "upstream_ms": percentiles(upstream),
+            "other_ms": percentiles(overhead),
+        }
+    return summary
+
+
+def parse_mix(spec):
+    """Parse "chat=3,query=1" into request weights."""
+    mix = {}
+    for entry in spec.split(","):
+        kind, _, weight = entry.partition("=")
+        if kind not in ("chat", "query"):
+            raise argparse.ArgumentTypeError(f"Unknown request kind: {kind}")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the RAG proxy against a stub LiteLLM upstream")
+    parser.add_argument("--proxy-url", help="Proxy to test; it must already point at the stub upstream")
+    parser.add_argument("--start-proxy", action="store_true", help="Start app_mcp_rag.py pointed at the stub")
+    parser.add_argument("--proxy-port", type=int, default=5101, help="Port for a proxy started with --start-proxy")
+    parser.add_argument("--upstream-port", type=int, default=8100, help="Port for the stub upstream")
+    parser.add_argument("--upstream-latency-ms", type=float, default=200, help="Mean stub response latency")
+    parser.add_argument("--upstream-jitter-ms", type=float, default=50, help="Standard deviation of the latency")
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0, help="Share of stub responses that fail")
+    parser.add_argument("--stream", action="store_true", help="Request streamed chat completions")
+    parser.add_argument("--stream-tokens", type=int, default=20, help="Tokens per stub completion")
+    parser.add_argument("--stream-token-ms", type=float, default=10, help="Delay between streamed tokens")
+    parser.add_argument("--mix", type=parse_mix, default={"chat": 1.0, "query": 1.0},
+                        help="Request mix, e.g. chat=3,query=1")
+    parser.add_argument("--rate", type=float, default=10, help="Requests per second")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load")
+    parser.add_argument("--concurrency", type=int, default=16, help="Maximum requests in flight")
+    parser.add_argument("--warmup", type=int, default=5, help="Requests sent before measuring")
+    parser.add_argument("--queries-file", help="File with one query per line")
+    parser.add_argument("--timeout", type=float, default=60, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=13, help="Seed for the request mix")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    if not args.proxy_url and not args.start_proxy:
+        parser.error("pass --proxy-url or --start-proxy")
+
+    StubUpstream.latency_ms = args.upstream_latency_ms
+    StubUpstream.jitter_ms = args.upstream_jitter_ms
+    StubUpstream.error_rate = args.upstream_error_rate
+    StubUpstream.stream_tokens = args.stream_tokens
+    StubUpstream.stream_token_ms = args.stream_token_ms
+    stub = start_stub(args.upstream_port)
+    upstream_url = f"http://127.0.0.1:{args.upstream_port}"
+    print(f"Stub upstream on {upstream_url} ({args.upstream_latency_ms:.0f}±{args.upstream_jitter_ms:.0f} ms)")
+
+    queries = DEFAULT_QUERIES
+    if args.queries_file:
+        with open(args.queries_file) as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    proxy = None
+    proxy_url = args.proxy_url
+    if args.start_proxy:
+        print("Starting the RAG proxy...")
+        proxy = start_proxy(args.proxy_port, upstream_url, timeout=300)
+        proxy_url = f"http://127.0.0.1:{args.proxy_port}"
+    proxy_url = proxy_url.rstrip("/")
+
+    try:
+        if args.warmup:
+            run_load(proxy_url, args.mix, rate=max(args.warmup, 1), duration=1, concurrency=1,
+                     queries=queries, stream=args.stream, timeout=args.timeout, seed=args.seed)
+
+        print(f"Sending {int(args.rate * args.duration)} requests at {args.rate:g}/s "
+              f"with up to {args.concurrency} in flight...")
+        samples, elapsed = run_load(proxy_url, args.mix, args.rate, args.duration, args.concurrency,
+                                    queries, args.stream, args.timeout, args.seed)
+    finally:
+        if proxy is not None:
+            proxy.terminate()
+            proxy.wait()
+        stub.shutdown()
+
+    summary = summarize(samples, elapsed)
+    for kind, stats in summary.items():
+        latency, retrieval, upstream = stats["latency_ms"], stats["retrieval_ms"], stats["upstream_ms"]
+        print(f"{kind:>6}: {stats['requests']} requests, {stats['throughput_rps']:.1f} ok/s, "
+              f"{stats['error_rate']:.1%} errors {stats['errors'] or ''}")
+        if latency["p50"] is not None:
+            print(f"        latency p50/p95/p99 {latency['p50']:.0f}/{latency['p95']:.0f}/{latency['p99']:.0f} ms, "
+                  f"retrieval p50/p95 {retrieval['p50']:.0f}/{retrieval['p95']:.0f} ms, "
+                  f"upstream p50/p95 {upstream['p50']:.0f}/{upstream['p95']:.0f} ms")
+
+    if args.output:
+        results = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "config": {key: value for key, value in vars(args).items() if key != "output"},
+            "elapsed_seconds": elapsed,
+            "upstream_requests": StubUpstream.requests_served,
+            "endpoints": summary,
+        }
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
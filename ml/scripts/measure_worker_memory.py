@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Measure how much memory a pre-fork server's workers share
+
+Reads /proc/<pid>/smaps_rollup for a master process and its children and
+reports RSS, PSS (each shared page divided among the processes mapping it),
+and the shared and private parts of each. The sum of RSS counts shared pages
+once per process; the sum of PSS is what the server actually costs. With the
+Whisper weights preloaded in the master, the total PSS of N workers should be
+close to one model plus N times the per-worker private memory rather than N
+times the model.
+
+Linux only. Usage:
+
+    gunicorn --config ml/gunicorn.conf.py ml.wsgi:app &
+    python ml/scripts/measure_worker_memory.py --pid $(pgrep -of "ml.wsgi:app")
+"""
+
+import sys
+import json
+import argparse
+from pathlib import Path
+
+FIELDS = ["Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty"]
+
+
+def memory(pid):
+    """Return the smaps_rollup fields of a process in MB."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in FIELDS:
+                values[name] = int(rest.split()[0]) / 1024
+    return {
+        "rss_mb": values["Rss"],
+        "pss_mb": values["Pss"],
+        "shared_mb": values["Shared_Clean"] + values["Shared_Dirty"],
+        "private_mb": values["Private_Clean"] + values["Private_Dirty"],
+    }
+
+
+def children(pid):
+    """Return the process IDs of a process's children."""
+    pids = []
+    for task in Path(f"/proc/{pid}/task").iterdir():
+        path = task / "children"
+        if path.exists():
+            pids.extend(int(child) for child in path.read_text().split())
+    return pids
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report shared and private memory of a master and its workers")
+    parser.add_argument("--pid", type=int, required=True, help="Process ID of the master")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    if not Path(f"/proc/{args.pid}/smaps_rollup").exists():
+        sys.exit(f"No smaps_rollup for process {args.pid} (Linux 4.14+ only)")
+
+    processes = [{"pid": args.pid, "role": "master", **memory(args.pid)}]
+    processes += [{"pid": pid, "role": "worker", **memory(pid)} for pid in children(args.pid)]
+    workers = [process for process in processes if process["role"] == "worker"]
+
+    print(f"{'pid':>8} {'role':>7} {'RSS':>9} {'PSS':>9} {'shared':>9} {'private':>9}")
+    for process in processes:
+        print(f"{process['pid']:>8} {process['role']:>7} {process['rss_mb']:>7.0f}MB {process['pss_mb']:>7.0f}MB "
+              f"{process['shared_mb']:>7.0f}MB {process['private_mb']:>7.0f}MB")
+
+    totals = {
+        "workers": len(workers),
+        "rss_sum_mb": sum(process["rss_mb"] for process in processes),
+        "pss_sum_mb": sum(process["pss_mb"] for process in processes),
+        "worker_private_mean_mb": sum(p["private_mb"] for p in workers) / len(workers) if workers else None,
+    }
+    print(f"\n{totals['workers']} workers: sum of RSS {totals['rss_sum_mb']:.0f} MB, "
+          f"sum of PSS (actual cost) {totals['pss_sum_mb']:.0f} MB")
+    if workers:
+        print(f"Private memory per worker: {totals['worker_private_mean_mb']:.0f} MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"processes": processes, "totals": totals}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
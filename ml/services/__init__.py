@@ -3,7 +3,13 @@ ML service modules.
 This directory contains service modules for the ML service.
 """
 
-# Export YouTubeTranscriber for easier imports
-from .youtube_transcriber import YouTubeTranscriber
-
+# Export YouTubeTranscriber for easier imports. It is resolved on first access
+# so importing a lighter service does not load the transcriber module.
 __all__ = ["YouTubeTranscriber"]
+
+
+def __getattr__(name):
+    if name == "YouTubeTranscriber":
+        from .youtube_transcriber import YouTubeTranscriber
+        return YouTubeTranscriber
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Duration-based admission control for transcription jobs
+"""
+
+import os
+import math
+import logging
+from functools import lru_cache
+from typing import Dict, Any, Optional, List, Tuple
+
+from .captions import select_track
+from .metrics import ADMISSION_DECISIONS
+from .transcript_store import TranscriptStore, get_transcript_store
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Admission decisions
+ACCEPT = "accept"
+QUEUE = "queue"
+REJECT = "reject"
+
+DEFAULT_WHISPER_MODEL = "base"
+
+# Fallback transcription seconds per audio second on CPU, used until a model has history
+DEFAULT_REAL_TIME_FACTORS = {
+    "tiny": 0.1,
+    "base": 0.2,
+    "small": 0.6,
+    "medium": 1.5,
+    "large": 3.0,
+}
+
+
+def parse_model_policy(spec: str) -> List[Tuple[float, str]]:
+    """Parse a duration policy such as ``"600:small,3600:base,inf:tiny"``.
+
+    Each entry maps a maximum duration in seconds to the Whisper model used
+    for videos up to that length.
+
+    Returns:
+        List[Tuple[float, str]]: (max seconds, model) pairs sorted by duration
+    """
+    policy = []
+    for entry in spec.split(","):
+        if not entry.strip():
+            continue
+        limit, model = entry.split(":", 1)
+        policy.append((float(limit), model.strip()))
+    return sorted(policy)
+
+
+class AdmissionController:
+    def __init__(self, max_duration: Optional[float] = None, queue_duration: Optional[float] = None,
+                 model_policy: Optional[List[Tuple[float, str]]] = None,
+                 store: Optional[TranscriptStore] = None):
+        """Decide whether, and with which model, a video should be transcribed.
+
+        Args:
+            max_duration (float, optional): Longer videos are rejected. Defaults to
+                TRANSCRIBE_MAX_DURATION_SECONDS or 4 hours (0 disables)
+            queue_duration (float, optional): Longer videos are queued as background
+                jobs instead of blocking the request. Defaults to
+                TRANSCRIBE_QUEUE_DURATION_SECONDS or 1 hour (0 disables)
+            model_policy (List[Tuple[float, str]], optional): Model per duration, used
+                when the request does not name one. Defaults to TRANSCRIBE_MODEL_POLICY
+            store (TranscriptStore, optional): Source of historical real-time factors
+        """
+        self.max_duration = max_duration if max_duration is not None else float(
+            os.environ.get("TRANSCRIBE_MAX_DURATION_SECONDS", 4 * 3600))
+        self.queue_duration = queue_duration if queue_duration is not None else float(
+            os.environ.get("TRANSCRIBE_QUEUE_DURATION_SECONDS", 3600))
+        self.model_policy = model_policy if model_policy is not None else parse_model_policy(
+            os.environ.get("TRANSCRIBE_MODEL_POLICY", ""))
+        self.store = store or get_transcript_store()
+
+    def select_model(self, duration: Optional[float], requested: Optional[str] = None) -> str:
+        """Return the requested model, or the policy's model for this duration."""
+        if requested and requested != "auto":
+            return requested
+        if duration is not None:
+            for limit, model in self.model_policy:
+                if duration <= limit:
+                    return model
+        return DEFAULT_WHISPER_MODEL
+
+    def estimate(self, duration: Optional[float], model: str) -> Dict[str, Any]:
+        """Estimate transcription time from the model's recent real-time factor."""
+        history = self.store.real_time_factors().get(model)
+        if history:
+            rtf, source = history["real_time_factor"], f"{history['runs']} recent runs"
+        else:
+            rtf, source = DEFAULT_REAL_TIME_FACTORS.get(model, 1.0), "default"
+        return {
+            "real_time_factor": rtf,
+            "real_time_factor_source": source,
+            "eta_seconds": duration * rtf if duration is not None else None,
+        }
+
+    def decide(self, probe: Dict[str, Any], requested_model: Optional[str] = None,
+               use_captions: bool = False, allow_auto_captions: bool = False,
+               language: Optional[str] = None, info: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Make an admission decision for a probed video.
+
+        Videos of any length are accepted when the request will be served from
+        a caption track that exists; otherwise the Whisper duration limits apply.
+
+        Args:
+            probe (Dict[str, Any]): Result of YouTubeTranscriber.probe
+            requested_model (str, optional): Model named by the request ("auto" or None
+                lets the duration policy choose)
+            use_captions (bool): Whether the request will use captions when available
+            allow_auto_captions (bool): Whether automatic captions are acceptable
+            language (str, optional): Language requested for the captions
+            info (Dict[str, Any], optional): The yt-dlp metadata the probe was built from,
+                needed to find a caption track
+
+        Returns:
+            Dict[str, Any]: ``action`` (accept, queue or reject), ``reason``,
+                ``whisper_model`` and the completion estimate
+        """
+        duration = probe.get("duration")
+        model = self.select_model(duration, requested_model)
+        decision = {"action": ACCEPT, "reason": None, "duration": duration, "whisper_model": model}
+
+        # The same track process_video will fetch, so a video without one is not admitted on its account
+        track = select_track(info, language, allow_auto_captions) if use_captions and info else None
+        if track is not None:
+            # Captions are fetched, not decoded, so their cost does not grow with duration
+            kind, lang, _ = track
+            decision.update({"reason": f"captions available ({kind}, {lang})", "real_time_factor": 0.0,
+                             "real_time_factor_source": "captions", "eta_seconds": 0.0})
+            ADMISSION_DECISIONS.labels(ACCEPT).inc()
+            return decision
+
+        decision.update(self.estimate(duration, model))
+        if probe.get("is_live"):
+            decision.update({"action": REJECT, "reason": "live streams cannot be transcribed until they end"})
+        elif duration is None:
+            decision["reason"] = "duration unknown"
+        elif self.max_duration and duration > self.max_duration:
+            decision.update({"action": REJECT,
+                             "reason": f"duration {duration:.0f}s exceeds the {self.max_duration:.0f}s limit"})
+        elif self.queue_duration and duration > self.queue_duration:
+            decision.update({"action": QUEUE,
+                             "reason": f"duration {duration:.0f}s exceeds {self.queue_duration:.0f}s, "
+                                       f"running as a background job"})
+
+        ADMISSION_DECISIONS.labels(decision["action"]).inc()
+        eta = decision["eta_seconds"]
+        logger.info(f"Admission: {decision['action']} {probe.get('video_id')} "
+                    f"(duration {'unknown' if duration is None else f'{duration:.0f}s'}, {model}, "
+                    f"ETA {'unknown' if eta is None else f'{math.ceil(eta)}s'})")
+        return decision
+
+
+@lru_cache(maxsize=None)
+def get_admission_controller() -> AdmissionController:
+    """Return the process-wide admission controller."""
+    return AdmissionController()
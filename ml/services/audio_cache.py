@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Disk-quota-aware cache for downloaded audio files
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+import weakref
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Any, Optional, Set
+
+from .metrics import AUDIO_CACHE_LOOKUPS, AUDIO_CACHE_EVICTIONS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "cache-index.db"
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".codexcontinue/temp/youtube")
+# Files still being written: pipelined downloads, yt-dlp partial and resume-state files
+PARTIAL_SUFFIXES = (".tmp", ".part", ".ytdl")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    name TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS entries_last_access ON entries(last_access);
+
+CREATE TABLE IF NOT EXISTS pins (
+    name TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (name, pid)
+);
+
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+COUNTERS = ("hits", "misses", "evictions", "evicted_bytes")
+
+
+def is_cache_file(name: str) -> bool:
+    """Whether a file in the cache directory is a complete cache entry."""
+    return (not name.startswith("cache-index") and not name.endswith(PARTIAL_SUFFIXES)
+            and ".part-Frag" not in name)
+
+
+def process_alive(pid: int) -> bool:
+    """Whether a process exists, so pins of crashed workers can be ignored."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class AudioCache:
+    def __init__(self, cache_dir: str, max_bytes: int, max_age_days: float = 7.0):
+        """Initialize the audio cache.
+
+        Entry sizes, last-access times, pins and hit counts are kept in a SQLite
+        index in the cache directory, so every worker process sharing the directory
+        sees the same state and the quota holds across all of them. Eviction never
+        has to scan the directory; it is scanned once here to pick up files the
+        index does not know about.
+
+        Args:
+            cache_dir (str): Directory holding the cached files
+            max_bytes (int): Byte quota; least recently used entries are evicted above it
+            max_age_days (float): Entries unused for longer are evicted (0 disables)
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_days * 86400
+        self.index_path = os.path.join(cache_dir, INDEX_FILENAME)
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._local = threading.local()
+        self._cleanup_thread: Optional[threading.Thread] = None
+        self._cleanup_pid: Optional[int] = None
+        self._cleanup_interval: Optional[float] = None
+        self._stop_event = threading.Event()
+
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            conn.executemany("INSERT OR IGNORE INTO counters (name, value) VALUES (?, 0)",
+                             [(name,) for name in COUNTERS])
+        self._load_index()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection to the index, reopening it after a fork."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """Run statements in a write transaction, serialized across processes."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _load_index(self):
+        """Reconcile the index with the directory contents."""
+        on_disk = {}
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and is_cache_file(entry.name):
+                stat = entry.stat()
+                on_disk[entry.name] = (stat.st_size, stat.st_mtime)
+
+        # Trust the index for access times, the directory for existence and size
+        with self._transaction() as conn:
+            known = {row["name"] for row in conn.execute("SELECT name FROM entries")}
+            for name, (size, mtime) in on_disk.items():
+                if name in known:
+                    conn.execute("UPDATE entries SET size = ? WHERE name = ?", (size, name))
+                else:
+                    conn.execute("INSERT INTO entries (name, size, last_access) VALUES (?, ?, ?)",
+                                 (name, size, mtime))
+            conn.executemany("DELETE FROM entries WHERE name = ?", [(name,) for name in known - set(on_disk)])
+
+        logger.info(f"Audio cache loaded: {len(on_disk)} entries, {self.total_bytes()} bytes")
+
+    def _count(self, conn: sqlite3.Connection, name: str, amount: int = 1):
+        conn.execute("UPDATE counters SET value = value + ? WHERE name = ?", (amount, name))
+
+    def path_for(self, name: str) -> str:
+        """Return the path of a cache entry."""
+        return os.path.join(self.cache_dir, name)
+
+    def lookup(self, name: str) -> Optional[str]:
+        """Return the path of a cached entry and mark it used, or None on a miss."""
+        path = self.path_for(name)
+        with self._transaction() as conn:
+            hit = os.path.exists(path) and conn.execute(
+                "UPDATE entries SET last_access = ? WHERE name = ?", (time.time(), name)).rowcount > 0
+            if hit:
+                self._count(conn, "hits")
+            else:
+                conn.execute("DELETE FROM entries WHERE name = ?", (name,))
+                self._count(conn, "misses")
+        AUDIO_CACHE_LOOKUPS.labels("hit" if hit else "miss").inc()
+        return path if hit else None
+
+    def add(self, name: str) -> str:
+        """Register a file written into the cache directory and enforce the quota."""
+        path = self.path_for(name)
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (name, size, last_access) VALUES (?, ?, ?)",
+                (name, os.path.getsize(path), time.time())
+            )
+        self.evict(protect=name)
+        return path
+
+    def pin(self, name: str):
+        """Keep an entry from being evicted, by any process, until it is unpinned."""
+        with self._transaction() as conn:
+            conn.execute(
+                """
+                INSERT INTO pins (name, pid, count) VALUES (?, ?, 1)
+                ON CONFLICT(name, pid) DO UPDATE SET count = count + 1
+                """,
+                (name, os.getpid())
+            )
+
+    def unpin(self, name: str):
+        """Release one pin taken by pin."""
+        with self._transaction() as conn:
+            conn.execute("UPDATE pins SET count = count - 1 WHERE name = ? AND pid = ?", (name, os.getpid()))
+            conn.execute("DELETE FROM pins WHERE name = ? AND pid = ? AND count <= 0", (name, os.getpid()))
+
+    def remove(self, name: str):
+        """Drop an entry and its file, e.g. an intermediate file that is no longer needed."""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM entries WHERE name = ?", (name,))
+        try:
+            os.remove(self.path_for(name))
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def pinned(self, name: str):
+        """Keep an entry from being evicted while it is in use."""
+        self.pin(name)
+        try:
+            yield self.path_for(name)
+        finally:
+            self.unpin(name)
+
+    def _pinned_names(self, conn: sqlite3.Connection) -> Set[str]:
+        """Return the pinned entries, dropping pins held by processes that no longer exist."""
+        pinned = set()
+        for row in conn.execute("SELECT DISTINCT name, pid FROM pins").fetchall():
+            if process_alive(row["pid"]):
+                pinned.add(row["name"])
+            else:
+                conn.execute("DELETE FROM pins WHERE pid = ?", (row["pid"],))
+        return pinned
+
+    def total_bytes(self) -> int:
+        """Return the bytes currently held by the cache."""
+        row = self._connect().execute("SELECT COALESCE(SUM(size), 0) AS total FROM entries").fetchone()
+        return int(row["total"])
+
+    def evict(self, protect: Optional[str] = None) -> int:
+        """Evict expired entries, then least recently used ones until under quota.
+
+        Args:
+            protect (str, optional): Entry that must not be evicted (e.g. just added)
+
+        Returns:
+            int: Number of entries evicted
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            pinned = self._pinned_names(conn)
+            total = self.total_bytes()
+            victims = []
+            for row in conn.execute("SELECT name, size, last_access FROM entries ORDER BY last_access").fetchall():
+                if row["name"] == protect or row["name"] in pinned:
+                    continue
+                expired = self.max_age_seconds > 0 and now - row["last_access"] > self.max_age_seconds
+                if not expired and total <= self.max_bytes:
+                    break
+                victims.append(row["name"])
+                total -= row["size"]
+                self._count(conn, "evictions")
+                self._count(conn, "evicted_bytes", row["size"])
+            conn.executemany("DELETE FROM entries WHERE name = ?", [(name,) for name in victims])
+
+        for name in victims:
+            try:
+                os.remove(self.path_for(name))
+                logger.debug(f"Evicted cached audio: {name}")
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Error evicting cached audio {name}: {str(e)}")
+
+        if victims:
+            AUDIO_CACHE_EVICTIONS.inc(len(victims))
+            logger.info(f"Evicted {len(victims)} cached audio files")
+        return len(victims)
+
+    def start_background_cleanup(self, interval_seconds: float = 300.0):
+        """Evict on a schedule instead of on the request path, in every process using the cache."""
+        if self._cleanup_thread is not None and self._cleanup_pid == os.getpid():
+            return
+
+        def run():
+            while not self._stop_event.wait(interval_seconds):
+                try:
+                    self.evict()
+                except Exception as e:
+                    logger.warning(f"Error during audio cache cleanup: {str(e)}")
+
+        self._cleanup_pid = os.getpid()
+        self._cleanup_interval = interval_seconds
+        self._cleanup_thread = threading.Thread(target=run, name="audio-cache-cleanup", daemon=True)
+        self._cleanup_thread.start()
+        _scheduled_caches.add(self)
+
+    def _restart_cleanup(self):
+        if self._cleanup_interval is not None and not self._stop_event.is_set():
+            self.start_background_cleanup(self._cleanup_interval)
+
+    def stop(self):
+        """Stop the background cleanup."""
+        self._stop_event.set()
+        if self._cleanup_thread is not None and self._cleanup_pid == os.getpid():
+            self._cleanup_thread.join()
+        self._cleanup_thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Report cache occupancy and effectiveness, across every process using the cache."""
+        conn = self._connect()
+        counters = {row["name"]: row["value"] for row in conn.execute("SELECT name, value FROM counters")}
+        entries = conn.execute("SELECT COUNT(*) AS n FROM entries").fetchone()["n"]
+        pinned = conn.execute("SELECT COUNT(DISTINCT name) AS n FROM pins").fetchone()["n"]
+        used = self.total_bytes()
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "entries": entries,
+            "bytes": used,
+            "max_bytes": self.max_bytes,
+            "occupancy": used / self.max_bytes if self.max_bytes else 0.0,
+            "pinned": pinned,
+            "hits": counters["hits"],
+            "misses": counters["misses"],
+            "hit_ratio": counters["hits"] / lookups if lookups else 0.0,
+            "evictions": counters["evictions"],
+            "evicted_bytes": counters["evicted_bytes"],
+        }
+
+
+# Caches with a cleanup schedule. Threads do not survive a fork, so each restarts its schedule
+# in the child (gunicorn workers forked from a preloaded app).
+_scheduled_caches: "weakref.WeakSet[AudioCache]" = weakref.WeakSet()
+
+
+def _restart_cleanups():
+    for cache in list(_scheduled_caches):
+        cache._restart_cleanup()
+
+
+os.register_at_fork(after_in_child=_restart_cleanups)
+
+
+@lru_cache(maxsize=None)
+def get_audio_cache(cache_dir: str = DEFAULT_CACHE_DIR) -> AudioCache:
+    """Return the process-wide cache for a directory, starting its cleanup schedule."""
+    cache = AudioCache(
+        cache_dir,
+        max_bytes=int(os.environ.get("AUDIO_CACHE_MAX_BYTES", 5 * 1024 ** 3)),
+        max_age_days=float(os.environ.get("AUDIO_CACHE_MAX_AGE_DAYS", 7))
+    )
+    cache.start_background_cleanup(float(os.environ.get("AUDIO_CACHE_CLEANUP_INTERVAL", 300)))
+    return cache
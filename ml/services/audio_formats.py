@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Pick the smallest YouTube stream that still carries speech well enough for Whisper
+"""
+
+import os
+import logging
+from typing import Dict, Any, Iterator, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Whisper resamples everything to 16 kHz mono, which speech codecs carry cleanly
+# at 32-48 kbps. Streams below this bitrate start to lose consonants.
+DEFAULT_MIN_ABR_KBPS = 32
+
+# Codecs by efficiency at speech bitrates, best first
+CODEC_PREFERENCE = ["opus", "mp4a", "aac", "vorbis", "mp3"]
+
+
+def _codec_rank(fmt: Dict[str, Any]) -> int:
+    acodec = (fmt.get("acodec") or "").lower()
+    for rank, codec in enumerate(CODEC_PREFERENCE):
+        if acodec.startswith(codec):
+            return rank
+    return len(CODEC_PREFERENCE)
+
+
+def _bitrate(fmt: Dict[str, Any]) -> Optional[float]:
+    return fmt.get("abr") or fmt.get("tbr")
+
+
+def estimated_size(fmt: Dict[str, Any], duration: Optional[float] = None) -> Optional[float]:
+    """Return a format's size in bytes, estimated from its bitrate when yt-dlp does not report it."""
+    size = fmt.get("filesize") or fmt.get("filesize_approx")
+    if size:
+        return size
+    bitrate = _bitrate(fmt)
+    if bitrate and duration:
+        return bitrate * 1000 / 8 * duration
+    return None
+
+
+def is_audio_only(fmt: Dict[str, Any]) -> bool:
+    """Whether a format is an audio stream without video."""
+    return fmt.get("acodec") not in (None, "none") and fmt.get("vcodec") in (None, "none")
+
+
+def select_speech_format(formats: List[Dict[str, Any]], duration: Optional[float] = None,
+                         min_abr: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """Choose the stream to download for transcription.
+
+    Prefers the smallest audio-only stream at or above ``min_abr``. If every
+    audio-only stream is below the floor, the one closest to it is used. Videos
+    without audio-only streams fall back to the smallest stream with audio.
+    Ties go to the more efficient codec, and dynamic-range-compressed variants
+    are only used when nothing else is available.
+
+    Args:
+        formats (List[Dict[str, Any]]): yt-dlp format dictionaries
+        duration (float, optional): Video duration, used to estimate missing sizes
+        min_abr (float, optional): Lowest acceptable audio bitrate in kbps. Defaults to the
+            TRANSCRIBE_MIN_AUDIO_KBPS environment variable or 32.
+
+    Returns:
+        Optional[Dict[str, Any]]: The chosen format, or None if no format has audio
+    """
+    if min_abr is None:
+        min_abr = float(os.getenv("TRANSCRIBE_MIN_AUDIO_KBPS", DEFAULT_MIN_ABR_KBPS))
+
+    with_audio = [fmt for fmt in formats if fmt.get("acodec") not in (None, "none")]
+    preferred = [fmt for fmt in with_audio if "drc" not in (fmt.get("format_id") or "")]
+    with_audio = preferred or with_audio
+
+    def smallest(fmt):
+        # Formats of unknown size sort after the others, by bitrate
+        size = estimated_size(fmt, duration)
+        return (size is None, size or 0, _bitrate(fmt) or float("inf"), _codec_rank(fmt))
+
+    audio_only = [fmt for fmt in with_audio if is_audio_only(fmt)]
+    if audio_only:
+        above_floor = [fmt for fmt in audio_only if (_bitrate(fmt) or 0) >= min_abr]
+        if above_floor:
+            return min(above_floor, key=smallest)
+        # Everything is below the floor: take the best of what there is
+        return max(audio_only, key=lambda fmt: (_bitrate(fmt) or 0, -_codec_rank(fmt)))
+    if with_audio:
+        return min(with_audio, key=smallest)
+    return None
+
+
+def speech_format_selector(min_abr: Optional[float] = None, duration: Optional[float] = None):
+    """Return a yt-dlp ``format`` callable that selects with select_speech_format.
+
+    yt-dlp passes the callable the formats but not the video's metadata, so the
+    duration used to estimate missing sizes has to be given here.
+    """
+    def selector(ctx: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        formats = ctx["formats"]
+        fmt = select_speech_format(formats, duration, min_abr)
+        if fmt is not None:
+            logger.info(f"Selected format {fmt.get('format_id')} ({fmt.get('acodec')}, "
+                        f"{_bitrate(fmt) or '?'} kbps, ~{(estimated_size(fmt, duration) or 0) / 1e6:.1f} MB)")
+            yield fmt
+    return selector
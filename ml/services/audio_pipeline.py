@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Overlapped download, decode and transcription of a single video
+"""
+
+import os
+import time
+import logging
+import threading
+import subprocess
+from typing import Dict, Any, Iterator, List, Optional
+
+import requests
+
+from .decoding_guard import transcribe_windows
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+BYTES_PER_SAMPLE = 2  # 16-bit PCM
+WINDOW_SECONDS = 30
+# Range requests of this size avoid the throttling YouTube applies to long single responses
+HTTP_CHUNK_BYTES = 10 * 1024 * 1024
+READ_BLOCK_BYTES = 64 * 1024
+
+
+class GrowingFile:
+    def __init__(self, path: str):
+        """A file written by one thread and read by another while it grows.
+
+        Args:
+            path (str): File the writer appends to
+        """
+        self.path = path
+        self.size = 0
+        self.finished = False
+        self.cancelled = False
+        self.error: Optional[Exception] = None
+        self._condition = threading.Condition()
+
+    def cancel(self):
+        """Ask the writer to stop."""
+        self.cancelled = True
+
+    def appended(self, size: int):
+        """Record that the writer has flushed ``size`` more bytes."""
+        with self._condition:
+            self.size += size
+            self._condition.notify_all()
+
+    def finish(self, error: Optional[Exception] = None):
+        """Record that the writer is done, successfully or not."""
+        with self._condition:
+            self.finished = True
+            self.error = error
+            self._condition.notify_all()
+
+    def chunks(self) -> Iterator[bytes]:
+        """Yield the file's bytes as they are written, until the writer finishes."""
+        offset = 0
+        with open(self.path, "rb") as f:
+            while True:
+                with self._condition:
+                    while offset >= self.size and not self.finished:
+                        self._condition.wait()
+                    if self.error is not None:
+                        raise self.error
+                    available = self.size - offset
+                if available <= 0:
+                    return
+                data = f.read(min(available, READ_BLOCK_BYTES))
+                offset += len(data)
+                yield data
+
+
+class PcmRingBuffer:
+    def __init__(self, capacity_seconds: float):
+        """A bounded buffer of 16 kHz mono 16-bit PCM addressed by absolute sample position.
+
+        The producer blocks when ``capacity_seconds`` of audio are buffered, which
+        backs pressure up into the decoder; the consumer discards what it has
+        transcribed to make room.
+
+        Args:
+            capacity_seconds (float): Most audio held at once. Must exceed one window.
+        """
+        self.capacity = int(capacity_seconds * SAMPLE_RATE) * BYTES_PER_SAMPLE
+        self._data = bytearray()
+        self._start = 0  # Byte position of _data[0] in the stream
+        self.finished = False
+        self.error: Optional[Exception] = None
+        self._condition = threading.Condition()
+
+    @property
+    def total_samples(self) -> int:
+        """Samples written so far."""
+        return (self._start + len(self._data)) // BYTES_PER_SAMPLE
+
+    def write(self, data: bytes):
+        """Append PCM bytes, waiting while the buffer is full. Dropped once the buffer is closed."""
+        with self._condition:
+            while len(self._data) >= self.capacity and not self.finished:
+                self._condition.wait()
+            if self.finished:
+                return
+            self._data.extend(data)
+            self._condition.notify_all()
+
+    def close(self, error: Optional[Exception] = None):
+        """Mark the end of the stream, or a failure upstream."""
+        with self._condition:
+            self.finished = True
+            self.error = error
+            self._condition.notify_all()
+
+    def read(self, start: int, samples: int):
+        """Return up to ``samples`` float32 samples from ``start``, waiting until they are decoded.
+
+        Fewer samples are returned only at the end of the stream.
+        """
+        import numpy as np
+
+        begin = start * BYTES_PER_SAMPLE
+        end = begin + samples * BYTES_PER_SAMPLE
+        with self._condition:
+            while self._start + len(self._data) < end and not self.finished:
+                self._condition.wait()
+            if self.error is not None:
+                raise self.error
+            chunk = bytes(self._data[begin - self._start:end - self._start])
+        return np.frombuffer(chunk, np.int16).astype(np.float32) / 32768.0
+
+    def discard(self, before: int):
+        """Drop the samples before ``before`` and wake a blocked producer."""
+        with self._condition:
+            drop = before * BYTES_PER_SAMPLE - self._start
+            if drop > 0:
+                del self._data[:drop]
+                self._start += drop
+                self._condition.notify_all()
+
+
+def stream_download(url: str, headers: Dict[str, str], target: GrowingFile, stats: Dict[str, Any]):
+    """Download a media URL into a growing file with ranged requests, resuming after errors."""
+    offset, total, retries = 0, None, 0
+    stats["download_started"] = time.time()
+    try:
+        with open(target.path, "wb") as f, requests.Session() as session:
+            while total is None or offset < total:
+                end = offset + HTTP_CHUNK_BYTES - 1
+                try:
+                    response = session.get(url, headers={**headers, "Range": f"bytes={offset}-{end}"},
+                                           stream=True, timeout=30)
+                    response.raise_for_status()
+                    content_range = response.headers.get("Content-Range", "")
+                    if "/" in content_range and content_range.rsplit("/", 1)[1].isdigit():
+                        total = int(content_range.rsplit("/", 1)[1])
+                    received = 0
+                    for data in response.iter_content(READ_BLOCK_BYTES):
+                        if target.cancelled:
+                            raise RuntimeError("Download cancelled")
+                        f.write(data)
+                        f.flush()
+                        received += len(data)
+                        offset += len(data)
+                        target.appended(len(data))
+                    if total is None and (response.status_code == 200 or received < HTTP_CHUNK_BYTES):
+                        break  # The server ignored the range or this was the last chunk
+                except requests.RequestException as e:
+                    retries += 1
+                    if retries > 3:
+                        raise
+                    logger.warning(f"Download interrupted at byte {offset}, resuming: {str(e)}")
+        stats["bytes_downloaded"] = offset
+        stats["download_finished"] = time.time()
+        target.finish()
+    except Exception as e:
+        stats["download_finished"] = time.time()
+        target.finish(e)
+
+
+def decode_to_pcm(ffmpeg: str, source: GrowingFile, buffer: PcmRingBuffer, stats: Dict[str, Any]):
+    """Decode a growing media file to 16 kHz mono PCM with ffmpeg, feeding it through a pipe."""
+    process = subprocess.Popen(
+        [ffmpeg, "-loglevel", "error", "-i", "pipe:0", "-f", "s16le", "-ac", "1",
+         "-ar", str(SAMPLE_RATE), "pipe:1"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    stats["decode_started"] = time.time()
+    feed_error: List[Exception] = []
+
+    def feed():
+        try:
+            for data in source.chunks():
+                process.stdin.write(data)
+        except Exception as e:
+            feed_error.append(e)
+        finally:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+
+    feeder = threading.Thread(target=feed, name="ffmpeg-feed", daemon=True)
+    feeder.start()
+    try:
+        while True:
+            data = process.stdout.read(READ_BLOCK_BYTES)
+            if not data:
+                break
+            buffer.write(data)
+        feeder.join()
+        returncode = process.wait()
+        stats["decode_finished"] = time.time()
+        if feed_error:
+            raise feed_error[0]
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg failed: {process.stderr.read().decode(errors='replace').strip()}")
+        buffer.close()
+    except Exception as e:
+        process.kill()
+        stats["decode_finished"] = time.time()
+        buffer.close(e)
+
+
+def transcribe_stream(model, buffer: PcmRingBuffer, language: Optional[str], stats: Dict[str, Any],
+                      guard=None, **options) -> Dict[str, Any]:
+    """Transcribe PCM from a ring buffer window by window as it is decoded.
+
+    Each 30-second window is transcribed by transcribe_windows as soon as it is
+    available, and dropped from the buffer once transcribed. A DecodingGuard passed
+    as ``guard`` decodes every window and marks the ones it skips as gaps in the result.
+
+    Returns:
+        Dict[str, Any]: ``text``, ``segments`` and ``language``, as ``model.transcribe`` returns
+    """
+    stats["transcribe_busy_seconds"] = 0.0
+    stats["transcribe_busy_before_download_finished"] = 0.0
+
+    def read(seek: int, samples: int):
+        audio = buffer.read(seek, samples)
+        return audio, buffer.finished and seek + len(audio) >= buffer.total_samples
+
+    def on_window(seek: int, busy: float):
+        stats["transcribe_busy_seconds"] += busy
+        if "download_finished" not in stats:
+            stats["transcribe_busy_before_download_finished"] += busy
+        stats.setdefault("first_window_seconds", time.time() - stats["started"])
+        buffer.discard(seek)
+
+    return transcribe_windows(model, read, language, guard, on_window, **options)
+
+
+def pipelined_transcription(model, media_url: str, headers: Dict[str, str], cache_path: str, ffmpeg: str,
+                            language: Optional[str] = None, buffer_seconds: Optional[float] = None,
+                            guard=None, **options) -> Dict[str, Any]:
+    """Download, decode and transcribe a media URL with the three stages overlapping.
+
+    The download is written to ``cache_path`` + ".tmp" and renamed to ``cache_path``
+    when complete, so the audio cache keeps it for later requests.
+
+    Args:
+        model: Loaded Whisper model
+        media_url (str): Direct URL of the audio stream
+        headers (Dict[str, str]): HTTP headers the stream requires
+        cache_path (str): Where the downloaded stream is kept
+        ffmpeg (str): Path of the ffmpeg executable
+        language (str, optional): Language code; detected from the first window if not given
+        buffer_seconds (float, optional): Decoded audio held in memory at most. Defaults to the
+            TRANSCRIBE_PIPELINE_BUFFER_SECONDS environment variable or 600.
+        guard (DecodingGuard, optional): Skips windows that fall into repetition loops
+
+    Returns:
+        Dict[str, Any]: The transcription plus ``pipeline`` timings: download, decode and
+            transcribe seconds, their overlap and the time to the first transcribed window
+    """
+    if buffer_seconds is None:
+        buffer_seconds = float(os.getenv("TRANSCRIBE_PIPELINE_BUFFER_SECONDS", 600))
+    stats: Dict[str, Any] = {"started": time.time()}
+    download = GrowingFile(cache_path + ".tmp")
+    buffer = PcmRingBuffer(max(buffer_seconds, 2 * WINDOW_SECONDS))
+
+    # The decoder opens the file for reading, so it must exist before the decoder starts
+    open(download.path, "wb").close()
+    downloader = threading.Thread(target=stream_download, args=(media_url, headers, download, stats),
+                                  name="pipeline-download", daemon=True)
+    decoder = threading.Thread(target=decode_to_pcm, args=(ffmpeg, download, buffer, stats),
+                               name="pipeline-decode", daemon=True)
+    downloader.start()
+    decoder.start()
+    try:
+        result = transcribe_stream(model, buffer, language, stats, guard, **options)
+    except Exception:
+        # Stop the download and let the decoder drain, then drop the partial file
+        download.cancel()
+        buffer.close()
+        downloader.join()
+        decoder.join()
+        if os.path.exists(download.path):
+            os.remove(download.path)
+        raise
+    downloader.join()
+    decoder.join()
+    if download.error is not None:
+        raise download.error
+    os.replace(download.path, cache_path)
+
+    finished = time.time()
+    download_seconds = stats["download_finished"] - stats["download_started"]
+    decode_seconds = stats["decode_finished"] - stats["decode_started"]
+    total = finished - stats["started"]
+    result["pipeline"] = {
+        "download_seconds": download_seconds,
+        "decode_seconds": decode_seconds,
+        "transcribe_seconds": stats["transcribe_busy_seconds"],
+        "pipeline_seconds": total,
+        # Transcription that ran while the download was still in progress
+        "transcribe_during_download_seconds": stats["transcribe_busy_before_download_finished"],
+        # Time saved against running the stages back to back
+        "overlap_seconds": max(0.0, download_seconds + stats["transcribe_busy_seconds"] - total),
+        "first_window_seconds": stats.get("first_window_seconds"),
+        "bytes_downloaded": stats.get("bytes_downloaded"),
+        "audio_seconds": buffer.total_samples / SAMPLE_RATE,
+    }
+    return result
@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+"""
+Batch transcription of YouTube playlists and channels
+"""
+
+import os
+import json
+import time
+import uuid
+import queue
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import Dict, Any, Optional, List
+
+from .admission import get_admission_controller
+from .decode_presets import resolve_decode_options
+from .metrics import STAGE_SECONDS, REAL_TIME_FACTOR
+from .transcript_store import get_transcript_store
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Item states, in pipeline order; a job is PENDING, then RUNNING, then DONE or FAILED
+PENDING = "pending"
+DOWNLOADING = "downloading"
+DOWNLOADED = "downloaded"
+TRANSCRIBING = "transcribing"
+DONE = "done"
+FAILED = "failed"
+RUNNING = "running"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS batch_jobs (
+    job_id TEXT PRIMARY KEY,
+    source_url TEXT NOT NULL,
+    status TEXT NOT NULL,
+    whisper_model TEXT NOT NULL,
+    language TEXT,
+    download_concurrency INTEGER NOT NULL,
+    transcribe_workers INTEGER NOT NULL,
+    options TEXT NOT NULL DEFAULT '{}',
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS batch_items (
+    job_id TEXT NOT NULL REFERENCES batch_jobs(job_id),
+    position INTEGER NOT NULL,
+    video_id TEXT NOT NULL,
+    url TEXT NOT NULL,
+    title TEXT,
+    duration REAL,
+    status TEXT NOT NULL,
+    error TEXT,
+    download_seconds REAL,
+    transcribe_seconds REAL,
+    segment_count INTEGER,
+    details TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (job_id, position)
+);
+"""
+
+# Per-job transcription options, as /youtube/transcribe takes them
+JOB_OPTIONS = ("use_captions", "allow_auto_captions", "preset", "decode_options", "rerun_model",
+               "generate_summary", "ingest_to_rag")
+
+
+def expand_url(url: str, max_depth: int = 2, single_video: bool = False) -> List[Dict[str, Any]]:
+    """List the videos behind a playlist, channel or video URL without downloading.
+
+    Uses yt-dlp's flat metadata extraction. Channel pages that list tabs
+    (videos, shorts, live) are expanded one level further.
+
+    Args:
+        url (str): Playlist, channel or video URL
+        max_depth (int): Levels of nested listings to expand
+        single_video (bool): List only the video of a watch URL, even if it names a playlist
+
+    Returns:
+        List[Dict[str, Any]]: Entries with video_id, url, title and duration
+    """
+    import yt_dlp
+
+    options = {"extract_flat": "in_playlist", "skip_download": True, "quiet": True, "no_warnings": True,
+               "noplaylist": single_video}
+    with yt_dlp.YoutubeDL(options) as ydl:
+        def expand(target: str, depth: int) -> List[Dict[str, Any]]:
+            info = ydl.extract_info(target, download=False)
+            if "entries" not in info:
+                return [info]
+            videos = []
+            for entry in info["entries"] or []:
+                if not entry:
+                    continue
+                is_listing = entry.get("_type") == "playlist" or entry.get("ie_key") == "YoutubeTab"
+                if is_listing and depth < max_depth:
+                    videos.extend(expand(entry.get("url") or entry.get("webpage_url"), depth + 1))
+                elif not is_listing:
+                    videos.append(entry)
+            return videos
+
+        entries = expand(url, 0)
+
+    videos, seen = [], set()
+    for entry in entries:
+        video_id = entry.get("id")
+        if not video_id or video_id in seen:
+            continue
+        seen.add(video_id)
+        videos.append({
+            "video_id": video_id,
+            "url": f"https://www.youtube.com/watch?v={video_id}",
+            "title": entry.get("title"),
+            "duration": entry.get("duration"),
+        })
+    return videos
+
+
+class BatchStore:
+    def __init__(self, db_path: Optional[str] = None):
+        """Persist batch jobs and per-item progress so jobs survive a crash.
+
+        Args:
+            db_path (str, optional): SQLite database file. Defaults to BATCH_DB_PATH
+                or ~/.codexcontinue/data/batch_jobs.db
+        """
+        self.db_path = db_path or os.getenv(
+            "BATCH_DB_PATH",
+            os.path.join(os.path.expanduser("~"), ".codexcontinue/data/batch_jobs.db")
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def create_job(self, job_id: str, source_url: str, whisper_model: str, language: Optional[str],
+                   download_concurrency: int, transcribe_workers: int, entries: List[Dict[str, Any]],
+                   options: Optional[Dict[str, Any]] = None):
+        """Record a new job and its items."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO batch_jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL, ?, ?)",
+                (job_id, source_url, PENDING, whisper_model, language,
+                 download_concurrency, transcribe_workers, json.dumps(options or {}), now, now)
+            )
+            self._conn.executemany(
+                """
+                INSERT INTO batch_items (job_id, position, video_id, url, title, duration, status, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [(job_id, position, entry["video_id"], entry["url"], entry.get("title"),
+                  entry.get("duration"), PENDING, now)
+                 for position, entry in enumerate(entries)]
+            )
+
+    def update_job(self, job_id: str, status: str, error: Optional[str] = None):
+        """Set a job's status."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE batch_jobs SET status = ?, error = ?, updated_at = ? WHERE job_id = ?",
+                (status, error, time.time(), job_id)
+            )
+
+    def update_item(self, job_id: str, position: int, **fields):
+        """Update an item's status, timings and details."""
+        if "details" in fields:
+            fields["details"] = json.dumps(fields["details"])
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE batch_items SET {assignments} WHERE job_id = ? AND position = ?",
+                (*fields.values(), job_id, position)
+            )
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job with its per-status item counts."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM batch_jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            counts = self._conn.execute(
+                "SELECT status, COUNT(*) AS count FROM batch_items WHERE job_id = ? GROUP BY status",
+                (job_id,)
+            ).fetchall()
+        job = dict(row)
+        job["options"] = json.loads(job["options"])
+        job["counts"] = {count["status"]: count["count"] for count in counts}
+        job["total"] = sum(job["counts"].values())
+        return job
+
+    def get_items(self, job_id: str, after: int = -1, limit: int = 100,
+                  statuses: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Return a page of a job's items in playlist order."""
+        sql = "SELECT * FROM batch_items WHERE job_id = ? AND position > ?"
+        params: List[Any] = [job_id, after]
+        if statuses:
+            sql += f" AND status IN ({', '.join('?' for _ in statuses)})"
+            params.extend(statuses)
+        sql += " ORDER BY position LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        items = [dict(row) for row in rows]
+        for item in items:
+            item["details"] = json.loads(item["details"]) if item["details"] else None
+        return items
+
+    def count_items(self, statuses: List[str]) -> int:
+        """Count items in the given states across jobs that are still queued or running."""
+        with self._lock:
+            return self._conn.execute(
+                f"""
+                SELECT COUNT(*) FROM batch_items i JOIN batch_jobs j ON j.job_id = i.job_id
+                WHERE j.status IN (?, ?) AND i.status IN ({', '.join('?' for _ in statuses)})
+                """,
+                (PENDING, RUNNING, *statuses)
+            ).fetchone()[0]
+
+    def count_jobs(self, statuses: List[str]) -> int:
+        """Count jobs in the given states."""
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT COUNT(*) FROM batch_jobs WHERE status IN ({', '.join('?' for _ in statuses)})",
+                statuses
+            ).fetchone()[0]
+
+    def incomplete_jobs(self) -> List[str]:
+        """Return the IDs of jobs that were queued or running when the service stopped."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id FROM batch_jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (PENDING, RUNNING)
+            ).fetchall()
+        return [row["job_id"] for row in rows]
+
+
+class BatchTranscriber:
+    def __init__(self, store: Optional[BatchStore] = None):
+        """Run batch jobs one at a time on a background thread.
+
+        Each job downloads with its own concurrency and feeds a transcription
+        stage limited to a fixed number of Whisper workers. Every state change
+        is persisted, so an interrupted job resumes where it stopped.
+        """
+        self.store = store or BatchStore()
+        self.max_download_concurrency = int(os.environ.get("BATCH_MAX_DOWNLOAD_CONCURRENCY", 8))
+        self.max_transcribe_workers = int(os.environ.get("BATCH_MAX_TRANSCRIBE_WORKERS", 2))
+        self._jobs: "queue.Queue[str]" = queue.Queue()
+        self._runner: Optional[threading.Thread] = None
+        self._runner_lock = threading.Lock()
+
+    def _ensure_runner(self):
+        """Start the job runner thread if it is not running."""
+        with self._runner_lock:
+            if self._runner is None or not self._runner.is_alive():
+                self._runner = threading.Thread(target=self._run_jobs, name="batch-runner", daemon=True)
+                self._runner.start()
+
+    def submit(self, url: str, whisper_model_size: str = "base", language: Optional[str] = None,
+               download_concurrency: int = 3, transcribe_workers: int = 1,
+               options: Optional[Dict[str, Any]] = None, single_video: bool = False) -> Dict[str, Any]:
+        """Expand a playlist or channel URL and queue its videos for transcription.
+
+        Args:
+            url (str): Playlist, channel or video URL
+            whisper_model_size (str): Whisper model for every item
+            language (str, optional): Language code for transcription
+            download_concurrency (int): Concurrent downloads, capped by BATCH_MAX_DOWNLOAD_CONCURRENCY
+            transcribe_workers (int): Concurrent Whisper workers, capped by BATCH_MAX_TRANSCRIBE_WORKERS
+            options (Dict[str, Any], optional): Options of JOB_OPTIONS applied to every item, as
+                process_video applies them: captions first, the decode preset and overrides, a
+                re-run of low-confidence passages, a summary and ingestion into the RAG store
+            single_video (bool): Queue only the video of a watch URL, even if it names a playlist
+
+        Returns:
+            Dict[str, Any]: The created job
+
+        Raises:
+            ValueError: If the URL lists no videos, or an option is unknown or invalid
+        """
+        options = {name: value for name, value in (options or {}).items() if value is not None}
+        unknown = set(options) - set(JOB_OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown job options: {', '.join(sorted(unknown))}")
+        resolve_decode_options(options.get("preset"), options.get("decode_options"))
+
+        entries = expand_url(url, single_video=single_video)
+        if not entries:
+            raise ValueError(f"No videos found at {url}")
+
+        job_id = uuid.uuid4().hex
+        self.store.create_job(
+            job_id, url, whisper_model_size, language,
+            max(1, min(download_concurrency, self.max_download_concurrency)),
+            max(1, min(transcribe_workers, self.max_transcribe_workers)),
+            entries, options
+        )
+
+        # Videos over the admission limit would block a Whisper worker for hours
+        max_duration = get_admission_controller().max_duration
+        for position, entry in enumerate(entries):
+            if max_duration and entry.get("duration") and entry["duration"] > max_duration:
+                self.store.update_item(job_id, position, status=FAILED,
+                                       error=f"duration {entry['duration']:.0f}s exceeds the {max_duration:.0f}s limit")
+        logger.info(f"Created batch job {job_id} with {len(entries)} videos from {url}")
+
+        self._jobs.put(job_id)
+        self._ensure_runner()
+        return self.store.get_job(job_id)
+
+    def resume_incomplete(self) -> List[str]:
+        """Queue jobs that were interrupted, e.g. by a crash or restart."""
+        job_ids = self.store.incomplete_jobs()
+        for job_id in job_ids:
+            logger.info(f"Resuming batch job {job_id}")
+            self._jobs.put(job_id)
+        if job_ids:
+            self._ensure_runner()
+        return job_ids
+
+    def resume(self, job_id: str, retry_failed: bool = False) -> Optional[Dict[str, Any]]:
+        """Queue a job again, optionally retrying its failed items."""
+        job = self.store.get_job(job_id)
+        if job is None:
+            return None
+        if retry_failed:
+            for item in self.store.get_items(job_id, limit=-1, statuses=[FAILED]):
+                self.store.update_item(job_id, item["position"], status=PENDING, error=None)
+        self.store.update_job(job_id, PENDING)
+        self._jobs.put(job_id)
+        self._ensure_runner()
+        return self.store.get_job(job_id)
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Report queued jobs, items waiting to download and downloads waiting for Whisper.
+
+        Counted from the store, so every worker process reports the same depths.
+        """
+        return {
+            "jobs": self.store.count_jobs([PENDING]),
+            "download": self.store.count_items([PENDING]),
+            "transcribe": self.store.count_items([DOWNLOADED]),
+        }
+
+    def _run_jobs(self):
+        """Process queued jobs in order."""
+        while True:
+            job_id = self._jobs.get()
+            try:
+                self._run_job(job_id)
+            except Exception as e:
+                logger.error(f"Batch job {job_id} failed: {str(e)}")
+                self.store.update_job(job_id, FAILED, error=str(e))
+
+    def _run_job(self, job_id: str):
+        """Run the download and transcription stages for a job's unfinished items."""
+        from .youtube_transcriber import YouTubeTranscriber
+
+        job = self.store.get_job(job_id)
+        if job is None or job["status"] in (DONE, FAILED):
+            return
+
+        # Items interrupted mid-pipeline start over; downloads are served from the audio cache
+        items = self.store.get_items(job_id, limit=-1, statuses=[PENDING, DOWNLOADING, DOWNLOADED, TRANSCRIBING])
+        self.store.update_job(job_id, RUNNING)
+        logger.info(f"Running batch job {job_id}: {len(items)} of {job['total']} videos remaining")
+
+        options = job["options"]
+        decode_options = resolve_decode_options(options.get("preset"), options.get("decode_options"))
+        rerun_model = options.get("rerun_model")
+
+        # One transcriber (and Whisper model) per worker bounds CPU/GPU use
+        workers: "queue.Queue[YouTubeTranscriber]" = queue.Queue()
+        for _ in range(job["transcribe_workers"]):
+            workers.put(YouTubeTranscriber(whisper_model_size=job["whisper_model"]))
+
+        # A transcriber keeps per-download state (last_download), so each download thread gets its own
+        downloaders = threading.local()
+
+        def get_downloader() -> YouTubeTranscriber:
+            if not hasattr(downloaders, "transcriber"):
+                downloaders.transcriber = YouTubeTranscriber(whisper_model_size=job["whisper_model"])
+            return downloaders.transcriber
+
+        # Bound how far downloads may run ahead of transcription
+        buffered = threading.BoundedSemaphore(job["download_concurrency"] + job["transcribe_workers"])
+
+        def finish_item(worker: YouTubeTranscriber, item: Dict[str, Any], result: Dict[str, Any],
+                        source: str, details: Dict[str, Any], **timings):
+            """Store an item's transcript, then summarize and index it if the job asks to."""
+            segments = result.get("segments", [])
+            get_transcript_store().save_transcript(
+                item["video_id"], item["url"], segments, title=item.get("title"),
+                language=result.get("language"), whisper_model=source
+            )
+            if options.get("generate_summary") and result.get("text"):
+                details["summary"] = worker.summarize_transcript(result["text"])
+            if options.get("ingest_to_rag"):
+                from .rag_ingest import ingest_transcript_to_rag
+
+                details["rag_ingest"] = ingest_transcript_to_rag(
+                    {**result, "video_id": item["video_id"], "source_url": item["url"], "title": item.get("title")}
+                )
+            self.store.update_item(job_id, item["position"], status=DONE, segment_count=len(segments),
+                                   details=details, **timings)
+
+        def transcribe_item(item: Dict[str, Any], audio_file: str):
+            worker = workers.get()
+            try:
+                self.store.update_item(job_id, item["position"], status=TRANSCRIBING)
+                start = time.time()
+                result = worker.transcribe(audio_file, job["language"], decode_options)
+                transcribe_seconds = time.time() - start
+
+                segments = result.get("segments", [])
+                audio_seconds = item.get("duration") or (segments[-1]["end"] if segments else 0)
+                get_transcript_store().record_run(item["video_id"], job["whisper_model"], audio_seconds,
+                                                  transcribe_seconds)
+                STAGE_SECONDS.labels("transcribe").observe(transcribe_seconds)
+                if audio_seconds:
+                    REAL_TIME_FACTOR.labels(job["whisper_model"]).observe(transcribe_seconds / audio_seconds)
+
+                details = {"transcript_source": "whisper"}
+                if rerun_model and rerun_model != job["whisper_model"]:
+                    result["audio_file"] = audio_file
+                    try:
+                        details["rerun"] = worker.rerun_low_confidence(result, rerun_model, decode_options)
+                    except Exception as e:
+                        logger.warning(f"Re-running low-confidence passages of {item['url']} failed: {str(e)}")
+                        details["rerun"] = {"model": rerun_model, "error": str(e)}
+                finish_item(worker, item, result, job["whisper_model"], details,
+                            transcribe_seconds=transcribe_seconds)
+            except Exception as e:
+                logger.error(f"Error transcribing {item['url']}: {str(e)}")
+                self.store.update_item(job_id, item["position"], status=FAILED, error=str(e))
+            finally:
+                workers.put(worker)
+                worker.audio_cache.unpin(os.path.basename(audio_file))
+                buffered.release()
+
+        def caption_item(item: Dict[str, Any]) -> bool:
+            """Finish an item from its captions, if the job asks for them and it has a usable track."""
+            downloader = get_downloader()
+            try:
+                result = downloader.get_captions(item["url"], job["language"],
+                                                 options.get("allow_auto_captions", False))
+            except Exception as e:
+                logger.warning(f"Caption lookup for {item['url']} failed, falling back to Whisper: {str(e)}")
+                return False
+            if result is None:
+                return False
+            try:
+                finish_item(downloader, item, result, result["transcript_source"],
+                            {"transcript_source": result["transcript_source"]})
+            except Exception as e:
+                logger.error(f"Error storing the captions of {item['url']}: {str(e)}")
+                self.store.update_item(job_id, item["position"], status=FAILED, error=str(e))
+            return True
+
+        with ThreadPoolExecutor(max_workers=job["download_concurrency"], thread_name_prefix="batch-download") as download_pool, \
+                ThreadPoolExecutor(max_workers=job["transcribe_workers"], thread_name_prefix="batch-transcribe") as transcribe_pool:
+            transcriptions = []
+            transcriptions_lock = threading.Lock()
+
+            def download_item(item: Dict[str, Any]):
+                # Captions skip the download and Whisper entirely
+                if options.get("use_captions") and caption_item(item):
+                    return
+                buffered.acquire()
+                downloader = get_downloader()
+                # Pinned before the download so the file cannot be evicted until it is transcribed
+                name = f"{downloader.get_video_id(item['url'])}.mp3"
+                downloader.audio_cache.pin(name)
+                try:
+                    self.store.update_item(job_id, item["position"], status=DOWNLOADING, error=None)
+                    start = time.time()
+                    audio_file = downloader.download_audio(item["url"], duration=item.get("duration"))
+                    download_seconds = time.time() - start
+                    self.store.update_item(job_id, item["position"], status=DOWNLOADED,
+                                           download_seconds=download_seconds)
+                    STAGE_SECONDS.labels("download").observe(download_seconds)
+                except Exception as e:
+                    logger.error(f"Error downloading {item['url']}: {str(e)}")
+                    self.store.update_item(job_id, item["position"], status=FAILED, error=str(e))
+                    downloader.audio_cache.unpin(name)
+                    buffered.release()
+                    return
+                with transcriptions_lock:
+                    transcriptions.append(transcribe_pool.submit(transcribe_item, item, audio_file))
+
+            wait([download_pool.submit(download_item, item) for item in items])
+            with transcriptions_lock:
+                pending = list(transcriptions)
+            wait(pending)
+
+        job = self.store.get_job(job_id)
+        status = FAILED if job["counts"].get(FAILED) == job["total"] else DONE
+        self.store.update_job(job_id, status)
+        logger.info(f"Batch job {job_id} finished: {job['counts']}")
+
+
+@lru_cache(maxsize=None)
+def get_batch_transcriber() -> BatchTranscriber:
+    """Return the process-wide batch transcriber."""
+    return BatchTranscriber()
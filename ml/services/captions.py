@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Fetch existing YouTube captions and convert them to Whisper's transcript schema
+"""
+
+import re
+import json
+import logging
+from typing import Dict, Any, Optional, List, Tuple
+
+import requests
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Language names accepted by /youtube/transcribe, mapped to caption language codes
+LANGUAGE_CODES = {
+    "english": "en", "spanish": "es", "french": "fr", "german": "de", "italian": "it",
+    "portuguese": "pt", "russian": "ru", "chinese": "zh", "japanese": "ja", "korean": "ko",
+}
+
+VTT_TIMING = re.compile(
+    r"(?:(\d+):)?(\d{2}):(\d{2})[.,](\d{3})\s+-->\s+(?:(\d+):)?(\d{2}):(\d{2})[.,](\d{3})"
+)
+VTT_TAG = re.compile(r"<[^>]+>")
+
+# Preferred subtitle formats, best first
+FORMAT_PREFERENCE = ["json3", "vtt"]
+
+# A track with less text than this is treated as unusable
+MIN_CAPTION_CHARACTERS = 20
+
+# Suffix of the automatic caption track holding YouTube's speech recognition output
+ORIGINAL_SUFFIX = "-orig"
+
+
+def language_code(language: Optional[str]) -> Optional[str]:
+    """Normalize a language name or code to a caption language code."""
+    if not language:
+        return None
+    return LANGUAGE_CODES.get(language.lower(), language.lower())
+
+
+def original_language(info: Dict[str, Any]) -> Optional[str]:
+    """Return the language spoken in a video, or None when it is unknown.
+
+    Uses the video's metadata, falling back to the ``<lang>-orig`` track that
+    YouTube lists among automatic captions for the speech recognition output.
+    """
+    language = language_code(info.get("language"))
+    if language:
+        return language
+    for lang in info.get("automatic_captions") or {}:
+        if lang.endswith(ORIGINAL_SUFFIX):
+            return lang[:-len(ORIGINAL_SUFFIX)]
+    return None
+
+
+def select_track(info: Dict[str, Any], language: Optional[str] = None,
+                 allow_auto: bool = False) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+    """Pick the best caption track from yt-dlp video info.
+
+    Manual subtitles are preferred over automatic captions, the requested
+    language over others, and the original-language track otherwise. Automatic
+    captions are only used in the original language, since the others are
+    machine translations, and not at all when the original language is unknown.
+
+    Returns:
+        Optional[Tuple[str, str, Dict[str, Any]]]: (kind, language, format entry), or None
+    """
+    wanted = language_code(language)
+    original = original_language(info)
+    sources = [("manual_captions", info.get("subtitles") or {})]
+    if allow_auto and original:
+        sources.append(("auto_captions", info.get("automatic_captions") or {}))
+
+    def base(lang: str) -> str:
+        return lang.split("-")[0]
+
+    def preference(lang: str) -> Tuple[bool, bool]:
+        # The speech recognition track first, then tracks in the original language
+        return not lang.endswith(ORIGINAL_SUFFIX), original is None or base(lang) != base(original)
+
+    for kind, tracks in sources:
+        # Auto captions list every translation target; only the original language is real speech
+        if kind == "auto_captions":
+            tracks = {lang: formats for lang, formats in tracks.items() if base(lang) == base(original)}
+        if wanted:
+            candidates = [lang for lang in tracks if base(lang) == base(wanted)]
+        else:
+            candidates = [lang for lang in tracks if lang != "live_chat"]
+        for lang in sorted(candidates, key=preference):
+            formats = {entry.get("ext"): entry for entry in tracks[lang] if entry.get("url")}
+            for ext in FORMAT_PREFERENCE:
+                if ext in formats:
+                    return kind, lang, formats[ext]
+    return None
+
+
+def parse_json3(payload: str) -> List[Dict[str, Any]]:
+    """Parse YouTube's json3 caption format into segments."""
+    events = json.loads(payload).get("events", [])
+    segments = []
+    for event in events:
+        if "segs" not in event or event.get("aAppend"):
+            continue
+        text = "".join(seg.get("utf8", "") for seg in event["segs"]).replace("\n", " ").strip()
+        if not text:
+            continue
+        start = event.get("tStartMs", 0) / 1000
+        end = start + event.get("dDurationMs", 0) / 1000
+        segments.append({"id": len(segments), "start": start, "end": end, "text": f" {text}"})
+    return segments
+
+
+def parse_vtt(payload: str) -> List[Dict[str, Any]]:
+    """Parse WebVTT captions into segments, dropping rolling-caption repeats."""
+    segments = []
+    previous_lines: List[str] = []
+    for block in re.split(r"\n\s*\n", payload.replace("\r\n", "\n")):
+        lines = block.strip().split("\n")
+        timing_index = next((i for i, line in enumerate(lines) if VTT_TIMING.search(line)), None)
+        if timing_index is None:
+            continue
+        match = VTT_TIMING.search(lines[timing_index])
+        h1, m1, s1, ms1, h2, m2, s2, ms2 = match.groups()
+        start = int(h1 or 0) * 3600 + int(m1) * 60 + int(s1) + int(ms1) / 1000
+        end = int(h2 or 0) * 3600 + int(m2) * 60 + int(s2) + int(ms2) / 1000
+
+        text_lines = [VTT_TAG.sub("", line).strip() for line in lines[timing_index + 1:]]
+        text_lines = [line for line in text_lines if line]
+        # Auto captions repeat the previous cue's line before adding a new one
+        new_lines = [line for line in text_lines if line not in previous_lines]
+        previous_lines = text_lines
+        text = " ".join(new_lines)
+        if text:
+            segments.append({"id": len(segments), "start": start, "end": end, "text": f" {text}"})
+    return segments
+
+
+def fetch_captions(info: Dict[str, Any], language: Optional[str] = None,
+                   allow_auto: bool = False) -> Optional[Dict[str, Any]]:
+    """Download and parse the best caption track for a video.
+
+    Args:
+        info (Dict[str, Any]): Video info from yt-dlp's extract_info(download=False)
+        language (str, optional): Preferred language name or code
+        allow_auto (bool): Fall back to automatically generated captions
+
+    Returns:
+        Optional[Dict[str, Any]]: ``text``, ``segments``, ``language`` and
+            ``transcript_source``, or None when no usable track exists
+    """
+    track = select_track(info, language, allow_auto)
+    if track is None:
+        return None
+    kind, lang, entry = track
+
+    try:
+        response = requests.get(entry["url"], timeout=30)
+        response.raise_for_status()
+        segments = parse_json3(response.text) if entry["ext"] == "json3" else parse_vtt(response.text)
+    except Exception as e:
+        logger.warning(f"Failed to fetch {kind} ({lang}): {str(e)}")
+        return None
+
+    text = "".join(segment["text"] for segment in segments).strip()
+    if len(text) < MIN_CAPTION_CHARACTERS:
+        logger.info(f"Caption track {kind} ({lang}) is too short to use")
+        return None
+
+    logger.info(f"Using {kind} ({lang}) with {len(segments)} segments")
+    return {
+        "text": text,
+        "segments": segments,
+        "language": lang[:-len(ORIGINAL_SUFFIX)] if lang.endswith(ORIGINAL_SUFFIX) else lang,
+        "transcript_source": kind,
+    }
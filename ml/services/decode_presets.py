@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Named speed/accuracy presets for Whisper's decode options
+"""
+
+import os
+from typing import Dict, Any, Optional
+
+# Whisper's default fallback chain
+TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+
+# Whisper's own defaults (greedy with best-of-5 sampling on fallback, conditioning on the
+# previous window) sit between "balanced" and "accurate"
+PRESETS: Dict[str, Dict[str, Any]] = {
+    # One greedy pass per window, no fallback and no conditioning: the cheapest decode,
+    # and immune to the repetition loops conditioning can cause
+    "fast": {
+        "beam_size": None,
+        "best_of": None,
+        "temperature": (0.0,),
+        "condition_on_previous_text": False,
+        "word_timestamps": False,
+    },
+    # Greedy, with a short fallback chain for windows that decode badly
+    "balanced": {
+        "beam_size": None,
+        "best_of": 2,
+        "temperature": (0.0, 0.4, 0.8),
+        "condition_on_previous_text": True,
+        "word_timestamps": False,
+    },
+    # Beam search, the full fallback chain and word-level timings
+    "accurate": {
+        "beam_size": 5,
+        "best_of": 5,
+        "temperature": TEMPERATURES,
+        "condition_on_previous_text": True,
+        "word_timestamps": True,
+    },
+}
+DEFAULT_PRESET = "balanced"
+
+# Options a request may override, with the type each is coerced to
+OVERRIDABLE = {
+    "beam_size": int,
+    "best_of": int,
+    "patience": float,
+    "temperature": float,
+    "condition_on_previous_text": bool,
+    "word_timestamps": bool,
+    "compression_ratio_threshold": float,
+    "logprob_threshold": float,
+    "no_speech_threshold": float,
+}
+# Options that may be null, leaving the choice to Whisper (a greedy decode, or no threshold)
+NULLABLE = {"beam_size", "best_of", "patience", "compression_ratio_threshold", "logprob_threshold",
+            "no_speech_threshold"}
+
+
+def default_preset() -> str:
+    """Return the preset used when a request names none."""
+    return os.getenv("TRANSCRIBE_PRESET", DEFAULT_PRESET)
+
+
+def resolve_decode_options(preset: Optional[str] = None,
+                           overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Combine a preset with per-request overrides into ``model.transcribe`` keyword arguments.
+
+    Args:
+        preset (str, optional): Name of a preset in PRESETS. Defaults to the TRANSCRIBE_PRESET
+            environment variable or "balanced".
+        overrides (Dict[str, Any], optional): Options that replace the preset's. ``temperature``
+            may be a single value or a list of fallback temperatures.
+
+    Returns:
+        Dict[str, Any]: The decode options
+
+    Raises:
+        ValueError: If the preset or an override is unknown or has an invalid value
+    """
+    preset = preset or default_preset()
+    if preset not in PRESETS:
+        raise ValueError(f"Unknown preset '{preset}', expected one of: {', '.join(PRESETS)}")
+    options = dict(PRESETS[preset])
+
+    for name, value in (overrides or {}).items():
+        if name not in OVERRIDABLE:
+            raise ValueError(f"Unknown decode option '{name}', expected one of: {', '.join(OVERRIDABLE)}")
+        if value is None:
+            if name not in NULLABLE:
+                raise ValueError(f"Decode option '{name}' cannot be null")
+            options[name] = None
+            continue
+        try:
+            if name == "temperature":
+                values = value if isinstance(value, (list, tuple)) else [value]
+                if not values:
+                    raise ValueError("expected at least one temperature")
+                options[name] = tuple(float(temperature) for temperature in values)
+            elif OVERRIDABLE[name] is bool:
+                if not isinstance(value, bool):
+                    raise TypeError(f"expected true or false, got {value!r}")
+                options[name] = value
+            else:
+                options[name] = OVERRIDABLE[name](value)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid value for decode option '{name}': {e}")
+
+    if options.get("beam_size") is not None and options["beam_size"] < 1:
+        raise ValueError("beam_size must be at least 1")
+    if options.get("best_of") is not None and options["best_of"] < 1:
+        raise ValueError("best_of must be at least 1")
+    if options.get("patience") is not None and options.get("beam_size") is None:
+        raise ValueError("patience requires beam_size")
+    return options
@@ -0,0 +1,557 @@
+#!/usr/bin/env python3
+"""
+Detect and cut short Whisper decodes that fall into repetition loops
+"""
+
+import os
+import time
+import zlib
+import logging
+from typing import Callable, Dict, Any, List, Optional, Sequence, Tuple
+
+from .decode_presets import TEMPERATURES
+from .metrics import RUNAWAY_WINDOWS, RUNAWAY_DECODE_SECONDS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# The guard flags text that zlib compresses better than this. Whisper's own fallback
+# threshold (2.4) only triggers a retry; the guard's is higher so that repetitive but
+# genuine speech (chants, lyrics, lists) falls back as usual instead of being dropped.
+COMPRESSION_RATIO_THRESHOLD = 3.0
+# Share of a window's word n-grams that repeat an earlier one
+NGRAM_SIZE = 3
+NGRAM_REPEAT_THRESHOLD = 0.7
+MIN_NGRAM_WORDS = 12
+# A window whose text repeats the previous window's is a loop carried over by conditioning
+MIN_REPEATED_WINDOW_CHARACTERS = 20
+# Looping attempts at higher temperatures allowed before a window is skipped
+MAX_RETRIES = 1
+# Decode time a window may take while its output keeps looping
+WINDOW_BUDGET_SECONDS = 60.0
+# A decode in progress is checked every few generated tokens, once it has enough to judge
+CHECK_EVERY_TOKENS = 8
+MIN_CHECK_TOKENS = 24
+
+# Whisper's defaults for falling back to a higher temperature and for skipping silent windows
+FALLBACK_COMPRESSION_RATIO = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+# Windows are cut from 16 kHz audio; seek positions are in 10 ms mel frames, as Whisper's are
+SAMPLE_RATE = 16000
+HOP_LENGTH = 160
+WINDOW_SECONDS = 30
+N_FRAMES = WINDOW_SECONDS * SAMPLE_RATE // HOP_LENGTH
+# Timestamp tokens are 20 ms, two mel frames, apart
+INPUT_STRIDE = 2
+TIME_PRECISION = INPUT_STRIDE * HOP_LENGTH / SAMPLE_RATE
+
+# Reasons a window is flagged
+COMPRESSION = "compression_ratio"
+NGRAM = "ngram_repetition"
+REPEATED_WINDOW = "repeated_window"
+
+
+def compression_ratio(text: str) -> float:
+    """How well zlib compresses a text, as Whisper measures it."""
+    data = text.encode("utf-8")
+    return len(data) / len(zlib.compress(data)) if data else 0.0
+
+
+def ngram_repeat_share(text: str, n: int = NGRAM_SIZE) -> float:
+    """Share of a text's word n-grams that occurred earlier in it."""
+    words = text.lower().split()
+    if len(words) < max(n, MIN_NGRAM_WORDS):
+        return 0.0
+    ngrams = [tuple(words[i:i + n]) for i in range(len(words) - n + 1)]
+    return 1.0 - len(set(ngrams)) / len(ngrams)
+
+
+class RepetitionStop:
+    def __init__(self, check: Callable[[str], Optional[str]], tokenizer, sample_begin: int):
+        """Logit filter that ends a decode as soon as its text starts to loop.
+
+        Added to a ``whisper.decoding.DecodingTask``'s logit filters, it runs after
+        every generated token. Every CHECK_EVERY_TOKENS tokens, once a sequence has
+        MIN_CHECK_TOKENS, its text so far is passed to ``check``; a sequence found
+        looping is forced to emit end-of-text, so the loop is not decoded to the end
+        of the window. Each step looks only at the tokens it is given, so it holds
+        for every beam and sample of the task.
+
+        Args:
+            check (Callable[[str], Optional[str]]): Returns why a text loops, or None
+            tokenizer: The task's Whisper tokenizer
+            sample_begin (int): Index of the first generated token, after the prompt
+        """
+        self.check = check
+        self.tokenizer = tokenizer
+        self.sample_begin = sample_begin
+
+    def apply(self, logits, tokens):
+        """Leave end-of-text as the only choice for the sequences that loop."""
+        generated = tokens.shape[-1] - self.sample_begin
+        if generated < MIN_CHECK_TOKENS or generated % CHECK_EVERY_TOKENS:
+            return
+        eot = self.tokenizer.eot
+        for row in range(tokens.shape[0]):
+            sequence = tokens[row, self.sample_begin:].tolist()
+            if sequence[-1] == eot:
+                continue  # Finished already
+            if self.check(self.tokenizer.decode([token for token in sequence if token < eot])) is not None:
+                logits[row, :] = float("-inf")
+                logits[row, eot] = 0.0
+
+
+class DecodingGuard:
+    def __init__(self, model_size: str,
+                 compression_ratio_threshold: Optional[float] = None,
+                 ngram_repeat_threshold: Optional[float] = None,
+                 max_retries: Optional[int] = None,
+                 window_budget_seconds: Optional[float] = None):
+        """Watch the windows of a transcription and skip the ones stuck in a loop.
+
+        decode_window decodes one 30-second window, one temperature at a time, with
+        a RepetitionStop that ends an attempt as soon as its text loops. A looping
+        attempt is retried at the next temperature. After ``max_retries`` looping
+        retries, on the last temperature, or once the window has used
+        ``window_budget_seconds``, the window is skipped without trying the rest of
+        the fallback chain, and the guard records a gap there. Callers that decode
+        windows themselves (the inference batcher) use check, record_gap and
+        record_recovered directly.
+
+        The thresholds are stricter than Whisper's own fallback, which still retries
+        windows that are merely repetitive.
+
+        Args:
+            model_size (str): Whisper model size, for metrics
+            compression_ratio_threshold (float, optional): Defaults to the
+                TRANSCRIBE_GUARD_COMPRESSION_RATIO environment variable or 3.0.
+            ngram_repeat_threshold (float, optional): Defaults to the
+                TRANSCRIBE_GUARD_NGRAM_REPEAT environment variable or 0.7.
+            max_retries (int, optional): Defaults to the TRANSCRIBE_GUARD_MAX_RETRIES
+                environment variable or 1.
+            window_budget_seconds (float, optional): Defaults to the
+                TRANSCRIBE_GUARD_WINDOW_SECONDS environment variable or 60.
+        """
+        self.model_size = model_size
+        self.compression_ratio_threshold = compression_ratio_threshold or float(
+            os.getenv("TRANSCRIBE_GUARD_COMPRESSION_RATIO", COMPRESSION_RATIO_THRESHOLD))
+        self.ngram_repeat_threshold = ngram_repeat_threshold or float(
+            os.getenv("TRANSCRIBE_GUARD_NGRAM_REPEAT", NGRAM_REPEAT_THRESHOLD))
+        self.max_retries = max_retries if max_retries is not None else int(
+            os.getenv("TRANSCRIBE_GUARD_MAX_RETRIES", MAX_RETRIES))
+        self.window_budget_seconds = window_budget_seconds or float(
+            os.getenv("TRANSCRIBE_GUARD_WINDOW_SECONDS", WINDOW_BUDGET_SECONDS))
+
+        self.gaps: List[Dict[str, Any]] = []
+        self.windows_skipped = 0
+        self.windows_recovered = 0
+        self.wasted_seconds = 0.0
+        self._previous_text: Optional[str] = None
+
+    def check(self, text: str, compression_ratio: float, previous_text: Optional[str] = None) -> Optional[str]:
+        """Return why a decoded window looks like a runaway, or None if it looks fine."""
+        if compression_ratio > self.compression_ratio_threshold:
+            return COMPRESSION
+        if ngram_repeat_share(text) > self.ngram_repeat_threshold:
+            return NGRAM
+        stripped = text.strip()
+        if previous_text and len(stripped) >= MIN_REPEATED_WINDOW_CHARACTERS and stripped == previous_text.strip():
+            return REPEATED_WINDOW
+        return None
+
+    def check_text(self, text: str) -> Optional[str]:
+        """check for the text of a decode in progress, for RepetitionStop."""
+        return self.check(text, compression_ratio(text))
+
+    def decode_window(self, model, mel, seek: int, frames: int, temperatures: Sequence[float],
+                      thresholds: Dict[str, Optional[float]], **options):
+        """Decode one window, falling back through the temperatures.
+
+        Args:
+            model: Whisper model
+            mel: The window's padded log-mel spectrogram
+            seek (int): Mel frame the window starts at
+            frames (int): Mel frames of audio in the window
+            temperatures (Sequence[float]): The fallback chain
+            thresholds (Dict[str, Optional[float]]): Whisper's fallback thresholds, for needs_fallback
+            **options: ``whisper.DecodingOptions`` fields besides the temperature
+
+        Returns:
+            The ``whisper.DecodingResult`` kept, or None if the window was skipped as a runaway
+        """
+        window_seconds = flagged_seconds = 0.0
+        flagged = 0
+        for attempt, temperature in enumerate(temperatures):
+            start = time.time()
+            result = decode_mel(model, mel[None], attempt_options(options, temperature), stop=self.check_text)[0]
+            elapsed = time.time() - start
+            window_seconds += elapsed
+            last = attempt == len(temperatures) - 1
+
+            reason = self.check(result.text, result.compression_ratio, self._previous_text)
+            if reason is not None:
+                flagged += 1
+                flagged_seconds += elapsed
+                if flagged > self.max_retries or last or window_seconds >= self.window_budget_seconds:
+                    self.record_gap(seek * HOP_LENGTH / SAMPLE_RATE, (seek + frames) * HOP_LENGTH / SAMPLE_RATE,
+                                    reason, window_seconds, seek=seek, temperature=temperature,
+                                    avg_logprob=result.avg_logprob, compression_ratio=result.compression_ratio,
+                                    no_speech_prob=result.no_speech_prob)
+                    return None
+                continue
+
+            # Whisper's own fallback for output that is unlikely rather than looping
+            if not last and needs_fallback(result, **thresholds):
+                continue
+
+            if flagged:
+                self.record_recovered(flagged_seconds)
+            self._previous_text = result.text
+            return result
+
+    def record_gap(self, start: float, end: float, reason: str, decode_seconds: float, seek: int = 0,
+                   temperature: float = 0.0, avg_logprob: float = 0.0, compression_ratio: float = 0.0,
+                   no_speech_prob: float = 0.0):
+        """Record a window given up on; its decode time counts as wasted.
+
+        The decoding statistics are those of the last attempt, which finish reports
+        on the gap's segment.
+        """
+        self.windows_skipped += 1
+        self.wasted_seconds += decode_seconds
+        self.gaps.append({
+            "start": start, "end": end, "reason": reason, "decode_seconds": decode_seconds, "seek": seek,
+            "temperature": temperature, "avg_logprob": avg_logprob, "compression_ratio": compression_ratio,
+            "no_speech_prob": no_speech_prob,
+        })
+        logger.warning(f"Skipped a looping window at {start:.1f}s ({reason}) after {decode_seconds:.1f}s of decoding")
+
+    def record_recovered(self, flagged_seconds: float):
+        """Record a window that looped at first but decoded cleanly at a higher temperature."""
+        self.windows_recovered += 1
+        self.wasted_seconds += flagged_seconds
+
+    def finish(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Mark the skipped windows in a result and export the guard's counts.
+
+        Each skipped window becomes a segment with the usual fields, empty text and
+        no tokens, plus ``gap`` and the ``reason`` it was skipped. The result gets a
+        ``guard`` report.
+        """
+        if self.gaps:
+            segments = result.get("segments", []) + [
+                {
+                    "id": 0,
+                    "seek": gap["seek"],
+                    "start": gap["start"],
+                    "end": gap["end"],
+                    "text": "",
+                    "tokens": [],
+                    "temperature": gap["temperature"],
+                    "avg_logprob": gap["avg_logprob"],
+                    "compression_ratio": gap["compression_ratio"],
+                    "no_speech_prob": gap["no_speech_prob"],
+                    "gap": True,
+                    "reason": gap["reason"],
+                }
+                for gap in self.gaps
+            ]
+            segments.sort(key=lambda segment: segment["start"])
+            for index, segment in enumerate(segments):
+                segment["id"] = index
+            result["segments"] = segments
+        result["guard"] = self.report()
+
+        if self.windows_skipped:
+            RUNAWAY_WINDOWS.labels(self.model_size, "skipped").inc(self.windows_skipped)
+        if self.windows_recovered:
+            RUNAWAY_WINDOWS.labels(self.model_size, "recovered").inc(self.windows_recovered)
+        if self.wasted_seconds:
+            RUNAWAY_DECODE_SECONDS.labels(self.model_size).inc(self.wasted_seconds)
+        return result
+
+    def report(self) -> Dict[str, Any]:
+        """Summarize what the guard caught."""
+        return {
+            "windows_skipped": self.windows_skipped,
+            "windows_recovered": self.windows_recovered,
+            "wasted_decode_seconds": self.wasted_seconds,
+            "gaps": [{key: gap[key] for key in ("start", "end", "reason", "decode_seconds")} for gap in self.gaps],
+        }
+
+
+def window_mel(model, audio):
+    """Log-mel spectrogram of up to 30 seconds of 16 kHz samples, padded to a full window."""
+    from .youtube_transcriber import import_whisper
+
+    whisper = import_whisper()
+    frames = len(audio) // HOP_LENGTH
+    mel = whisper.log_mel_spectrogram(audio, model.dims.n_mels, padding=WINDOW_SECONDS * SAMPLE_RATE)
+    return whisper.pad_or_trim(mel[:, :frames], N_FRAMES).to(model.device)
+
+
+def window_tokenizer(model, language: Optional[str]):
+    """The Whisper tokenizer a model transcribes a language with."""
+    from whisper.tokenizer import get_tokenizer
+
+    return get_tokenizer(model.is_multilingual, num_languages=model.num_languages, language=language,
+                         task="transcribe")
+
+
+def decode_mel(model, mel, options: Dict[str, Any], stop: Optional[Callable[[str], Optional[str]]] = None) -> List[Any]:
+    """Decode a batch of padded 30-second log-mel windows.
+
+    Args:
+        model: Whisper model
+        mel: Spectrograms of shape (windows, mel bins, frames), on the model's device
+        options (Dict[str, Any]): ``whisper.DecodingOptions`` fields
+        stop (Callable[[str], Optional[str]], optional): Checks the text of each decode as it
+            grows, ending the ones it flags (see RepetitionStop)
+
+    Returns:
+        List: A ``whisper.DecodingResult`` per window
+    """
+    from .youtube_transcriber import import_whisper
+
+    whisper = import_whisper()
+    from whisper.decoding import DecodingTask
+
+    task = DecodingTask(model, whisper.DecodingOptions(**options))
+    if stop is not None:
+        task.logit_filters.append(RepetitionStop(stop, task.tokenizer, task.sample_begin))
+    return task.run(mel)
+
+
+def add_words(model, tokenizer, segments: List[Dict[str, Any]], mel, frames: int, last_speech: float):
+    """Add Whisper's word-level timings to a window's segments."""
+    from whisper.timing import add_word_timestamps
+
+    add_word_timestamps(segments=segments, model=model, tokenizer=tokenizer, mel=mel, num_frames=frames,
+                        last_speech_timestamp=last_speech)
+
+
+def attempt_options(options: Dict[str, Any], temperature: float) -> Dict[str, Any]:
+    """Decoding options for one temperature: beam search when greedy, best_of when sampling."""
+    attempt = {**options, "temperature": temperature}
+    for name in (("beam_size", "patience") if temperature > 0 else ("best_of",)):
+        attempt.pop(name, None)
+    return attempt
+
+
+def needs_fallback(result, compression_ratio_threshold: Optional[float] = FALLBACK_COMPRESSION_RATIO,
+                   logprob_threshold: Optional[float] = LOGPROB_THRESHOLD,
+                   no_speech_threshold: Optional[float] = NO_SPEECH_THRESHOLD) -> bool:
+    """Whether Whisper would retry a window's decode at the next temperature."""
+    if (no_speech_threshold is not None and logprob_threshold is not None
+            and result.no_speech_prob > no_speech_threshold and result.avg_logprob < logprob_threshold):
+        return False  # Silence
+    return ((compression_ratio_threshold is not None and result.compression_ratio > compression_ratio_threshold)
+            or (logprob_threshold is not None and result.avg_logprob < logprob_threshold))
+
+
+def is_silent(result, logprob_threshold: Optional[float] = LOGPROB_THRESHOLD,
+              no_speech_threshold: Optional[float] = NO_SPEECH_THRESHOLD, **_) -> bool:
+    """Whether Whisper would skip a window as silence."""
+    if no_speech_threshold is None or result.no_speech_prob <= no_speech_threshold:
+        return False
+    return logprob_threshold is None or result.avg_logprob <= logprob_threshold
+
+
+def split_window(tokens: List[int], timestamp_begin: int,
+                 frames: int) -> Tuple[List[Tuple[float, float, List[int]]], int]:
+    """Cut a window's tokens into segments at paired timestamp tokens, as Whisper does.
+
+    Args:
+        tokens (List[int]): Decoded tokens, timestamps included
+        timestamp_begin (int): The tokenizer's first timestamp token
+        frames (int): Mel frames of audio in the window
+
+    Returns:
+        Tuple: (start, end, tokens) of each segment, in seconds from the window's start,
+            and the mel frames to advance to the next window: the whole window, or to
+            the start of a last segment the window edge cut off
+    """
+    stamps = [token >= timestamp_begin for token in tokens]
+    single_timestamp_ending = stamps[-2:] == [False, True]
+    consecutive = [index for index in range(1, len(tokens)) if stamps[index - 1] and stamps[index]]
+    if not consecutive:
+        duration = frames * HOP_LENGTH / SAMPLE_RATE
+        timestamps = [token for token in tokens if token >= timestamp_begin]
+        if timestamps and timestamps[-1] != timestamp_begin:
+            duration = (timestamps[-1] - timestamp_begin) * TIME_PRECISION
+        return [(0.0, duration, tokens)], frames
+
+    if single_timestamp_ending:
+        consecutive.append(len(tokens))
+    segments, last = [], 0
+    for current in consecutive:
+        piece = tokens[last:current]
+        segments.append(((piece[0] - timestamp_begin) * TIME_PRECISION,
+                         (piece[-1] - timestamp_begin) * TIME_PRECISION, piece))
+        last = current
+    if single_timestamp_ending:
+        return segments, frames
+    # The last segment is unfinished: the next window starts at its opening timestamp
+    return segments, (tokens[last - 1] - timestamp_begin) * INPUT_STRIDE
+
+
+def transcribe_windows(model, read: Callable[[int, int], Tuple[Any, bool]], language: Optional[str] = None,
+                       guard: Optional[DecodingGuard] = None,
+                       on_window: Optional[Callable[[int, float], None]] = None, **options) -> Dict[str, Any]:
+    """Transcribe audio one 30-second window at a time, as ``model.transcribe`` does.
+
+    Each window is decoded with Whisper's temperature fallback and split into
+    segments at its timestamp tokens. When the window edge cuts off its last
+    segment, that segment is left to the next window, which starts where it began;
+    otherwise the next window starts where this one ends. With
+    ``condition_on_previous_text`` (the default) the text so far is the prompt for
+    the next window, until a window needs a temperature above 0.5. With a guard,
+    each window is decoded by guard.decode_window and the skipped ones become gaps
+    in the result.
+
+    Args:
+        model: Whisper model
+        read (Callable): ``read(seek, samples)`` returns up to ``samples`` 16 kHz samples
+            from sample ``seek``, and whether they reach the end of the audio
+        language (str, optional): Language code; detected in the first window if not given
+        guard (DecodingGuard, optional): Skips windows that fall into repetition loops
+        on_window (Callable, optional): Called with the next window's start sample and
+            the seconds spent on the window, after each window
+        **options: ``model.transcribe`` options
+
+    Returns:
+        Dict[str, Any]: ``text``, ``segments`` and ``language``, as ``model.transcribe`` returns
+    """
+    temperature = options.pop("temperature", TEMPERATURES)
+    temperatures = tuple(temperature) if isinstance(temperature, (list, tuple)) else (temperature,)
+    condition = options.pop("condition_on_previous_text", True)
+    word_timestamps = options.pop("word_timestamps", False)
+    thresholds = {
+        "compression_ratio_threshold": options.pop("compression_ratio_threshold", FALLBACK_COMPRESSION_RATIO),
+        "logprob_threshold": options.pop("logprob_threshold", LOGPROB_THRESHOLD),
+        "no_speech_threshold": options.pop("no_speech_threshold", NO_SPEECH_THRESHOLD),
+    }
+    # Half precision only runs on a GPU
+    options["fp16"] = options.get("fp16", True) and str(model.device) != "cpu"
+
+    seek, segments, tokens, prompt_since = 0, [], [], 0
+    tokenizer, last_speech = None, 0.0
+    while True:
+        audio, final = read(seek * HOP_LENGTH, WINDOW_SECONDS * SAMPLE_RATE)
+        frames = len(audio) // HOP_LENGTH
+        if frames == 0:
+            break
+
+        start = time.time()
+        window_start = seek
+        mel = window_mel(model, audio)
+        window_options = {**options, "language": language, "prompt": tokens[prompt_since:]}
+        if guard:
+            result = guard.decode_window(model, mel, seek, frames, temperatures, thresholds, **window_options)
+        else:
+            result = decode_with_fallback(model, mel, temperatures, thresholds, **window_options)
+
+        if result is None:
+            # A skipped window breaks the chain of prompts, so its loop is not carried into the next
+            seek += frames
+            prompt_since = len(tokens)
+        elif is_silent(result, **thresholds):
+            seek += frames
+        else:
+            # Later windows keep the language detected in the first one
+            language = language or result.language
+            tokenizer = tokenizer or window_tokenizer(model, language)
+            pieces, advance = split_window(result.tokens, tokenizer.timestamp_begin, frames)
+            offset = seek * HOP_LENGTH / SAMPLE_RATE
+            window_segments = []
+            for piece_start, piece_end, piece in pieces:
+                segment = {
+                    "seek": seek,
+                    "start": offset + piece_start,
+                    "end": offset + piece_end,
+                    "text": tokenizer.decode([token for token in piece if token < tokenizer.eot]),
+                    "tokens": piece,
+                    "temperature": result.temperature,
+                    "avg_logprob": result.avg_logprob,
+                    "compression_ratio": result.compression_ratio,
+                    "no_speech_prob": result.no_speech_prob,
+                }
+                if segment["start"] == segment["end"] or not segment["text"].strip():
+                    segment.update(text="", tokens=[], words=[])
+                window_segments.append(segment)
+            if word_timestamps:
+                add_words(model, tokenizer, window_segments, mel, frames, last_speech)
+                ends = [word["end"] for segment in window_segments for word in segment.get("words") or ()]
+                if ends:
+                    last_speech = ends[-1]
+                    if advance < frames and ends[-1] > offset:
+                        advance = round(ends[-1] * SAMPLE_RATE / HOP_LENGTH) - seek
+            for segment in window_segments:
+                segments.append({"id": len(segments), **segment})
+                tokens.extend(segment["tokens"])
+            if not condition or result.temperature > 0.5:
+                prompt_since = len(tokens)
+            seek += advance if advance > 0 else frames
+
+        if on_window:
+            on_window(seek * HOP_LENGTH, time.time() - start)
+        if final and seek >= window_start + frames:
+            break
+
+    transcription = {
+        "text": "".join(segment["text"] for segment in segments),
+        "segments": segments,
+        "language": language,
+    }
+    return guard.finish(transcription) if guard else transcription
+
+
+def decode_with_fallback(model, mel, temperatures: Sequence[float], thresholds: Dict[str, Optional[float]],
+                         **options):
+    """Decode one window at rising temperatures until Whisper's fallback is satisfied."""
+    for temperature in temperatures:
+        result = decode_mel(model, mel[None], attempt_options(options, temperature))[0]
+        if not needs_fallback(result, **thresholds):
+            break
+    return result
+
+
+def transcribe_audio(model, audio, language: Optional[str] = None, guard: Optional[DecodingGuard] = None,
+                     **options) -> Dict[str, Any]:
+    """Transcribe a whole recording, under a guard if one is given.
+
+    Without a guard this is ``model.transcribe``; with one, the windows are
+    driven by transcribe_windows.
+
+    Args:
+        model: Whisper model
+        audio: Audio file path, or 16 kHz samples
+        language (str, optional): Language code
+        guard (DecodingGuard, optional): Skips windows that fall into repetition loops
+        **options: ``model.transcribe`` options
+    """
+    if guard is None:
+        return model.transcribe(audio, language=language, **options)
+    if isinstance(audio, str):
+        from .youtube_transcriber import import_whisper
+
+        audio = import_whisper().load_audio(audio)
+    return transcribe_windows(model, lambda seek, samples: (audio[seek:seek + samples], seek + samples >= len(audio)),
+                              language, guard, **options)
+
+
+def guard_enabled() -> bool:
+    """Whether TRANSCRIBE_GUARD_ENABLED turns the guard on; it is off unless set to "true"."""
+    return os.getenv("TRANSCRIBE_GUARD_ENABLED", "false").lower() == "true"
+
+
+def guard_for(model_size: str) -> Optional[DecodingGuard]:
+    """Return a guard for one transcription, or None unless the guard is enabled.
+
+    Args:
+        model_size (str): Whisper model size
+    """
+    return DecodingGuard(model_size) if guard_enabled() else None
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Cross-request batching of Whisper inference
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+
+from .decode_presets import TEMPERATURES
+from .decoding_guard import DecodingGuard, decode_mel, guard_enabled, guard_for
+from .metrics import INFERENCE_BATCH_SIZE, INFERENCE_QUEUE_SECONDS
+from .model_pool import get_model_pool
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Whisper's defaults for falling back to sampling and for skipping silent windows
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+TIME_PRECISION = 0.02
+
+
+def needs_fallback(result) -> bool:
+    """Whether a window's decoding looks degenerate and should be retried at a higher temperature."""
+    if result.no_speech_prob > NO_SPEECH_THRESHOLD:
+        return False
+    return result.compression_ratio > COMPRESSION_RATIO_THRESHOLD or result.avg_logprob < LOGPROB_THRESHOLD
+
+
+def split_segments(tokens: List[int], tokenizer, offset: float, duration: float) -> List[Tuple[float, float, List[int]]]:
+    """Split a window's tokens into (start, end, text tokens) at its timestamp tokens.
+
+    Args:
+        tokens (List[int]): Decoded tokens, timestamps included
+        tokenizer: Whisper tokenizer the tokens came from
+        offset (float): Start of the window in the audio, in seconds
+        duration (float): Length of audio in the window, in seconds
+
+    Returns:
+        List[Tuple[float, float, List[int]]]: Segments with absolute times
+    """
+    segments, start, text_tokens = [], None, []
+    for token in tokens:
+        if token >= tokenizer.timestamp_begin:
+            time_ = (token - tokenizer.timestamp_begin) * TIME_PRECISION
+            if text_tokens:
+                segments.append((offset + (start or 0.0), offset + time_, text_tokens))
+                start, text_tokens = None, []
+            else:
+                start = time_
+        else:
+            text_tokens.append(token)
+    if text_tokens:
+        # No closing timestamp: the segment runs to the end of the window
+        segments.append((offset + (start or 0.0), offset + duration, text_tokens))
+    return segments
+
+
+class InferenceBatcher:
+    def __init__(self, model_size: str, device: str, batch_size: Optional[int] = None,
+                 max_wait_ms: Optional[float] = None):
+        """Batch 30-second windows from concurrent transcriptions through one model.
+
+        Each transcription cuts its audio into fixed 30-second log-mel windows and
+        submits them here. A single thread collects windows from all callers until
+        the batch is full or the oldest window has waited ``max_wait_ms``, runs one
+        encoder pass and one batched decode for them, and hands each caller its result.
+        Windows are decoded independently (without the previous window's text as a
+        prompt), which is what makes them batchable.
+
+        Args:
+            model_size (str): Whisper model size
+            device (str): Device the model runs on
+            batch_size (int, optional): Maximum windows per batch. Defaults to the
+                TRANSCRIBE_BATCH_SIZE environment variable or 8.
+            max_wait_ms (float, optional): Longest a window waits for others to join its
+                batch. Defaults to the TRANSCRIBE_BATCH_MAX_WAIT_MS environment variable or 50.
+        """
+        self.model_size = model_size
+        self.device = device
+        self.batch_size = batch_size or int(os.getenv("TRANSCRIBE_BATCH_SIZE", 8))
+        self.max_wait = (max_wait_ms if max_wait_ms is not None
+                         else float(os.getenv("TRANSCRIBE_BATCH_MAX_WAIT_MS", 50))) / 1000
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._tokenizer = None
+        self._n_mels = None
+        self._info_lock = threading.Lock()
+        # With the guard on, decodes that start to loop are ended early; the windows are
+        # then checked again, per transcription, in transcribe_mel
+        self._stop = DecodingGuard(model_size).check_text if guard_enabled() else None
+        self._thread = threading.Thread(target=self._run, name=f"whisper-batcher-{model_size}", daemon=True)
+        self._thread.start()
+
+    def submit(self, mel, language: Optional[str] = None, temperature: float = 0.0,
+               beam_size: Optional[int] = None, best_of: Optional[int] = None) -> Future:
+        """Queue one padded 30-second log-mel window for decoding.
+
+        Beam search applies to greedy (temperature 0) decoding and best_of to sampling,
+        as in ``model.transcribe``.
+
+        Returns:
+            Future: Resolves to the window's ``whisper.DecodingResult``
+        """
+        future = Future()
+        if temperature > 0:
+            beam_size = None
+        else:
+            best_of = None
+        self._queue.put({"mel": mel, "language": language, "temperature": temperature,
+                         "beam_size": beam_size, "best_of": best_of,
+                         "future": future, "queued_at": time.time()})
+        return future
+
+    def _run(self):
+        """Collect windows into batches and decode them."""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.time() + self.max_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            # Windows decoded with the same options share a forward pass
+            groups: Dict[Tuple, List[Dict[str, Any]]] = {}
+            for request in batch:
+                key = (request["language"], request["temperature"], request["beam_size"], request["best_of"])
+                groups.setdefault(key, []).append(request)
+            for (language, temperature, beam_size, best_of), requests in groups.items():
+                self._decode(requests, language, temperature, beam_size, best_of)
+
+    def _decode(self, requests: List[Dict[str, Any]], language: Optional[str], temperature: float,
+                beam_size: Optional[int] = None, best_of: Optional[int] = None):
+        """Decode a group of windows in one batch and resolve their futures."""
+        now = time.time()
+        for request in requests:
+            INFERENCE_QUEUE_SECONDS.labels(self.model_size).observe(now - request["queued_at"])
+        INFERENCE_BATCH_SIZE.labels(self.model_size).observe(len(requests))
+        try:
+            import torch
+
+            with get_model_pool().checkout(self.model_size, self.device) as model:
+                mel = torch.stack([request["mel"] for request in requests]).to(model.device)
+                options = {"language": language, "temperature": temperature, "beam_size": beam_size,
+                           "best_of": best_of, "fp16": self.device == "cuda"}
+                results = decode_mel(model, mel, options, stop=self._stop)
+            for request, result in zip(requests, results):
+                request["future"].set_result(result)
+        except Exception as e:
+            logger.error(f"Batched decode of {len(requests)} windows failed: {str(e)}")
+            for request in requests:
+                if not request["future"].done():
+                    request["future"].set_exception(e)
+
+    def _model_info(self):
+        """Return the model's mel bin count and tokenizer, read once from a pooled model."""
+        with self._info_lock:
+            if self._tokenizer is None:
+                from whisper.tokenizer import get_tokenizer
+
+                with get_model_pool().checkout(self.model_size, self.device) as model:
+                    self._n_mels = model.dims.n_mels
+                    self._tokenizer = get_tokenizer(model.is_multilingual, num_languages=model.num_languages)
+        return self._n_mels, self._tokenizer
+
+    @property
+    def n_mels(self) -> int:
+        """Mel bins the model's encoder expects."""
+        return self._model_info()[0]
+
+    def log_mel(self, audio_file: str):
+        """Compute an audio file's log-mel spectrogram in the form transcribe_mel takes.
+
+        The spectrogram depends only on the audio and the number of mel bins, so it
+        can be reused by any model with the same ``n_mels``.
+        """
+        from .youtube_transcriber import import_whisper
+
+        whisper = import_whisper()
+        from whisper.audio import N_SAMPLES
+
+        audio = whisper.load_audio(audio_file)
+        return whisper.log_mel_spectrogram(audio, self.n_mels, padding=N_SAMPLES)
+
+    def transcribe(self, audio_file: str, language: Optional[str] = None,
+                   temperature: Tuple[float, ...] = TEMPERATURES, beam_size: Optional[int] = None,
+                   best_of: Optional[int] = None) -> Dict[str, Any]:
+        """Transcribe an audio file through the batcher.
+
+        Args:
+            audio_file (str): Audio file to transcribe
+            language (str, optional): Language code; detected per window if not given
+            temperature (Tuple[float, ...]): Fallback chain for windows that decode badly
+            beam_size (int, optional): Beam width for greedy decoding
+            best_of (int, optional): Candidates sampled at non-zero temperatures
+
+        Returns:
+            Dict[str, Any]: ``text``, ``segments`` and ``language``, as ``model.transcribe`` returns
+        """
+        return self.transcribe_mel(self.log_mel(audio_file), language, temperature, beam_size, best_of)
+
+    def transcribe_mel(self, mel, language: Optional[str] = None,
+                       temperature: Tuple[float, ...] = TEMPERATURES, beam_size: Optional[int] = None,
+                       best_of: Optional[int] = None) -> Dict[str, Any]:
+        """Transcribe a log-mel spectrogram from log_mel (padded with 30 seconds of silence).
+
+        Takes the same options as transcribe.
+        """
+        from .youtube_transcriber import import_whisper
+
+        whisper = import_whisper()
+        from whisper.audio import N_FRAMES, HOP_LENGTH, SAMPLE_RATE
+
+        n_mels, tokenizer = self._model_info()
+        if mel.shape[0] != n_mels:
+            raise ValueError(f"Spectrogram has {mel.shape[0]} mel bins, the {self.model_size} model expects {n_mels}")
+        content_frames = mel.shape[-1] - N_FRAMES
+        frame_seconds = HOP_LENGTH / SAMPLE_RATE
+        windows = [
+            (seek, whisper.pad_or_trim(mel[:, seek:seek + N_FRAMES], N_FRAMES), min(N_FRAMES, content_frames - seek))
+            for seek in range(0, content_frames, N_FRAMES)
+        ]
+
+        # Decode every window greedily, then retry the degenerate ones at rising temperatures;
+        # a bounded number of windows is in flight per transcription. Windows the guard
+        # finds looping past its retry or time budget are skipped and left as gaps.
+        guard = guard_for(self.model_size)
+        results: Dict[int, Any] = {}
+        pending = [seek for seek, _, _ in windows]
+        mels = {seek: window for seek, window, _ in windows}
+        frames_of = {seek: frames for seek, _, frames in windows}
+        decode_seconds: Dict[int, float] = defaultdict(float)
+        flagged: Dict[int, int] = defaultdict(int)
+        flagged_seconds: Dict[int, float] = defaultdict(float)
+        skipped = set()
+        for current in temperature:
+            retry = []
+            for start in range(0, len(pending), self.batch_size * 2):
+                chunk = pending[start:start + self.batch_size * 2]
+                chunk_start = time.time()
+                futures = [self.submit(mels[seek], language, current, beam_size, best_of) for seek in chunk]
+                chunk_results = [future.result() for future in futures]
+                # Windows of a chunk share forward passes, so each is charged an equal part
+                per_window = (time.time() - chunk_start) / len(chunk)
+                for seek, result in zip(chunk, chunk_results):
+                    results[seek] = result
+                    decode_seconds[seek] += per_window
+                    reason = guard.check(result.text, result.compression_ratio) if guard else None
+                    if reason is None:
+                        if needs_fallback(result):
+                            retry.append(seek)
+                        continue
+                    flagged[seek] += 1
+                    flagged_seconds[seek] += per_window
+                    if (flagged[seek] > guard.max_retries or current == temperature[-1]
+                            or decode_seconds[seek] >= guard.window_budget_seconds):
+                        skipped.add(seek)
+                        guard.record_gap(seek * frame_seconds, (seek + frames_of[seek]) * frame_seconds,
+                                         reason, decode_seconds[seek], seek=seek, temperature=current,
+                                         avg_logprob=result.avg_logprob,
+                                         compression_ratio=result.compression_ratio,
+                                         no_speech_prob=result.no_speech_prob)
+                    else:
+                        retry.append(seek)
+            pending = retry
+            if not pending:
+                break
+        if guard:
+            for seek in flagged:
+                if seek not in skipped:
+                    guard.record_recovered(flagged_seconds[seek])
+
+        segments = []
+        for seek, _, frames in windows:
+            result = results[seek]
+            if seek in skipped:
+                continue
+            if result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD:
+                continue  # Silence
+            for start, end, text_tokens in split_segments(result.tokens, tokenizer, seek * frame_seconds,
+                                                          frames * frame_seconds):
+                segments.append({
+                    "id": len(segments),
+                    "seek": seek,
+                    "start": start,
+                    "end": end,
+                    "text": tokenizer.decode(text_tokens),
+                    "tokens": text_tokens,
+                    "temperature": result.temperature,
+                    "avg_logprob": result.avg_logprob,
+                    "compression_ratio": result.compression_ratio,
+                    "no_speech_prob": result.no_speech_prob,
+                })
+
+        detected = Counter(result.language for result in results.values()).most_common(1)
+        transcription = {
+            "text": "".join(segment["text"] for segment in segments),
+            "segments": segments,
+            "language": language or (detected[0][0] if detected else None),
+        }
+        return guard.finish(transcription) if guard else transcription
+
+
+def save_mel(mel, path: str):
+    """Write a spectrogram from log_mel to a .npy file, to be transcribed later."""
+    import numpy as np
+
+    np.save(path, mel.cpu().numpy())
+
+
+def load_mel(path: str):
+    """Read a spectrogram written by save_mel, in the form transcribe_mel takes."""
+    import numpy as np
+    import torch
+
+    return torch.from_numpy(np.load(path))
+
+
+@lru_cache(maxsize=None)
+def get_inference_batcher(model_size: str, device: str) -> InferenceBatcher:
+    """Return the process-wide batcher for a model size and device."""
+    return InferenceBatcher(model_size, device)
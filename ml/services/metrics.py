@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Prometheus metrics for the transcription pipeline
+"""
+
+import logging
+from typing import Tuple
+
+from .metrics_base import Counter, Gauge, Histogram, render
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Stages run from seconds (captions) to hours (long transcriptions)
+STAGE_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 3600, 7200)
+
+STAGE_SECONDS = Histogram(
+    "codexcontinue_transcription_stage_seconds",
+    "Time spent in each stage of a transcription",
+    ["stage"],
+    buckets=STAGE_BUCKETS
+)
+REAL_TIME_FACTOR = Histogram(
+    "codexcontinue_transcription_real_time_factor",
+    "Whisper seconds per second of audio",
+    ["model"],
+    buckets=(0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 3, 5)
+)
+TRANSCRIPTIONS = Counter(
+    "codexcontinue_transcriptions_total",
+    "Finished transcriptions by transcript source and outcome",
+    ["source", "status"]
+)
+ADMISSION_DECISIONS = Counter(
+    "codexcontinue_admission_decisions_total",
+    "Admission-control decisions",
+    ["action"]
+)
+OLLAMA_TOKENS_PER_SECOND = Histogram(
+    "codexcontinue_ollama_tokens_per_second",
+    "Ollama generation speed for summaries",
+    ["model"],
+    buckets=(1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200)
+)
+OLLAMA_REQUEST_SECONDS = Histogram(
+    "codexcontinue_ollama_request_seconds",
+    "Ollama summary request latency",
+    ["model"],
+    buckets=STAGE_BUCKETS
+)
+# Gauges say how to merge the values of several gunicorn workers (see metrics_base.render)
+WHISPER_MODELS_RESIDENT = Gauge(
+    "codexcontinue_whisper_models_resident",
+    "Whisper models currently loaded, per process",
+    ["model", "device"],
+    multiprocess_mode="liveall"
+)
+AUDIO_CACHE_LOOKUPS = Counter(
+    "codexcontinue_audio_cache_lookups_total",
+    "Audio cache lookups",
+    ["result"]
+)
+AUDIO_CACHE_HIT_RATIO = Gauge(
+    "codexcontinue_audio_cache_hit_ratio",
+    "Share of audio cache lookups served from disk",
+    multiprocess_mode="livemostrecent"
+)
+AUDIO_CACHE_BYTES = Gauge(
+    "codexcontinue_audio_cache_bytes",
+    "Bytes held by the audio cache",
+    multiprocess_mode="livemostrecent"
+)
+AUDIO_CACHE_EVICTIONS = Counter(
+    "codexcontinue_audio_cache_evictions_total",
+    "Audio cache entries evicted"
+)
+INFERENCE_BATCH_SIZE = Histogram(
+    "codexcontinue_inference_batch_size",
+    "30-second windows decoded per batched Whisper forward pass",
+    ["model"],
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+INFERENCE_QUEUE_SECONDS = Histogram(
+    "codexcontinue_inference_queue_seconds",
+    "Time a window waited for its batch to run",
+    ["model"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+DOWNLOAD_BYTES = Counter(
+    "codexcontinue_audio_download_bytes_total",
+    "Bytes of media downloaded for transcription",
+    ["acodec"]
+)
+DOWNLOAD_THROUGHPUT = Histogram(
+    "codexcontinue_audio_download_bytes_per_second",
+    "Download throughput of each audio download",
+    buckets=(1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7, 2.5e7, 5e7, 1e8)
+)
+BATCH_QUEUE_DEPTH = Gauge(
+    "codexcontinue_batch_queue_depth",
+    "Batch work waiting to run",
+    ["kind"],
+    multiprocess_mode="livemostrecent"
+)
+RUNAWAY_WINDOWS = Counter(
+    "codexcontinue_runaway_windows_total",
+    "Whisper windows caught in a repetition loop, by whether a retry recovered them or they were skipped",
+    ["model", "outcome"]
+)
+RUNAWAY_DECODE_SECONDS = Counter(
+    "codexcontinue_runaway_decode_seconds_total",
+    "Decode time spent on looping output before it was retried or skipped",
+    ["model"]
+)
+
+
+def track_whisper_model(model, size: str, device: str):
+    """Count a loaded Whisper model as resident until it is garbage collected."""
+    import weakref
+
+    WHISPER_MODELS_RESIDENT.labels(size, device).inc()
+    weakref.finalize(model, WHISPER_MODELS_RESIDENT.labels(size, device).dec)
+
+
+def collect_runtime_metrics():
+    """Refresh gauges that mirror the state of process-wide services."""
+    from .audio_cache import get_audio_cache
+
+    stats = get_audio_cache().stats()
+    AUDIO_CACHE_HIT_RATIO.set(stats["hit_ratio"])
+    AUDIO_CACHE_BYTES.set(stats["bytes"])
+
+    from .batch_transcriber import get_batch_transcriber
+
+    for kind, depth in get_batch_transcriber().queue_depths().items():
+        BATCH_QUEUE_DEPTH.labels(kind).set(depth)
+
+
+def render_metrics() -> Tuple[bytes, int, str]:
+    """Render all metrics in the Prometheus text format.
+
+    Returns:
+        Tuple[bytes, int, str]: Body, HTTP status and content type for the response
+    """
+    return render(collect_runtime_metrics)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Prometheus client scaffolding shared by the ML service and the RAG proxy metrics
+"""
+
+import os
+import logging
+import importlib.util
+from typing import Callable, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_AVAILABLE = importlib.util.find_spec("prometheus_client") is not None
+
+if PROMETHEUS_AVAILABLE:
+    from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+else:
+    logger.warning("prometheus-client is not installed, metrics are disabled")
+    CONTENT_TYPE_LATEST = "text/plain; charset=utf-8"
+
+    class _NoopMetric:
+        """Stands in for a metric when prometheus-client is missing."""
+
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def labels(self, *args, **kwargs):
+            return self
+
+        def observe(self, *args, **kwargs):
+            pass
+
+        def inc(self, *args, **kwargs):
+            pass
+
+        def dec(self, *args, **kwargs):
+            pass
+
+        def set(self, *args, **kwargs):
+            pass
+
+    Counter = Gauge = Histogram = _NoopMetric
+
+__all__ = ["PROMETHEUS_AVAILABLE", "CONTENT_TYPE_LATEST", "Counter", "Gauge", "Histogram", "render"]
+
+
+def render(collect: Optional[Callable[[], None]] = None) -> Tuple[bytes, int, str]:
+    """Render all registered metrics in the Prometheus text format.
+
+    When PROMETHEUS_MULTIPROC_DIR is set, the samples of every process sharing
+    that directory are merged.
+
+    Args:
+        collect (Callable, optional): Refreshes gauges that mirror service state
+            before rendering; a failure is logged and the rest still rendered
+
+    Returns:
+        Tuple[bytes, int, str]: Body, HTTP status and content type for the response
+    """
+    if not PROMETHEUS_AVAILABLE:
+        return b"prometheus-client is not installed\n", 503, CONTENT_TYPE_LATEST
+    if collect is not None:
+        try:
+            collect()
+        except Exception as e:
+            logger.warning(f"Failed to collect runtime metrics: {str(e)}")
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        # Several worker processes (gunicorn) each write their samples to files there;
+        # merge them all rather than answering with this worker's alone
+        from prometheus_client import CollectorRegistry, multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), 200, CONTENT_TYPE_LATEST
+    return generate_latest(), 200, CONTENT_TYPE_LATEST
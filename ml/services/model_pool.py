@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Process-wide pool of loaded Whisper models
+"""
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, List, Tuple, Any
+
+from .metrics import track_whisper_model
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Length of the synthetic clip transcribed to warm a model up
+WARMUP_AUDIO_SECONDS = 5
+SAMPLE_RATE = 16000
+
+
+def select_device(use_gpu: bool = False) -> str:
+    """Pick the device Whisper runs on: CUDA or MPS when requested and available, otherwise CPU."""
+    if not use_gpu:
+        return "cpu"
+    try:
+        import torch
+        if torch.cuda.is_available():
+            logger.info("CUDA is available, using GPU for transcription")
+            return "cuda"
+        if hasattr(torch.backends, 'mps') and torch.backends.mps.is_available():
+            logger.info("MPS is available, using Apple Silicon GPU for transcription")
+            return "mps"
+    except ImportError:
+        logger.warning("Could not import torch to check GPU availability, defaulting to CPU")
+    return "cpu"
+
+
+def warm_up_model(model) -> float:
+    """Run a short synthetic transcription through a model and return how long it took.
+
+    The first inference pays for kernel selection, allocator growth and lazy
+    initialization inside torch; doing it here keeps that cost off the first request.
+    """
+    import numpy as np
+
+    t = np.arange(WARMUP_AUDIO_SECONDS * SAMPLE_RATE, dtype=np.float32) / SAMPLE_RATE
+    audio = (0.1 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+    start = time.time()
+    # A single temperature keeps the fallback chain from re-decoding the tone
+    model.transcribe(audio, temperature=0.0, condition_on_previous_text=False,
+                     fp16=str(model.device).startswith("cuda"))
+    return time.time() - start
+
+
+class WhisperModelPool:
+    def __init__(self, max_idle: int = None):
+        """Hand out loaded Whisper models so transcriptions reuse them instead of loading their own.
+
+        A Whisper model cannot run two transcriptions at once (the decoder hooks a
+        per-call key/value cache into the model), so each model is checked out by one
+        caller at a time. Returned models stay loaded for the next caller; when every
+        loaded model of a size is busy, another one is loaded.
+
+        Args:
+            max_idle (int, optional): Idle models kept per size and device. Defaults to the
+                WHISPER_POOL_MAX_IDLE environment variable or 2.
+        """
+        self.max_idle = max_idle if max_idle is not None else int(os.getenv("WHISPER_POOL_MAX_IDLE", 2))
+        self._idle: Dict[Tuple[str, str], List[Any]] = {}
+        self._busy: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def load(size: str, device: str):
+        """Load a new Whisper model."""
+        from .youtube_transcriber import import_whisper
+
+        logger.info(f"Loading Whisper model {size} on device: {device}")
+        model = import_whisper().load_model(size, device=device)
+        track_whisper_model(model, size, device)
+        logger.info(f"Whisper model {size} loaded successfully on {device}")
+        return model
+
+    def acquire(self, size: str, device: str):
+        """Take an idle model of this size, loading one if none is idle."""
+        key = (size, device)
+        with self._lock:
+            self._busy[key] = self._busy.get(key, 0) + 1
+            if self._idle.get(key):
+                return self._idle[key].pop()
+        try:
+            return self.load(size, device)
+        except Exception:
+            with self._lock:
+                self._busy[key] -= 1
+            raise
+
+    def release(self, size: str, device: str, model):
+        """Return a model to the pool, keeping it loaded unless enough are already idle."""
+        key = (size, device)
+        with self._lock:
+            self._busy[key] -= 1
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(model)
+
+    @contextmanager
+    def checkout(self, size: str, device: str):
+        """Use a model exclusively for the duration of a with block."""
+        model = self.acquire(size, device)
+        try:
+            yield model
+        finally:
+            self.release(size, device, model)
+
+    def preload(self, size: str, device: str, warm_up: bool = True) -> Dict[str, Any]:
+        """Load a model into the pool ahead of the first request that needs it.
+
+        Args:
+            size (str): Whisper model size
+            device (str): Device to load the model on
+            warm_up (bool): Also run a synthetic transcription through the model
+
+        Returns:
+            Dict[str, Any]: Model, device, load_seconds and warmup_seconds
+        """
+        start = time.time()
+        with self.checkout(size, device) as model:
+            load_seconds = time.time() - start
+            warmup_seconds = warm_up_model(model) if warm_up else None
+        return {"model": size, "device": device, "load_seconds": load_seconds, "warmup_seconds": warmup_seconds}
+
+    def warm_up_idle(self) -> Dict[str, float]:
+        """Run the synthetic transcription through every idle model.
+
+        Only safe before the process serves requests, since the models stay in the pool.
+
+        Returns:
+            Dict[str, float]: Seconds per "size/device"
+        """
+        with self._lock:
+            models = [(key, model) for key, idle in self._idle.items() for model in idle]
+        return {f"{size}/{device}": warm_up_model(model) for (size, device), model in models}
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Report idle and busy models per size and device."""
+        with self._lock:
+            return {
+                f"{size}/{device}": {"idle": len(self._idle.get((size, device), [])),
+                                     "busy": self._busy.get((size, device), 0)}
+                for size, device in set(self._idle) | set(self._busy)
+            }
+
+
+@lru_cache(maxsize=None)
+def get_model_pool() -> WhisperModelPool:
+    """Return the process-wide Whisper model pool."""
+    return WhisperModelPool()
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Fast preview transcripts refined in the background with the requested model
+"""
+
+import os
+import json
+import time
+import uuid
+import queue
+import sqlite3
+import logging
+import threading
+from functools import lru_cache
+from typing import Dict, Any, Optional, List
+from urllib.parse import urlparse
+
+import requests
+
+from .audio_cache import get_audio_cache
+from .decoding_guard import guard_for, transcribe_audio
+from .inference_batcher import get_inference_batcher, save_mel, load_mel
+from .metrics import STAGE_SECONDS, REAL_TIME_FACTOR
+from .model_pool import get_model_pool
+from .transcript_store import get_transcript_store
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Job states
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS refinement_jobs (
+    job_id TEXT PRIMARY KEY,
+    video_id TEXT NOT NULL,
+    source_url TEXT NOT NULL,
+    audio_file TEXT NOT NULL,
+    preview_model TEXT NOT NULL,
+    whisper_model TEXT NOT NULL,
+    device TEXT NOT NULL,
+    language TEXT,
+    decode_options TEXT NOT NULL,
+    callback_url TEXT,
+    status TEXT NOT NULL,
+    error TEXT,
+    refine_seconds REAL,
+    callback_status TEXT,
+    result TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class RefinementStore:
+    def __init__(self, db_path: Optional[str] = None):
+        """Persist refinement jobs, so any worker process can report on them.
+
+        Args:
+            db_path (str, optional): SQLite database file. Defaults to REFINEMENT_DB_PATH
+                or ~/.codexcontinue/data/refinements.db
+        """
+        self.db_path = db_path or os.getenv(
+            "REFINEMENT_DB_PATH",
+            os.path.join(os.path.expanduser("~"), ".codexcontinue/data/refinements.db")
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def create_job(self, job_id: str, video_id: str, source_url: str, audio_file: str, preview_model: str,
+                   whisper_model: str, device: str, language: Optional[str], decode_options: Dict[str, Any],
+                   callback_url: Optional[str]):
+        """Record a new job."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO refinement_jobs (job_id, video_id, source_url, audio_file, preview_model,
+                                             whisper_model, device, language, decode_options, callback_url,
+                                             status, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (job_id, video_id, source_url, audio_file, preview_model, whisper_model, device, language,
+                 json.dumps(decode_options), callback_url, PENDING, now, now)
+            )
+
+    def update_job(self, job_id: str, **fields):
+        """Update a job's status, timings or result."""
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"])
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE refinement_jobs SET {assignments} WHERE job_id = ?",
+                (*fields.values(), job_id)
+            )
+
+    def get_job(self, job_id: str, include_result: bool = True) -> Optional[Dict[str, Any]]:
+        """Return a job, with the refined transcript once it is done."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM refinement_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["decode_options"] = json.loads(job["decode_options"])
+        result = job.pop("result")
+        if include_result and result:
+            job["result"] = json.loads(result)
+        return job
+
+    def incomplete_jobs(self) -> List[str]:
+        """Return the IDs of jobs that were queued or running when the service stopped."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id FROM refinement_jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (PENDING, RUNNING)
+            ).fetchall()
+        return [row["job_id"] for row in rows]
+
+
+def check_callback_url(url: str):
+    """Reject a refinement callback URL whose host is not allowed.
+
+    The service POSTs to callback URLs from inside its network, so only hosts
+    listed in REFINEMENT_CALLBACK_HOSTS (comma-separated) are accepted; with
+    none listed, callbacks are disabled.
+
+    Raises:
+        ValueError: If the URL is not http(s) or its host is not allowed
+    """
+    allowed = {host.strip().lower() for host in os.getenv("REFINEMENT_CALLBACK_HOSTS", "").split(",") if host.strip()}
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ValueError("callback_url must be an http or https URL")
+    if parsed.hostname.lower() not in allowed:
+        raise ValueError(f"callback_url host '{parsed.hostname}' is not allowed (see REFINEMENT_CALLBACK_HOSTS)")
+
+
+def needs_sequential_decode(decode_options: Dict[str, Any]) -> bool:
+    """Whether the options need Whisper's own window-by-window loop rather than the batcher."""
+    return bool(decode_options.get("condition_on_previous_text") or decode_options.get("word_timestamps"))
+
+
+class PreviewRefiner:
+    def __init__(self, store: Optional[RefinementStore] = None, preview_model: Optional[str] = None):
+        """Transcribe a quick preview now and the requested model's transcript in the background.
+
+        The preview goes through the inference batcher. The refinement honours all
+        of the request's decode options: it is batched too unless the options
+        condition windows on the previous one or ask for word timestamps, which
+        only Whisper's sequential loop provides. A batched refinement reuses the
+        preview's log-mel spectrogram, which waits on disk in the audio cache; the
+        sequential loop computes its own from the audio, as ``model.transcribe``
+        takes no precomputed spectrogram. Refinements run one at a time on a
+        background thread, and each job's audio and spectrogram stay pinned in the
+        audio cache until its refinement has run.
+
+        Args:
+            store (RefinementStore, optional): Job store. Defaults to a RefinementStore.
+            preview_model (str, optional): Model for previews. Defaults to the
+                TRANSCRIBE_PREVIEW_MODEL environment variable or "tiny".
+        """
+        self.store = store or RefinementStore()
+        self.preview_model = preview_model or os.getenv("TRANSCRIBE_PREVIEW_MODEL", "tiny")
+        # Only job IDs are queued; spectrograms wait on disk, not in memory
+        self._jobs: "queue.Queue[str]" = queue.Queue()
+        self._runner: Optional[threading.Thread] = None
+        self._runner_lock = threading.Lock()
+
+    def _ensure_runner(self):
+        """Start the refinement thread if it is not running."""
+        with self._runner_lock:
+            if self._runner is None or not self._runner.is_alive():
+                self._runner = threading.Thread(target=self._run_jobs, name="refinement-runner", daemon=True)
+                self._runner.start()
+
+    def preview(self, url: str, video_id: str, audio_file: str, whisper_model: str, device: str,
+                language: Optional[str], decode_options: Dict[str, Any],
+                callback_url: Optional[str] = None) -> Dict[str, Any]:
+        """Transcribe a preview with the preview model and queue the refinement.
+
+        Args:
+            url (str): Video URL
+            video_id (str): YouTube video ID
+            audio_file (str): Downloaded audio
+            whisper_model (str): Model for the refined transcript
+            device (str): Device both models run on
+            language (str, optional): Language code; the preview's detection is reused if not given
+            decode_options (Dict[str, Any]): Options from resolve_decode_options
+            callback_url (str, optional): URL the refined transcript is POSTed to when ready;
+                its host must be allowed by check_callback_url
+
+        Returns:
+            Dict[str, Any]: The preview transcript, with the queued job under ``refinement``
+
+        Raises:
+            ValueError: If the callback URL is not allowed
+        """
+        if callback_url:
+            check_callback_url(callback_url)
+
+        batcher = get_inference_batcher(self.preview_model, device)
+        mel = batcher.log_mel(audio_file)
+        result = batcher.transcribe_mel(mel, language, **batch_options(decode_options))
+
+        job_id = uuid.uuid4().hex
+        self.store.create_job(job_id, video_id, url, audio_file, self.preview_model, whisper_model, device,
+                              language or result.get("language"), decode_options, callback_url)
+        if not needs_sequential_decode(decode_options):
+            save_mel(mel, os.path.join(os.path.dirname(audio_file), mel_name(job_id)))
+        self._enqueue(job_id, audio_file)
+        logger.info(f"Preview of {video_id} ready, refinement {job_id} with {whisper_model} queued")
+
+        result["whisper_model"] = self.preview_model
+        result["refinement"] = self.store.get_job(job_id, include_result=False)
+        return result
+
+    def resume_incomplete(self) -> List[str]:
+        """Queue refinements interrupted by a restart."""
+        job_ids = self.store.incomplete_jobs()
+        for job_id in job_ids:
+            logger.info(f"Resuming refinement {job_id}")
+            self._enqueue(job_id, self.store.get_job(job_id, include_result=False)["audio_file"])
+        return job_ids
+
+    def _enqueue(self, job_id: str, audio_file: str):
+        """Queue a job, pinning its audio and spectrogram so the cache keeps them until the job has run."""
+        cache = get_audio_cache(os.path.dirname(audio_file))
+        cache.pin(os.path.basename(audio_file))
+        if os.path.exists(cache.path_for(mel_name(job_id))):
+            cache.pin(mel_name(job_id))
+            # Counted against the cache quota like the audio
+            cache.add(mel_name(job_id))
+        self._jobs.put(job_id)
+        self._ensure_runner()
+
+    def _run_jobs(self):
+        """Refine queued jobs in order."""
+        while True:
+            self._run_job(self._jobs.get())
+
+    def _run_job(self, job_id: str):
+        """Refine a job, release its audio, drop its spectrogram and report the outcome to its callback."""
+        audio_file = self.store.get_job(job_id, include_result=False)["audio_file"]
+        try:
+            self._refine(job_id)
+        except Exception as e:
+            logger.error(f"Refinement {job_id} failed: {str(e)}")
+            self.store.update_job(job_id, status=FAILED, error=str(e))
+        finally:
+            cache = get_audio_cache(os.path.dirname(audio_file))
+            cache.unpin(os.path.basename(audio_file))
+            cache.unpin(mel_name(job_id))
+            cache.remove(mel_name(job_id))
+        self._notify(job_id)
+
+    def _refine(self, job_id: str):
+        """Transcribe a job's audio with the requested model and store the result."""
+        job = self.store.get_job(job_id)
+        if job is None or job["status"] in (DONE, FAILED):
+            return
+        self.store.update_job(job_id, status=RUNNING)
+
+        options = job["decode_options"]
+        start = time.time()
+        if needs_sequential_decode(options):
+            result = transcribe_sequential(job["audio_file"], job["whisper_model"], job["device"],
+                                           job["language"], options)
+        else:
+            batcher = get_inference_batcher(job["whisper_model"], job["device"])
+            mel_file = os.path.join(os.path.dirname(job["audio_file"]), mel_name(job_id))
+            mel = load_mel(mel_file) if os.path.exists(mel_file) else None
+            # A model with a different number of mel bins than the preview model needs its own
+            if mel is None or mel.shape[0] != batcher.n_mels:
+                mel = batcher.log_mel(job["audio_file"])
+            result = batcher.transcribe_mel(mel, job["language"], **batch_options(options))
+        refine_seconds = time.time() - start
+
+        segments = result.get("segments", [])
+        store = get_transcript_store()
+        store.save_transcript(job["video_id"], job["source_url"], segments, language=result.get("language"),
+                              whisper_model=job["whisper_model"])
+        audio_seconds = segments[-1]["end"] if segments else 0
+        store.record_run(job["video_id"], job["whisper_model"], audio_seconds, refine_seconds)
+        STAGE_SECONDS.labels("refine").observe(refine_seconds)
+        if audio_seconds:
+            REAL_TIME_FACTOR.labels(job["whisper_model"]).observe(refine_seconds / audio_seconds)
+
+        self.store.update_job(job_id, status=DONE, refine_seconds=refine_seconds, result={
+            "text": result.get("text", ""),
+            "segments": segments,
+            "language": result.get("language"),
+        })
+        logger.info(f"Refinement {job_id} of {job['video_id']} done in {refine_seconds:.2f}s")
+
+    def _notify(self, job_id: str):
+        """POST a finished job to its callback URL, if it has one."""
+        job = self.store.get_job(job_id)
+        if job is None or not job["callback_url"] or job["status"] not in (DONE, FAILED):
+            return
+        try:
+            # Checked again in case REFINEMENT_CALLBACK_HOSTS changed since the job was queued;
+            # redirects are not followed, as they could lead to any host
+            check_callback_url(job["callback_url"])
+            response = requests.post(job["callback_url"], json=job, timeout=10, allow_redirects=False)
+            callback_status = str(response.status_code)
+        except Exception as e:
+            logger.warning(f"Refinement callback to {job['callback_url']} failed: {str(e)}")
+            callback_status = f"error: {str(e)}"
+        self.store.update_job(job_id, callback_status=callback_status)
+
+
+def mel_name(job_id: str) -> str:
+    """Name of a job's preview spectrogram in the audio cache."""
+    return f"{job_id}.mel.npy"
+
+
+def batch_options(decode_options: Dict[str, Any]) -> Dict[str, Any]:
+    """The decode options the inference batcher applies."""
+    return {
+        "temperature": tuple(decode_options["temperature"]),
+        "beam_size": decode_options.get("beam_size"),
+        "best_of": decode_options.get("best_of"),
+    }
+
+
+def transcribe_sequential(audio_file: str, model_size: str, device: str, language: Optional[str],
+                          decode_options: Dict[str, Any]) -> Dict[str, Any]:
+    """Transcribe with Whisper's own loop, for options the batcher cannot apply."""
+    options = {**decode_options, "temperature": tuple(decode_options["temperature"])}
+    if language:
+        options["language"] = language
+    guard = guard_for(model_size)
+    with get_model_pool().checkout(model_size, device) as model:
+        return transcribe_audio(model, audio_file, guard=guard, **options)
+
+
+@lru_cache(maxsize=None)
+def get_preview_refiner() -> PreviewRefiner:
+    """Return the process-wide preview refiner."""
+    return PreviewRefiner()
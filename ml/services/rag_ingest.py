@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Send transcripts to the RAG proxy for indexing
+"""
+
+import os
+import logging
+from typing import Dict, Any
+
+import requests
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RAG_PROXY_URL = os.getenv("RAG_PROXY_URL", "http://localhost:5001")
+
+
+def ingest_transcript_to_rag(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Send a transcript's timestamped segments to the RAG proxy for indexing."""
+    try:
+        response = requests.post(
+            f"{RAG_PROXY_URL}/rag/import/transcript",
+            json={
+                "video_id": result["video_id"],
+                "source_url": result["source_url"],
+                "title": result.get("title"),
+                "segments": [
+                    {"start": segment["start"], "end": segment["end"], "text": segment["text"]}
+                    for segment in result.get("segments", [])
+                    if not segment.get("gap")
+                ]
+            },
+            timeout=300
+        )
+        return response.json()
+    except Exception as e:
+        logger.error(f"Error ingesting transcript into RAG: {str(e)}")
+        return {"error": str(e)}
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Re-transcribe the low-confidence passages of a transcript with a larger model
+"""
+
+import os
+import time
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+# A segment is re-run when any of these flags it. The log-probability floor is
+# stricter than Whisper's fallback threshold (-1.0), which only catches outright
+# failures; the no-speech bound catches text hallucinated over silence or music.
+LOGPROB_THRESHOLD = -0.7
+COMPRESSION_RATIO_THRESHOLD = 2.4
+NO_SPEECH_THRESHOLD = 0.5
+
+# Audio added around each passage, taken only from gaps between segments so
+# the re-run never overlaps a confident neighbour
+SPAN_PADDING_SECONDS = 0.5
+# Low-confidence passages closer than this are re-run as one
+MERGE_GAP_SECONDS = 2.0
+# Characters of preceding text given to the larger model as a prompt
+PROMPT_CHARACTERS = 200
+
+
+def is_low_confidence(segment: Dict[str, Any], logprob_threshold: float = LOGPROB_THRESHOLD,
+                      compression_ratio_threshold: float = COMPRESSION_RATIO_THRESHOLD,
+                      no_speech_threshold: float = NO_SPEECH_THRESHOLD) -> bool:
+    """Whether a Whisper segment's decoding statistics suggest it is wrong."""
+    if not segment.get("text", "").strip():
+        return False
+    return (segment.get("avg_logprob", 0.0) < logprob_threshold
+            or segment.get("compression_ratio", 0.0) > compression_ratio_threshold
+            or segment.get("no_speech_prob", 0.0) > no_speech_threshold)
+
+
+def low_confidence_spans(segments: List[Dict[str, Any]], audio_seconds: float,
+                         flags: Optional[List[bool]] = None) -> List[Tuple[float, float, int, int]]:
+    """Group low-confidence segments into passages to re-run.
+
+    Args:
+        segments (List[Dict[str, Any]]): Transcript segments in time order
+        audio_seconds (float): Length of the audio
+        flags (List[bool], optional): Which segments are low-confidence. Defaults to is_low_confidence.
+
+    Returns:
+        List[Tuple[float, float, int, int]]: (start, end, first segment, last segment + 1) per passage
+    """
+    if flags is None:
+        flags = [is_low_confidence(segment) for segment in segments]
+
+    groups: List[List[int]] = []
+    for index, flagged in enumerate(flags):
+        if not flagged:
+            continue
+        if groups and segments[index]["start"] - segments[groups[-1][-1]]["end"] <= MERGE_GAP_SECONDS:
+            groups[-1].append(index)
+        else:
+            groups.append([index])
+
+    spans = []
+    for group in groups:
+        # Re-run the confident segments caught between merged ones too
+        first, last = group[0], group[-1] + 1
+        previous_end = segments[first - 1]["end"] if first > 0 else 0.0
+        next_start = segments[last]["start"] if last < len(segments) else audio_seconds
+        start = max(previous_end, segments[first]["start"] - SPAN_PADDING_SECONDS)
+        end = min(next_start, segments[last - 1]["end"] + SPAN_PADDING_SECONDS)
+        spans.append((start, end, first, last))
+    return spans
+
+
+def retranscribe_low_confidence(model, audio, segments: List[Dict[str, Any]], language: Optional[str] = None,
+                                logprob_threshold: Optional[float] = None,
+                                **options) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Re-run the low-confidence passages of a transcript and splice the results in.
+
+    Each passage is cut from the audio, transcribed by ``model`` with the text
+    before it as a prompt, and replaces the segments it covered.
+
+    Args:
+        model: Loaded Whisper model to re-run passages with
+        audio: The whole audio as 16 kHz float32 samples
+        segments (List[Dict[str, Any]]): First-pass segments in time order
+        language (str, optional): Language of the transcript
+        logprob_threshold (float, optional): Average log probability below which a segment is
+            re-run. Defaults to the TRANSCRIBE_RERUN_LOGPROB environment variable or -0.7.
+        **options: Decode options for ``model.transcribe``
+
+    Returns:
+        Tuple[List[Dict[str, Any]], Dict[str, Any]]: The spliced segments, and a report of
+            how many segments and seconds of audio were re-run
+    """
+    if logprob_threshold is None:
+        logprob_threshold = float(os.getenv("TRANSCRIBE_RERUN_LOGPROB", LOGPROB_THRESHOLD))
+    audio_seconds = len(audio) / SAMPLE_RATE
+    flags = [is_low_confidence(segment, logprob_threshold) for segment in segments]
+    spans = low_confidence_spans(segments, audio_seconds, flags)
+    options = {key: value for key, value in options.items() if key not in ("initial_prompt", "language")}
+
+    start_time = time.time()
+    spliced: List[Dict[str, Any]] = []
+    position = 0
+    rerun_seconds = 0.0
+    for start, end, first, last in spans:
+        spliced.extend(segments[position:first])
+        prompt = "".join(segment["text"] for segment in spliced)[-PROMPT_CHARACTERS:] or None
+        clip = audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)]
+        result = model.transcribe(clip, language=language, initial_prompt=prompt, **options)
+        for segment in result["segments"]:
+            segment = {**segment, "start": segment["start"] + start, "end": min(segment["end"] + start, end),
+                       "rerun": True}
+            if "words" in segment:
+                segment["words"] = [{**word, "start": word["start"] + start, "end": word["end"] + start}
+                                    for word in segment["words"]]
+            spliced.append(segment)
+        rerun_seconds += end - start
+        position = last
+    spliced.extend(segments[position:])
+    for index, segment in enumerate(spliced):
+        segment["id"] = index
+
+    report = {
+        "segments_flagged": sum(flags),
+        "segments_total": len(segments),
+        "passages": len(spans),
+        "audio_seconds_rerun": rerun_seconds,
+        "audio_share_rerun": rerun_seconds / audio_seconds if audio_seconds else 0.0,
+        "rerun_seconds": time.time() - start_time,
+    }
+    logger.info(f"Re-ran {report['passages']} passages ({rerun_seconds:.1f}s of {audio_seconds:.1f}s audio) "
+                f"covering {report['segments_flagged']} of {len(segments)} segments")
+    return spliced, report
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Persistent transcript store with a segment-level full-text index
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from functools import lru_cache
+from typing import Dict, Any, Optional, List
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    video_id TEXT PRIMARY KEY,
+    source_url TEXT NOT NULL,
+    title TEXT,
+    language TEXT,
+    whisper_model TEXT,
+    duration_ms INTEGER,
+    segment_count INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    video_id TEXT NOT NULL REFERENCES videos(video_id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    start_ms INTEGER NOT NULL,
+    end_ms INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS segments_video_start_seq ON segments(video_id, start_ms, seq);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5(
+    text,
+    content='segments',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS segments_ai AFTER INSERT ON segments BEGIN
+    INSERT INTO segments_fts(rowid, text) VALUES (new.id, new.text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS segments_ad AFTER DELETE ON segments BEGIN
+    INSERT INTO segments_fts(segments_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+
+CREATE TABLE IF NOT EXISTS transcription_runs (
+    id INTEGER PRIMARY KEY,
+    video_id TEXT NOT NULL,
+    whisper_model TEXT NOT NULL,
+    audio_seconds REAL NOT NULL,
+    transcribe_seconds REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS transcription_runs_model ON transcription_runs(whisper_model, id);
+"""
+
+
+class TranscriptStore:
+    def __init__(self, db_path: Optional[str] = None):
+        """Open (and create if needed) the transcript database.
+
+        Args:
+            db_path (str, optional): SQLite database file. Defaults to TRANSCRIPT_DB_PATH
+                or ~/.codexcontinue/data/transcripts.db
+        """
+        self.db_path = db_path or os.getenv(
+            "TRANSCRIPT_DB_PATH",
+            os.path.join(os.path.expanduser("~"), ".codexcontinue/data/transcripts.db")
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._local = threading.local()
+
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection to the database."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def save_transcript(self, video_id: str, source_url: str, segments: List[Dict[str, Any]],
+                        title: Optional[str] = None, language: Optional[str] = None,
+                        whisper_model: Optional[str] = None) -> int:
+        """Store a transcript, replacing any previous version of the same video.
+
+        Args:
+            video_id (str): YouTube video ID
+            source_url (str): URL of the video
+            segments (List[Dict[str, Any]]): Whisper segments with start/end in seconds
+            title (str, optional): Video title
+            language (str, optional): Transcript language
+            whisper_model (str, optional): Whisper model that produced the transcript
+
+        Returns:
+            int: Number of segments stored
+        """
+        rows = [
+            (video_id, seq, int(round(segment["start"] * 1000)), int(round(segment["end"] * 1000)),
+             segment["text"].strip())
+            for seq, segment in enumerate(segments)
+            if segment.get("text", "").strip()
+        ]
+        duration_ms = rows[-1][3] if rows else 0
+
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM segments WHERE video_id = ?", (video_id,))
+            conn.execute(
+                """
+                INSERT INTO videos (video_id, source_url, title, language, whisper_model,
+                                    duration_ms, segment_count, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(video_id) DO UPDATE SET
+                    source_url = excluded.source_url,
+                    title = COALESCE(excluded.title, videos.title),
+                    language = excluded.language,
+                    whisper_model = excluded.whisper_model,
+                    duration_ms = excluded.duration_ms,
+                    segment_count = excluded.segment_count,
+                    created_at = excluded.created_at
+                """,
+                (video_id, source_url, title, language, whisper_model, duration_ms, len(rows),
+                 time.strftime("%Y-%m-%d %H:%M:%S"))
+            )
+            conn.executemany(
+                "INSERT INTO segments (video_id, seq, start_ms, end_ms, text) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+
+        logger.info(f"Stored transcript for {video_id} with {len(rows)} segments")
+        return len(rows)
+
+    def get_video(self, video_id: str) -> Optional[Dict[str, Any]]:
+        """Return a stored video's metadata, or None."""
+        row = self._connect().execute("SELECT * FROM videos WHERE video_id = ?", (video_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list_videos(self, limit: int = 50, after: Optional[str] = None) -> Dict[str, Any]:
+        """List stored videos ordered by video ID, one page at a time.
+
+        Args:
+            limit (int): Maximum number of videos per page
+            after (str, optional): Cursor returned by the previous page
+        """
+        rows = self._connect().execute(
+            "SELECT * FROM videos WHERE video_id > ? ORDER BY video_id LIMIT ?",
+            (after or "", limit)
+        ).fetchall()
+        videos = [dict(row) for row in rows]
+        return {
+            "videos": videos,
+            "next_cursor": videos[-1]["video_id"] if len(videos) == limit else None
+        }
+
+    def get_segments(self, video_id: str, after: Optional[str] = None, limit: int = 200) -> Dict[str, Any]:
+        """Return a page of a video's segments in time order.
+
+        Segments are ordered by (start_ms, seq), and the cursor carries both, so
+        segments that start at the same millisecond are never skipped between pages.
+
+        Args:
+            video_id (str): YouTube video ID
+            after (str, optional): Cursor returned by the previous page
+            limit (int): Maximum number of segments per page
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        after_ms, after_seq = -1, -1
+        if after:
+            try:
+                after_ms, after_seq = (int(part) for part in after.split(":"))
+            except ValueError:
+                raise ValueError(f"Invalid cursor: {after!r}")
+        rows = self._connect().execute(
+            """
+            SELECT seq, start_ms, end_ms, text FROM segments
+            WHERE video_id = ? AND (start_ms > ? OR (start_ms = ? AND seq > ?))
+            ORDER BY start_ms, seq LIMIT ?
+            """,
+            (video_id, after_ms, after_ms, after_seq, limit)
+        ).fetchall()
+        segments = [dict(row) for row in rows]
+        last = segments[-1] if len(segments) == limit else None
+        return {
+            "video_id": video_id,
+            "segments": segments,
+            "next_cursor": f"{last['start_ms']}:{last['seq']}" if last else None
+        }
+
+    def search(self, query: str, limit: int = 20, after: Optional[int] = None,
+               video_id: Optional[str] = None, phrase: bool = True) -> Dict[str, Any]:
+        """Search segments across all transcripts.
+
+        Results are returned in index order with keyset pagination, so each
+        page is a bounded index scan regardless of how many segments match.
+
+        Args:
+            query (str): Text to search for
+            limit (int): Maximum number of hits per page
+            after (int, optional): Cursor returned by the previous page
+            video_id (str, optional): Restrict the search to one video
+            phrase (bool): Match the query as an exact phrase; otherwise it is
+                passed to FTS5 as a query expression
+
+        Returns:
+            Dict[str, Any]: Hits with video ID, timestamps in milliseconds and a
+                highlighted snippet, plus the cursor for the next page
+        """
+        match = '"' + query.replace('"', '""') + '"' if phrase else query
+        sql = """
+            SELECT s.id, s.video_id, s.start_ms, s.end_ms, s.text,
+                   snippet(segments_fts, 0, '[', ']', '...', 16) AS snippet
+            FROM segments_fts
+            JOIN segments s ON s.id = segments_fts.rowid
+            WHERE segments_fts MATCH ? AND segments_fts.rowid > ?
+        """
+        params: List[Any] = [match, after or 0]
+        if video_id:
+            sql += " AND s.video_id = ?"
+            params.append(video_id)
+        sql += " ORDER BY segments_fts.rowid LIMIT ?"
+        params.append(limit)
+
+        rows = self._connect().execute(sql, params).fetchall()
+        hits = [
+            {
+                "video_id": row["video_id"],
+                "start_ms": row["start_ms"],
+                "end_ms": row["end_ms"],
+                "text": row["text"],
+                "snippet": row["snippet"],
+            }
+            for row in rows
+        ]
+        return {
+            "query": query,
+            "hits": hits,
+            "next_cursor": rows[-1]["id"] if len(rows) == limit else None
+        }
+
+    def record_run(self, video_id: str, whisper_model: str, audio_seconds: float,
+                   transcribe_seconds: float):
+        """Record how long a Whisper run took, for real-time factor estimates."""
+        if audio_seconds <= 0:
+            return
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO transcription_runs (video_id, whisper_model, audio_seconds,
+                                                transcribe_seconds, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (video_id, whisper_model, audio_seconds, transcribe_seconds, time.time())
+            )
+
+    def real_time_factors(self, recent: int = 50) -> Dict[str, Dict[str, Any]]:
+        """Summarize recent runs per Whisper model.
+
+        Args:
+            recent (int): Number of most recent runs per model to consider
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Per model, the median real-time factor
+                (transcription seconds per audio second) and the number of runs
+        """
+        rows = self._connect().execute(
+            """
+            SELECT whisper_model, transcribe_seconds / audio_seconds AS rtf FROM (
+                SELECT whisper_model, transcribe_seconds, audio_seconds,
+                       ROW_NUMBER() OVER (PARTITION BY whisper_model ORDER BY id DESC) AS recency
+                FROM transcription_runs
+            ) WHERE recency <= ?
+            """,
+            (recent,)
+        ).fetchall()
+
+        by_model: Dict[str, List[float]] = {}
+        for row in rows:
+            by_model.setdefault(row["whisper_model"], []).append(row["rtf"])
+        factors = {}
+        for model, values in by_model.items():
+            values.sort()
+            middle = len(values) // 2
+            median = values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+            factors[model] = {"real_time_factor": median, "runs": len(values)}
+        return factors
+
+
+@lru_cache(maxsize=None)
+def get_transcript_store(db_path: Optional[str] = None) -> TranscriptStore:
+    """Return the process-wide transcript store."""
+    return TranscriptStore(db_path)
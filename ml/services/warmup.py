@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Start-up warm-up of Whisper models and the readiness state that goes with it
+"""
+
+import os
+import time
+import logging
+import threading
+from functools import lru_cache
+from typing import Dict, Any, List, Optional
+
+from .model_pool import get_model_pool, select_device
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+READY = "ready"
+FAILED = "failed"
+
+
+class Warmup:
+    def __init__(self, model_sizes: Optional[List[str]] = None, use_gpu: Optional[bool] = None):
+        """Preload Whisper models and run a synthetic transcription through each.
+
+        Until every listed model is warm the service is live but not ready, so a load
+        balancer polling the readiness endpoint keeps traffic away from it.
+
+        Args:
+            model_sizes (List[str], optional): Whisper sizes to preload. Defaults to the
+                TRANSCRIBE_WARMUP_MODELS environment variable (comma separated, "base"
+                when unset). An empty list makes the service ready immediately.
+            use_gpu (bool, optional): Load the models on the GPU when available. Defaults
+                to the TRANSCRIBE_WARMUP_USE_GPU environment variable.
+        """
+        if model_sizes is None:
+            model_sizes = [size.strip() for size in os.getenv("TRANSCRIBE_WARMUP_MODELS", "base").split(",")
+                           if size.strip()]
+        if use_gpu is None:
+            use_gpu = os.getenv("TRANSCRIBE_WARMUP_USE_GPU", "false").lower() == "true"
+        self.model_sizes = model_sizes
+        self.use_gpu = use_gpu
+        self.state = PENDING if model_sizes else READY
+        self.models: Dict[str, Dict[str, Any]] = {size: {"status": PENDING} for size in model_sizes}
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    def run(self, inference: bool = True):
+        """Load and warm every listed model in this thread.
+
+        Args:
+            inference (bool): Also run the synthetic transcription. A pre-fork master
+                only loads the weights and leaves the inference to each worker.
+        """
+        with self._lock:
+            if self.state != PENDING:
+                return
+            self.state = RUNNING
+            self.started_at = time.time()
+
+        device = select_device(self.use_gpu)
+        failed = False
+        for size in self.model_sizes:
+            self.models[size]["status"] = RUNNING
+            try:
+                timings = get_model_pool().preload(size, device, warm_up=inference)
+                self.models[size] = {"status": READY, **timings}
+                logger.info(f"Warmed up Whisper {size} on {device}: load {timings['load_seconds']:.1f}s"
+                            + (f", first inference {timings['warmup_seconds']:.1f}s" if inference else ""))
+            except Exception as e:
+                failed = True
+                self.models[size] = {"status": FAILED, "error": str(e)}
+                logger.error(f"Warm-up of Whisper {size} failed: {str(e)}")
+
+        self.finished_at = time.time()
+        self.state = FAILED if failed else READY
+
+    def warm_up_loaded(self):
+        """Run the synthetic transcription through models loaded by ``run(inference=False)``.
+
+        Called in each worker after a pre-fork master has loaded the weights, before the
+        worker accepts requests.
+        """
+        for key, seconds in get_model_pool().warm_up_idle().items():
+            size = key.split("/")[0]
+            if size in self.models:
+                self.models[size]["warmup_seconds"] = seconds
+            logger.info(f"Warmed up Whisper {key} in worker {os.getpid()}: first inference {seconds:.1f}s")
+
+    def start(self) -> "Warmup":
+        """Run the warm-up in a background thread so liveness checks answer meanwhile."""
+        with self._lock:
+            if self._thread is None and self.state == PENDING:
+                self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+                self._thread.start()
+        return self
+
+    def status(self) -> Dict[str, Any]:
+        """Report readiness, the state of each model and how long the warm-up took."""
+        end = self.finished_at or time.time()
+        return {
+            "ready": self.ready,
+            "state": self.state,
+            "models": self.models,
+            "elapsed_seconds": end - self.started_at if self.started_at else None,
+            "pool": get_model_pool().stats(),
+        }
+
+
+@lru_cache(maxsize=None)
+def get_warmup() -> Warmup:
+    """Return the process-wide warm-up."""
+    return Warmup()
@@ -10,10 +10,19 @@ from typing import Dict, Any, Optional
 import logging
 import json
 import requests
-import glob
 import importlib.util
 import time
-from datetime import datetime, timedelta
+from urllib.parse import urlparse, parse_qs
+
+from .audio_cache import get_audio_cache, DEFAULT_CACHE_DIR
+from .decode_presets import resolve_decode_options, default_preset
+from .decoding_guard import guard_for, transcribe_audio
+from .audio_formats import speech_format_selector, select_speech_format, estimated_size
+from .captions import fetch_captions
+from .metrics import (STAGE_SECONDS, REAL_TIME_FACTOR, TRANSCRIPTIONS, OLLAMA_TOKENS_PER_SECOND,
+                      OLLAMA_REQUEST_SECONDS, DOWNLOAD_BYTES, DOWNLOAD_THROUGHPUT)
+from .model_pool import get_model_pool, select_device
+from .transcript_store import get_transcript_store
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -40,13 +49,36 @@ def check_dependencies():
     # Import dependencies only after checking they exist
     return True
 
-# Only import dependencies if they're available
-if check_dependencies():
-    import yt_dlp
-    import whisper
-else:
+if not check_dependencies():
     logger.warning("Running with limited functionality due to missing dependencies")
 
+# yt-dlp and Whisper (which pulls in torch) are imported on first use, so
+# importing this module stays cheap for services that never transcribe
+yt_dlp = None
+whisper = None
+
+
+def import_yt_dlp():
+    """Import yt-dlp on first use and return the module."""
+    global yt_dlp
+    if yt_dlp is None:
+        if importlib.util.find_spec("yt_dlp") is None:
+            raise ImportError("yt-dlp is not installed. Please install it with: pip install yt-dlp")
+        import yt_dlp as module
+        yt_dlp = module
+    return yt_dlp
+
+
+def import_whisper():
+    """Import Whisper on first use and return the module."""
+    global whisper
+    if whisper is None:
+        if importlib.util.find_spec("whisper") is None:
+            raise ImportError("whisper is not installed. Please install it with: pip install openai-whisper")
+        import whisper as module
+        whisper = module
+    return whisper
+
 class YouTubeTranscriber:
     def __init__(self, whisper_model_size: str = "base", use_gpu: bool = False):
         """Initialize the YouTube transcriber with the specified Whisper model size.
@@ -57,10 +89,10 @@ class YouTubeTranscriber:
         """
         self.whisper_model_size = whisper_model_size
         self.use_gpu = use_gpu
-        self.model = None  # Lazy load the model when needed
+        self._device = None  # Resolved when the first model is needed
         
         # Create temp directory for downloaded files
-        self.temp_dir = os.path.join(os.path.expanduser("~"), ".codexcontinue/temp/youtube")
+        self.temp_dir = DEFAULT_CACHE_DIR
         os.makedirs(self.temp_dir, exist_ok=True)
         
         # Default Ollama endpoint
@@ -101,31 +133,10 @@ class YouTubeTranscriber:
         # Update environment variables
         self._update_environment_paths()
         
-        # Clean up old temporary files
-        self._cleanup_old_files()
-    
-    def _cleanup_old_files(self, max_age_days: int = 7):
-        """Clean up old temporary files that are older than max_age_days."""
-        try:
-            logger.info(f"Cleaning up temporary files older than {max_age_days} days")
-            now = datetime.now()
-            count = 0
-            
-            for file_path in glob.glob(os.path.join(self.temp_dir, "*")):
-                # Get file modification time
-                mtime = os.path.getmtime(file_path)
-                mod_time = datetime.fromtimestamp(mtime)
-                
-                # If file is older than max_age_days, delete it
-                if now - mod_time > timedelta(days=max_age_days):
-                    os.remove(file_path)
-                    count += 1
-                    logger.debug(f"Removed old file: {file_path}")
-            
-            if count > 0:
-                logger.info(f"Cleaned up {count} old temporary files")
-        except Exception as e:
-            logger.warning(f"Error cleaning up temporary files: {str(e)}")
+        # Downloaded audio is kept in a quota-managed cache that cleans itself up
+        # on a background schedule
+        self.audio_cache = get_audio_cache(self.temp_dir)
+        self.last_download = None
     
     def _find_ffmpeg(self):
         """Find ffmpeg in standard locations or from environment variable."""
@@ -161,51 +172,79 @@ class YouTubeTranscriber:
         logger.info(f"Updated environment PATH: {os.environ['PATH']}")
         logger.info(f"Updated FFMPEG_LOCATION: {os.environ['FFMPEG_LOCATION']}")
     
-    def _load_model(self):
-        """Load the Whisper model if not already loaded."""
-        if self.model is None:
-            logger.info(f"Loading Whisper model: {self.whisper_model_size}")
-            try:
-                # Determine device based on configuration and availability
-                device = "cpu"
-                if self.use_gpu:
-                    try:
-                        import torch
-                        if torch.cuda.is_available():
-                            device = "cuda"
-                            logger.info("CUDA is available, using GPU for transcription")
-                        elif hasattr(torch.backends, 'mps') and torch.backends.mps.is_available():
-                            device = "mps"
-                            logger.info("MPS is available, using Apple Silicon GPU for transcription")
-                    except ImportError:
-                        logger.warning("Could not import torch to check GPU availability, defaulting to CPU")
-                
-                logger.info(f"Loading Whisper model on device: {device}")
-                self.model = whisper.load_model(self.whisper_model_size, device=device)
-                logger.info(f"Whisper model loaded successfully on {device}")
-            except Exception as e:
-                logger.error(f"Error loading model: {str(e)}")
-                raise
-        return self.model
+    @property
+    def device(self) -> str:
+        """Device the Whisper model runs on."""
+        if self._device is None:
+            self._device = select_device(self.use_gpu)
+        return self._device
+    
+    @staticmethod
+    def get_video_id(url: str) -> str:
+        """Extract the video ID from a YouTube URL.
+        
+        Understands watch URLs (including ones inside a playlist), youtu.be
+        short links and /shorts/, /embed/ and /live/ paths.
+        """
+        parsed = urlparse(url)
+        query = parse_qs(parsed.query)
+        if "v" in query:
+            return query["v"][0]
+        
+        parts = [part for part in parsed.path.split("/") if part]
+        if len(parts) >= 2 and parts[0] in ("shorts", "embed", "live", "v"):
+            return parts[1]
+        return parts[-1] if parts else url
     
-    def download_audio(self, url: str) -> str:
-        """Download audio from a YouTube video."""
+    def record_download(self, fmt: Dict[str, Any], bytes_downloaded: int, seconds: float,
+                        resumed_bytes: int = 0) -> Dict[str, Any]:
+        """Keep the statistics of the last download on the transcriber and export them as metrics."""
+        throughput = bytes_downloaded / seconds if seconds > 0 else None
+        self.last_download = {
+            "format_id": fmt.get("format_id"),
+            "acodec": fmt.get("acodec"),
+            "abr": fmt.get("abr") or fmt.get("tbr"),
+            "bytes_downloaded": bytes_downloaded,
+            "resumed_bytes": resumed_bytes,
+            "download_seconds": seconds,
+            "bytes_per_second": throughput,
+        }
+        DOWNLOAD_BYTES.labels(fmt.get("acodec") or "unknown").inc(bytes_downloaded)
+        if throughput:
+            DOWNLOAD_THROUGHPUT.observe(throughput)
+        logger.info(f"Downloaded {bytes_downloaded / 1e6:.1f} MB of format {fmt.get('format_id')} "
+                    f"in {seconds:.2f}s" + (f" ({throughput / 1e6:.2f} MB/s)" if throughput else ""))
+        return self.last_download
+    
+    def download_audio(self, url: str, duration: Optional[float] = None) -> str:
+        """Download audio from a YouTube video.
+        
+        Fetches the smallest audio-only stream that meets the speech-quality
+        floor (see audio_formats.select_speech_format), in parallel fragments
+        where the format has them, resuming a partial download left by an
+        earlier attempt. Statistics of the download are kept in last_download.
+        
+        Args:
+            url (str): YouTube video URL
+            duration (Optional[float], optional): Video duration, if the caller already
+                knows it. Defaults to the duration in the video's metadata.
+        """
         logger.info(f"Downloading audio from: {url}")
+        self.last_download = None
         
         # Ensure yt-dlp is available
-        if 'yt_dlp' not in globals():
-            raise ImportError("yt-dlp is not installed. Please install it with: pip install yt-dlp")
+        import_yt_dlp()
         
         # Create a unique filename based on the video ID
-        video_id = url.split("v=")[1].split("&")[0] if "v=" in url else url.split("/")[-1]
+        video_id = self.get_video_id(url)
         output_file = os.path.join(self.temp_dir, f"{video_id}")
         output_file_mp3 = f"{output_file}.mp3"
         
-        if os.path.exists(output_file_mp3):
-            logger.info(f"Audio file already exists: {output_file_mp3}")
-            # Update file access time to prevent early cleanup
-            os.utime(output_file_mp3, None)
-            return output_file_mp3
+        cached_file = self.audio_cache.lookup(f"{video_id}.mp3")
+        if cached_file:
+            logger.info(f"Audio file already cached: {cached_file}")
+            self.last_download = {"cached": True, "bytes_downloaded": 0}
+            return cached_file
         
         # Ensure ffmpeg is properly set in the environment
         os.environ["PATH"] = f"{self.ffmpeg_location}:{os.environ.get('PATH', '')}"
@@ -229,10 +268,27 @@ class YouTubeTranscriber:
             logger.error(error_msg)
             raise FileNotFoundError(error_msg)
         
+        # Track what is transferred, for the bandwidth statistics
+        partial_file = f"{output_file}.part"
+        resumed_bytes = os.path.getsize(partial_file) if os.path.exists(partial_file) else 0
+        progress = {}
+        
+        def on_progress(status):
+            if status.get("status") == "finished":
+                progress["bytes"] = status.get("downloaded_bytes") or status.get("total_bytes") or 0
+                progress["format"] = status.get("info_dict") or {}
+        
         # Configure yt-dlp options
         ydl_opts = {
-            'format': 'bestaudio/best',
             'outtmpl': output_file,
+            # Fetch fragmented (DASH/HLS) formats several fragments at a time
+            'concurrent_fragment_downloads': int(os.getenv("TRANSCRIBE_DOWNLOAD_FRAGMENTS", 4)),
+            # Resume .part files from interrupted attempts, in chunks that avoid throttling
+            'continuedl': True,
+            'http_chunk_size': 10 * 1024 * 1024,
+            'retries': 10,
+            'fragment_retries': 10,
+            'progress_hooks': [on_progress],
             'postprocessors': [{
                 'key': 'FFmpegExtractAudio',
                 'preferredcodec': 'mp3',
@@ -249,8 +305,9 @@ class YouTubeTranscriber:
         
         # Download the audio
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
+            download_start = time.time()
+            self._extract_speech_format(url, ydl_opts, duration, download=True)
+            download_seconds = time.time() - download_start
         except Exception as e:
             logger.error(f"Error downloading audio: {str(e)}")
             raise RuntimeError(f"Failed to download audio from YouTube: {str(e)}")
@@ -263,30 +320,228 @@ class YouTubeTranscriber:
             raise FileNotFoundError(f"Downloaded audio file not found at: {output_file_mp3}")
         else:
             logger.info(f"Audio downloaded successfully: {output_file_mp3}")
+        
+        # Bytes of a resumed file that were already on disk were not transferred now
+        self.record_download(progress.get("format") or {}, max(0, progress.get("bytes", 0) - resumed_bytes),
+                             download_seconds, resumed_bytes)
+        
+        # Register the file with the cache, which evicts old entries if over quota
+        self.audio_cache.add(os.path.basename(output_file_mp3))
             
         return output_file_mp3
     
-    def transcribe(self, audio_file: str, language: Optional[str] = None) -> Dict[str, Any]:
-        """Transcribe the audio file using Whisper."""
+    @staticmethod
+    def _extract_speech_format(url: str, ydl_opts: Dict[str, Any], duration: Optional[float],
+                               download: bool) -> Dict[str, Any]:
+        """Run yt-dlp with the speech format selector, sized with the video's duration.
+        
+        Formats often lack a file size, which the selector then estimates from the
+        bitrate and duration. yt-dlp does not pass the duration to the selector, so
+        without one from the caller the metadata is extracted unprocessed first and
+        processed (format selection and download) afterwards, which makes the same
+        requests as extracting and processing in one call.
+        """
+        info = None
+        if duration is None:
+            with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True}) as ydl:
+                info = ydl.extract_info(url, download=False, process=False)
+            duration = info.get("duration")
+        
+        with yt_dlp.YoutubeDL({**ydl_opts, 'format': speech_format_selector(duration=duration)}) as ydl:
+            if info is None:
+                return ydl.extract_info(url, download=download)
+            return ydl.process_ie_result(info, download=download)
+    
+    @staticmethod
+    def extract_info(url: str) -> Dict[str, Any]:
+        """Fetch a video's metadata with yt-dlp without downloading any media."""
+        # Ensure yt-dlp is available
+        import_yt_dlp()
+        
+        ydl_opts = {
+            'skip_download': True,
+            'quiet': True,
+            'no_warnings': True,
+        }
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            return ydl.extract_info(url, download=False)
+    
+    @staticmethod
+    def probe(url: str, info: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Summarize what a transcription of the video would involve, without downloading it.
+        
+        Args:
+            url (str): YouTube video URL
+            info (Optional[Dict[str, Any]], optional): Metadata from extract_info, if already fetched
+            
+        Returns:
+            Dict[str, Any]: Duration, live status, audio formats, the one a download would
+                fetch, and caption availability
+        """
+        info = info or YouTubeTranscriber.extract_info(url)
+        audio_formats = [
+            {
+                "format_id": fmt.get("format_id"),
+                "ext": fmt.get("ext"),
+                "acodec": fmt.get("acodec"),
+                "abr": fmt.get("abr"),
+                "filesize": fmt.get("filesize") or fmt.get("filesize_approx"),
+            }
+            for fmt in info.get("formats") or []
+            if fmt.get("acodec") not in (None, "none") and fmt.get("vcodec") in (None, "none")
+        ]
+        selected = select_speech_format(info.get("formats") or [], info.get("duration"))
+        subtitles = {lang: tracks for lang, tracks in (info.get("subtitles") or {}).items() if lang != "live_chat"}
+        return {
+            "video_id": info.get("id") or YouTubeTranscriber.get_video_id(url),
+            "title": info.get("title"),
+            "duration": info.get("duration"),
+            "is_live": bool(info.get("is_live")),
+            "language": info.get("language"),
+            "audio_formats": audio_formats,
+            "download_format": selected.get("format_id") if selected else None,
+            "download_bytes_estimate": estimated_size(selected, info.get("duration")) if selected else None,
+            "has_captions": bool(subtitles),
+            "caption_languages": sorted(subtitles),
+            "has_auto_captions": bool(info.get("automatic_captions")),
+        }
+    
+    def get_captions(self, url: str, language: Optional[str] = None, allow_auto: bool = False,
+                     info: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Fetch the video's existing captions instead of transcribing its audio.
+        
+        Only video metadata and the caption track are downloaded.
+        
+        Args:
+            url (str): YouTube video URL
+            language (Optional[str], optional): Preferred caption language. Defaults to None.
+            allow_auto (bool, optional): Accept YouTube's automatic captions. Defaults to False.
+            info (Optional[Dict[str, Any]], optional): Metadata from extract_info, if already fetched
+            
+        Returns:
+            Optional[Dict[str, Any]]: Transcript in Whisper's text/segments schema, or None
+                when the video has no usable caption track
+        """
+        logger.info(f"Looking for captions: {url}")
+        return fetch_captions(info or self.extract_info(url), language, allow_auto)
+    
+    def transcribe(self, audio_file: str, language: Optional[str] = None,
+                   decode_options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Transcribe the audio file using Whisper.
+        
+        Args:
+            audio_file (str): Audio file to transcribe
+            language (Optional[str], optional): Language code for transcription. Defaults to None.
+            decode_options (Optional[Dict[str, Any]], optional): Decode options from
+                resolve_decode_options. Defaults to the default preset's.
+        """
         logger.info(f"Transcribing audio file: {audio_file}")
         
         # Ensure whisper is available
-        if 'whisper' not in globals():
-            raise ImportError("whisper is not installed. Please install it with: pip install openai-whisper")
+        import_whisper()
         
-        # Load the model
-        model = self._load_model()
-        
-        # Transcribe
-        transcription_options = {}
+        # Transcribe with a model from the process-wide pool, loading one if none is free
+        transcription_options = dict(decode_options or resolve_decode_options())
         if language:
             transcription_options["language"] = language
             
-        result = model.transcribe(audio_file, **transcription_options)
+        if os.environ.get("TRANSCRIBE_BATCHING", "false").lower() == "true":
+            # Share batched forward passes with the other transcriptions running now. Batched
+            # windows are never conditioned on each other and carry no word timings.
+            from .inference_batcher import get_inference_batcher
+            result = get_inference_batcher(self.whisper_model_size, self.device).transcribe(
+                audio_file, language,
+                temperature=transcription_options["temperature"],
+                beam_size=transcription_options.get("beam_size"),
+                best_of=transcription_options.get("best_of")
+            )
+        else:
+            # Cut short windows that fall into repetition loops, and mark them as gaps
+            guard = guard_for(self.whisper_model_size)
+            with get_model_pool().checkout(self.whisper_model_size, self.device) as model:
+                result = transcribe_audio(model, audio_file, guard=guard, **transcription_options)
+        
+        logger.info("Transcription completed successfully")
+        return result
+    
+    def cached_audio(self, url: str) -> Optional[str]:
+        """Return the cached audio file of a video, if either download path has kept one."""
+        video_id = self.get_video_id(url)
+        return self.audio_cache.lookup(f"{video_id}.mp3") or self.audio_cache.lookup(f"{video_id}.audio")
+    
+    def transcribe_pipelined(self, url: str, language: Optional[str] = None,
+                             decode_options: Optional[Dict[str, Any]] = None,
+                             duration: Optional[float] = None) -> Dict[str, Any]:
+        """Transcribe a video while its audio is still downloading.
         
+        The audio stream is fetched directly, piped through ffmpeg into an in-memory
+        buffer of 16 kHz PCM, and transcribed 30 seconds at a time as it arrives.
+        The downloaded stream is kept in the audio cache as ``{video_id}.audio``.
+        
+        Args:
+            url (str): YouTube video URL
+            language (Optional[str], optional): Language code for transcription. Defaults to None.
+            decode_options (Optional[Dict[str, Any]], optional): Decode options from
+                resolve_decode_options. Defaults to the default preset's.
+            duration (Optional[float], optional): Video duration, if the caller already
+                knows it. Defaults to the duration in the video's metadata.
+            
+        Returns:
+            Dict[str, Any]: The transcription, with stage timings under ``pipeline``
+        """
+        from .audio_pipeline import pipelined_transcription
+        
+        logger.info(f"Transcribing while downloading: {url}")
+        import_yt_dlp()
+        import_whisper()
+        
+        # Resolve the direct URL of the audio stream
+        info = self._extract_speech_format(url, {'quiet': True, 'no_warnings': True}, duration, download=False)
+        
+        video_id = self.get_video_id(url)
+        name = f"{video_id}.audio"
+        ffmpeg = os.path.join(self.ffmpeg_location, "ffmpeg")
+        options = {**(decode_options or resolve_decode_options()), "fp16": self.device == "cuda"}
+        guard = guard_for(self.whisper_model_size)
+        with get_model_pool().checkout(self.whisper_model_size, self.device) as model:
+            result = pipelined_transcription(model, info["url"], info.get("http_headers") or {},
+                                             self.audio_cache.path_for(name), ffmpeg, language,
+                                             guard=guard, **options)
+        
+        pipeline = result["pipeline"]
+        self.record_download(info, pipeline["bytes_downloaded"] or 0, pipeline["download_seconds"])
+        
+        # Register the file with the cache, which evicts old entries if over quota
+        self.audio_cache.add(name)
+        result["audio_file"] = self.audio_cache.path_for(name)
         logger.info("Transcription completed successfully")
         return result
     
+    def rerun_low_confidence(self, result: Dict[str, Any], model_size: str,
+                             decode_options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Re-transcribe a result's low-confidence passages with a larger model, in place.
+        
+        Args:
+            result (Dict[str, Any]): Whisper result with ``segments`` and ``audio_file``
+            model_size (str): Whisper model size to re-run passages with
+            decode_options (Optional[Dict[str, Any]], optional): Decode options from
+                resolve_decode_options. Defaults to the default preset's.
+            
+        Returns:
+            Dict[str, Any]: How many segments and seconds of audio were re-run
+        """
+        from .selective_retranscription import retranscribe_low_confidence
+        
+        whisper = import_whisper()
+        audio = whisper.load_audio(result["audio_file"])
+        options = {**(decode_options or resolve_decode_options()), "fp16": self.device == "cuda"}
+        with get_model_pool().checkout(model_size, self.device) as model:
+            segments, report = retranscribe_low_confidence(model, audio, result.get("segments", []),
+                                                           result.get("language"), **options)
+        result["segments"] = segments
+        result["text"] = "".join(segment["text"] for segment in segments)
+        return {"model": model_size, **report}
+    
     def summarize_transcript(self, transcript: str, max_length: Optional[int] = 500) -> Dict[str, Any]:
         """Summarize the transcript using Ollama.
         
@@ -399,12 +654,14 @@ SUMMARY:"""
             logger.info(f"Making request to Ollama API with model: {self.ollama_model}")
             
             try:
+                request_start = time.time()
                 response = requests.post(
                     f"{self.ollama_api_url}/api/generate",
                     headers=headers,
                     data=json.dumps(data),
                     timeout=60  # Increase timeout for longer transcripts
                 )
+                OLLAMA_REQUEST_SECONDS.labels(self.ollama_model).observe(time.time() - request_start)
             except requests.exceptions.Timeout:
                 logger.error("Timeout while waiting for Ollama response")
                 return {
@@ -423,6 +680,12 @@ SUMMARY:"""
                 summary = result.get("response", "").strip()
                 logger.info("Summarization completed successfully")
                 
+                # Ollama reports generation time in nanoseconds
+                if result.get("eval_count") and result.get("eval_duration"):
+                    OLLAMA_TOKENS_PER_SECOND.labels(self.ollama_model).observe(
+                        result["eval_count"] / (result["eval_duration"] / 1e9)
+                    )
+                
                 return {
                     "summary": summary,
                     "model": self.ollama_model,
@@ -446,13 +709,57 @@ SUMMARY:"""
             }
     
     def process_video(self, url: str, language: Optional[str] = None, 
-                     generate_summary: bool = False) -> Dict[str, Any]:
+                     generate_summary: bool = False, use_captions: bool = False,
+                     allow_auto_captions: bool = False,
+                     video_info: Optional[Dict[str, Any]] = None,
+                     pipelined: Optional[bool] = None,
+                     preset: Optional[str] = None,
+                     decode_options: Optional[Dict[str, Any]] = None,
+                     rerun_model: Optional[str] = None,
+                     preview: bool = False,
+                     callback_url: Optional[str] = None) -> Dict[str, Any]:
         """Download a YouTube video's audio and transcribe it.
         
+        With use_captions, the video's existing caption track is used when there
+        is one and Whisper only runs as a fallback. The result's
+        transcript_source records which path produced the transcript.
+        
+        With pipelined, transcription starts on the first 30 seconds of audio
+        while the rest is still downloading, and processing_time shows how much
+        the download, decode and transcription stages overlapped.
+        
+        preset picks Whisper's speed/accuracy trade-off (see decode_presets) and
+        decode_options overrides individual options. The options used and the run's
+        real-time factor are returned under decode.
+        
+        With rerun_model, the passages the first model was unsure of are
+        transcribed again with that (larger) model and spliced back in; rerun
+        reports how much of the audio that covered.
+        
+        With preview, a transcript from the small preview model is returned at
+        once and the requested model's transcript is produced in the background
+        (see preview_refinement); the result's refinement field identifies the job.
+        
         Args:
             url (str): YouTube video URL
             language (Optional[str], optional): Language code for transcription. Defaults to None.
             generate_summary (bool, optional): Whether to generate a summary. Defaults to False.
+            use_captions (bool, optional): Try the video's captions before Whisper. Defaults to False.
+            allow_auto_captions (bool, optional): Accept automatic captions. Defaults to False.
+            video_info (Optional[Dict[str, Any]], optional): Metadata from extract_info, if the
+                caller already fetched it. Defaults to None.
+            pipelined (Optional[bool], optional): Overlap the download with transcription. Defaults
+                to the TRANSCRIBE_PIPELINED environment variable, or False.
+            preset (Optional[str], optional): Decode preset: fast, balanced or accurate. Defaults
+                to the TRANSCRIBE_PRESET environment variable, or balanced.
+            decode_options (Optional[Dict[str, Any]], optional): Overrides of the preset's options.
+                Defaults to None.
+            rerun_model (Optional[str], optional): Model size to re-run low-confidence passages
+                with. Defaults to the TRANSCRIBE_RERUN_MODEL environment variable, or none.
+            preview (bool, optional): Return a quick preview and refine it in the background.
+                Defaults to False.
+            callback_url (Optional[str], optional): URL the refined transcript is POSTed to.
+                Defaults to None.
             
         Returns:
             Dict[str, Any]: Dictionary containing transcription results and optional summary
@@ -463,30 +770,178 @@ SUMMARY:"""
         
         # Initialize result variable
         result = None
+        if pipelined is None:
+            pipelined = os.environ.get("TRANSCRIBE_PIPELINED", "false").lower() == "true"
         
         try:
-            # Download the audio
-            logger.info("Step 1: Downloading audio...")
-            audio_file = self.download_audio(url)
-            download_time = time.time() - start_time
-            logger.info(f"Audio download completed in {download_time:.2f} seconds")
+            preset = preset or default_preset()
+            options = resolve_decode_options(preset, decode_options)
+            rerun_model = rerun_model or os.environ.get("TRANSCRIBE_RERUN_MODEL") or None
+            # Known from the probe, if there was one; format selection estimates sizes from it
+            known_duration = (video_info or {}).get("duration")
             
-            # Transcribe the audio
-            logger.info(f"Step 2: Transcribing audio with Whisper {self.whisper_model_size} model...")
-            transcribe_start = time.time()
-            result = self.transcribe(audio_file, language)
-            transcribe_time = time.time() - transcribe_start
-            logger.info(f"Transcription completed in {transcribe_time:.2f} seconds")
+            # Prefer existing captions, which skip the audio download and Whisper entirely
+            if use_captions:
+                logger.info("Step 1: Checking for captions...")
+                try:
+                    result = self.get_captions(url, language, allow_auto_captions, info=video_info)
+                except Exception as e:
+                    logger.warning(f"Caption lookup failed, falling back to Whisper: {str(e)}")
+                    result = None
+                captions_time = time.time() - start_time
+                if result is None:
+                    logger.info("No usable captions found, falling back to Whisper")
+            
+            if result is not None:
+                STAGE_SECONDS.labels("captions").observe(captions_time)
+                result["audio_file"] = None
+                result["whisper_model"] = None
+                result["processing_time"] = {
+                    "captions_seconds": captions_time,
+                    "total_seconds": time.time() - start_time
+                }
+            elif preview:
+                from .preview_refinement import get_preview_refiner
+                
+                # Download the audio
+                logger.info("Step 1: Downloading audio...")
+                download_start = time.time()
+                audio_file = self.cached_audio(url)
+                if audio_file:
+                    self.last_download = {"cached": True, "bytes_downloaded": 0}
+                else:
+                    audio_file = self.download_audio(url, duration=known_duration)
+                download_time = time.time() - download_start
+                logger.info(f"Audio download completed in {download_time:.2f} seconds")
+                
+                # Transcribe a preview now and queue the requested model's transcript
+                refiner = get_preview_refiner()
+                logger.info(f"Step 2: Transcribing a preview with Whisper {refiner.preview_model} model...")
+                transcribe_start = time.time()
+                import_whisper()
+                with self.audio_cache.pinned(os.path.basename(audio_file)):
+                    result = refiner.preview(url, self.get_video_id(url), audio_file, self.whisper_model_size,
+                                             self.device, language, options, callback_url)
+                transcribe_time = time.time() - transcribe_start
+                logger.info(f"Preview completed in {transcribe_time:.2f} seconds")
+                
+                result["transcript_source"] = "whisper"
+                result["audio_file"] = audio_file
+                result["processing_time"] = {
+                    "download_seconds": download_time,
+                    "transcribe_seconds": transcribe_time,
+                    "total_seconds": time.time() - start_time
+                }
+            elif pipelined and not self.cached_audio(url):
+                # Download, decode and transcribe at the same time
+                logger.info(f"Step 1: Downloading and transcribing with Whisper {self.whisper_model_size} model...")
+                result = self.transcribe_pipelined(url, language, options, duration=known_duration)
+                pipeline = result.pop("pipeline")
+                download_time = pipeline["download_seconds"]
+                transcribe_time = pipeline["transcribe_seconds"]
+                logger.info(f"Pipelined transcription completed in {pipeline['pipeline_seconds']:.2f} seconds, "
+                            f"{pipeline['overlap_seconds']:.2f} seconds saved by overlapping")
+                
+                result["transcript_source"] = "whisper"
+                result["whisper_model"] = self.whisper_model_size
+                result["processing_time"] = {
+                    "download_seconds": download_time,
+                    "decode_seconds": pipeline["decode_seconds"],
+                    "transcribe_seconds": transcribe_time,
+                    "pipeline_seconds": pipeline["pipeline_seconds"],
+                    "transcribe_during_download_seconds": pipeline["transcribe_during_download_seconds"],
+                    "overlap_seconds": pipeline["overlap_seconds"],
+                    "first_window_seconds": pipeline["first_window_seconds"],
+                    "total_seconds": time.time() - start_time
+                }
+            else:
+                # Download the audio
+                logger.info("Step 1: Downloading audio...")
+                download_start = time.time()
+                audio_file = self.cached_audio(url)
+                if audio_file:
+                    self.last_download = {"cached": True, "bytes_downloaded": 0}
+                else:
+                    audio_file = self.download_audio(url, duration=known_duration)
+                download_time = time.time() - download_start
+                logger.info(f"Audio download completed in {download_time:.2f} seconds")
+                
+                # Transcribe the audio
+                logger.info(f"Step 2: Transcribing audio with Whisper {self.whisper_model_size} model...")
+                transcribe_start = time.time()
+                with self.audio_cache.pinned(os.path.basename(audio_file)):
+                    result = self.transcribe(audio_file, language, options)
+                transcribe_time = time.time() - transcribe_start
+                logger.info(f"Transcription completed in {transcribe_time:.2f} seconds")
+                
+                result["transcript_source"] = "whisper"
+                result["audio_file"] = audio_file
+                result["whisper_model"] = self.whisper_model_size
+                result["processing_time"] = {
+                    "download_seconds": download_time,
+                    "transcribe_seconds": transcribe_time,
+                    "total_seconds": time.time() - start_time
+                }
+            
+            if result.get("transcript_source") == "whisper":
+                if use_captions:
+                    result["processing_time"]["captions_seconds"] = captions_time
+                result["download"] = self.last_download
+                if "guard" in result:
+                    result["processing_time"]["runaway_decode_seconds"] = result["guard"]["wasted_decode_seconds"]
+                
+                # Keep a history of real-time factors for admission-control estimates
+                audio_seconds = (video_info or {}).get("duration") or (
+                    result["segments"][-1]["end"] if result.get("segments") else 0)
+                result["audio_seconds"] = audio_seconds
+                result["decode"] = {
+                    "preset": preset,
+                    "options": options,
+                    "real_time_factor": transcribe_time / audio_seconds if audio_seconds else None,
+                }
+                STAGE_SECONDS.labels("download").observe(download_time)
+                STAGE_SECONDS.labels("transcribe").observe(transcribe_time)
+                if audio_seconds:
+                    REAL_TIME_FACTOR.labels(result["whisper_model"]).observe(transcribe_time / audio_seconds)
+                try:
+                    get_transcript_store().record_run(
+                        self.get_video_id(url), result["whisper_model"], audio_seconds, transcribe_time
+                    )
+                except Exception as e:
+                    logger.warning(f"Failed to record transcription run: {str(e)}")
+                
+                # Re-run the passages the first model was unsure of with the larger one
+                if rerun_model and rerun_model != self.whisper_model_size and not preview:
+                    logger.info(f"Re-running low-confidence passages with Whisper {rerun_model} model...")
+                    rerun_start = time.time()
+                    try:
+                        with self.audio_cache.pinned(os.path.basename(result["audio_file"])):
+                            result["rerun"] = self.rerun_low_confidence(result, rerun_model, options)
+                    except Exception as e:
+                        logger.warning(f"Re-running low-confidence passages failed, keeping the first pass: {str(e)}")
+                        result["rerun"] = {"model": rerun_model, "error": str(e)}
+                    rerun_time = time.time() - rerun_start
+                    result["processing_time"]["rerun_seconds"] = rerun_time
+                    STAGE_SECONDS.labels("rerun").observe(rerun_time)
             
             # Add metadata
             result["source_url"] = url
-            result["audio_file"] = audio_file
+            result["video_id"] = self.get_video_id(url)
             result["timestamp"] = time.strftime("%Y-%m-%d %H:%M:%S")
-            result["processing_time"] = {
-                "download_seconds": download_time,
-                "transcribe_seconds": transcribe_time,
-                "total_seconds": time.time() - start_time
-            }
+            
+            # Persist the transcript so it can be searched later. A preview is not stored;
+            # its refinement stores the final transcript when it finishes.
+            if os.environ.get("TRANSCRIPT_STORE_ENABLED", "true").lower() == "true" and "refinement" not in result:
+                try:
+                    get_transcript_store().save_transcript(
+                        result["video_id"],
+                        url,
+                        result.get("segments", []),
+                        language=result.get("language"),
+                        whisper_model=result["whisper_model"] or result["transcript_source"]
+                    )
+                except Exception as e:
+                    logger.warning(f"Failed to store transcript: {str(e)}")
             
             # Log transcript statistics
             text_length = len(result.get("text", ""))
@@ -502,6 +957,7 @@ SUMMARY:"""
                 logger.info(f"Summary generation completed in {summary_time:.2f} seconds")
                 
                 result["summary"] = summary_result
+                STAGE_SECONDS.labels("summary").observe(summary_time)
                 if "processing_time" in result:
                     result["processing_time"]["summary_seconds"] = summary_time
             
@@ -510,9 +966,12 @@ SUMMARY:"""
                 result["processing_time"]["total_seconds"] = time.time() - start_time
             
             logger.info(f"Total processing completed in {time.time() - start_time:.2f} seconds")
+            STAGE_SECONDS.labels("total").observe(time.time() - start_time)
+            TRANSCRIPTIONS.labels(result["transcript_source"], "success").inc()
             return result
         except Exception as e:
             logger.error(f"Error processing video: {str(e)}")
+            TRANSCRIPTIONS.labels(result.get("transcript_source", "unknown") if result else "unknown", "error").inc()
             import traceback
             logger.error(traceback.format_exc())
             
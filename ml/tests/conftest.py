@@ -0,0 +1,13 @@
+"""
+Shared test setup: import the ML service as ``ml.services`` (as ml/app.py does)
+and the RAG proxy's services as ``app.services`` (as ml/app_mcp_rag.py does)
+"""
+
+import sys
+from pathlib import Path
+
+ML_DIR = Path(__file__).resolve().parents[1]
+
+for path in (str(ML_DIR.parent), str(ML_DIR)):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,113 @@
+import pytest
+
+from ml.services.admission import AdmissionController, ACCEPT, QUEUE, REJECT
+from ml.services.transcript_store import TranscriptStore
+
+HOUR = 3600
+
+
+@pytest.fixture
+def controller(tmp_path):
+    return AdmissionController(
+        max_duration=4 * HOUR,
+        queue_duration=HOUR,
+        model_policy=[(600, "small"), (float("inf"), "tiny")],
+        store=TranscriptStore(str(tmp_path / "transcripts.db"))
+    )
+
+
+def video(duration, **info):
+    """Return (probe, info) for a video of the given length."""
+    info = {"id": "vid", "duration": duration, **info}
+    probe = {
+        "video_id": "vid",
+        "duration": duration,
+        "is_live": bool(info.get("is_live")),
+        "has_captions": bool(info.get("subtitles")),
+        "has_auto_captions": bool(info.get("automatic_captions")),
+    }
+    return probe, info
+
+
+def track(lang):
+    return {lang: [{"ext": "vtt", "url": f"https://example.com/{lang}.vtt"}]}
+
+
+@pytest.mark.parametrize("duration, action", [
+    (60, ACCEPT),
+    (2 * HOUR, QUEUE),
+    (5 * HOUR, REJECT),
+])
+def test_duration_limits(controller, duration, action):
+    probe, info = video(duration)
+
+    assert controller.decide(probe, info=info)["action"] == action
+
+
+def test_live_streams_are_rejected(controller):
+    probe, info = video(None, is_live=True)
+
+    assert controller.decide(probe, info=info)["action"] == REJECT
+
+
+def test_unknown_duration_is_accepted(controller):
+    probe, info = video(None)
+
+    decision = controller.decide(probe, info=info)
+
+    assert decision["action"] == ACCEPT
+    assert decision["reason"] == "duration unknown"
+
+
+def test_policy_picks_the_model_unless_one_is_requested(controller):
+    probe, info = video(300)
+
+    assert controller.decide(probe, info=info)["whisper_model"] == "small"
+    assert controller.decide(probe, requested_model="auto", info=info)["whisper_model"] == "small"
+    assert controller.decide(probe, requested_model="medium", info=info)["whisper_model"] == "medium"
+    assert controller.decide(video(2 * HOUR)[0])["whisper_model"] == "tiny"
+
+
+def test_long_video_with_a_caption_track_is_accepted(controller):
+    probe, info = video(5 * HOUR, language="en", subtitles=track("en"))
+
+    decision = controller.decide(probe, use_captions=True, info=info)
+
+    assert decision["action"] == ACCEPT
+    assert decision["eta_seconds"] == 0.0
+
+
+def test_captions_are_ignored_unless_requested(controller):
+    probe, info = video(5 * HOUR, language="en", subtitles=track("en"))
+
+    assert controller.decide(probe, info=info)["action"] == REJECT
+
+
+def test_long_video_without_a_track_in_the_requested_language_is_rejected(controller):
+    probe, info = video(5 * HOUR, language="en", subtitles=track("en"))
+
+    decision = controller.decide(probe, use_captions=True, language="german", info=info)
+
+    assert decision["action"] == REJECT
+
+
+def test_translated_auto_captions_do_not_admit_a_long_video(controller):
+    # The video's language is unknown, so its automatic captions may all be translations
+    probe, info = video(5 * HOUR, automatic_captions=track("de"))
+
+    decision = controller.decide(probe, use_captions=True, allow_auto_captions=True, info=info)
+
+    assert decision["action"] == REJECT
+
+
+def test_auto_captions_admit_a_long_video_only_when_allowed(controller):
+    probe, info = video(2 * HOUR, language="en", automatic_captions=track("en-orig"))
+
+    assert controller.decide(probe, use_captions=True, info=info)["action"] == QUEUE
+    assert controller.decide(probe, use_captions=True, allow_auto_captions=True, info=info)["action"] == ACCEPT
+
+
+def test_captions_need_the_video_info(controller):
+    probe, _ = video(5 * HOUR, language="en", subtitles=track("en"))
+
+    assert controller.decide(probe, use_captions=True)["action"] == REJECT
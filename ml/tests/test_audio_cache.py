@@ -0,0 +1,121 @@
+import os
+import time
+
+import pytest
+
+from ml.services.audio_cache import AudioCache
+
+
+def write(cache, name, size):
+    with open(cache.path_for(name), "wb") as f:
+        f.write(b"\0" * size)
+    return cache.add(name)
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / "cache")
+
+
+def test_least_recently_used_entries_are_evicted_over_quota(cache_dir):
+    cache = AudioCache(cache_dir, max_bytes=250)
+    write(cache, "a.mp3", 100)
+    write(cache, "b.mp3", 100)
+    cache.lookup("a.mp3")  # b is now the least recently used
+
+    write(cache, "c.mp3", 100)
+
+    assert cache.lookup("a.mp3") is not None
+    assert cache.lookup("b.mp3") is None
+    assert cache.lookup("c.mp3") is not None
+    assert not os.path.exists(cache.path_for("b.mp3"))
+    assert cache.total_bytes() == 200
+
+
+def test_pinned_entries_are_not_evicted(cache_dir):
+    cache = AudioCache(cache_dir, max_bytes=150)
+    write(cache, "a.mp3", 100)
+
+    with cache.pinned("a.mp3"):
+        write(cache, "b.mp3", 100)
+        assert os.path.exists(cache.path_for("a.mp3"))
+        assert cache.stats()["pinned"] == 1
+
+    assert cache.evict() == 1
+    assert not os.path.exists(cache.path_for("a.mp3"))
+    assert cache.stats()["pinned"] == 0
+
+
+def test_expired_entries_are_evicted(cache_dir):
+    cache = AudioCache(cache_dir, max_bytes=10_000, max_age_days=1)
+    write(cache, "old.mp3", 10)
+    write(cache, "new.mp3", 10)
+    old = time.time() - 2 * 86400
+    cache._connect().execute("UPDATE entries SET last_access = ? WHERE name = 'old.mp3'", (old,))
+
+    assert cache.evict() == 1
+    assert cache.lookup("old.mp3") is None
+    assert cache.lookup("new.mp3") is not None
+
+
+def test_processes_sharing_a_directory_share_quota_pins_and_stats(cache_dir):
+    # Two instances on one directory stand in for two gunicorn workers
+    first = AudioCache(cache_dir, max_bytes=250)
+    second = AudioCache(cache_dir, max_bytes=250)
+    write(first, "a.mp3", 100)
+
+    with first.pinned("a.mp3"):
+        write(second, "b.mp3", 100)
+        write(second, "c.mp3", 100)
+        # Over quota, but a.mp3 is pinned by the other instance, so b.mp3 goes
+        assert os.path.exists(first.path_for("a.mp3"))
+        assert not os.path.exists(first.path_for("b.mp3"))
+
+    assert first.total_bytes() == second.total_bytes() == 200
+    first.lookup("c.mp3")
+    second.lookup("missing.mp3")
+    assert first.stats()["hits"] == second.stats()["hits"] == 1
+    assert first.stats()["misses"] == 1
+    assert second.stats()["evictions"] == 1
+
+
+def test_pins_of_exited_processes_are_released(cache_dir):
+    cache = AudioCache(cache_dir, max_bytes=50)
+    write(cache, "a.mp3", 100)
+    pid = os.fork()
+    if pid == 0:
+        cache.pin("a.mp3")
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert cache.stats()["pinned"] == 1
+
+    assert cache.evict() == 1
+    assert cache.stats()["pinned"] == 0
+
+
+def test_index_is_rebuilt_from_the_directory(cache_dir):
+    cache = AudioCache(cache_dir, max_bytes=10_000)
+    write(cache, "a.mp3", 10)
+    with open(cache.path_for("untracked.mp3"), "wb") as f:
+        f.write(b"\0" * 20)
+    with open(cache.path_for("download.mp3.part"), "wb") as f:
+        f.write(b"\0" * 30)
+    os.remove(cache.path_for("a.mp3"))
+
+    reopened = AudioCache(cache_dir, max_bytes=10_000)
+
+    assert reopened.stats()["entries"] == 1
+    assert reopened.total_bytes() == 20
+
+
+
+def test_cleanup_schedule_restarts_in_forked_children(cache_dir):
+    cache = AudioCache(cache_dir, max_bytes=10_000)
+    cache.start_background_cleanup(interval_seconds=60)
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0 if cache._cleanup_thread.is_alive() and cache._cleanup_pid == os.getpid() else 1)
+    _, status = os.waitpid(pid, 0)
+    cache.stop()
+
+    assert os.waitstatus_to_exitcode(status) == 0
@@ -0,0 +1,35 @@
+from ml.services.audio_formats import select_speech_format, speech_format_selector, estimated_size
+
+
+def audio(format_id, abr, acodec="opus", **fields):
+    return {"format_id": format_id, "abr": abr, "acodec": acodec, "vcodec": "none", **fields}
+
+
+def test_smallest_stream_above_the_floor_is_chosen():
+    formats = [audio("low", 24), audio("speech", 48), audio("music", 128)]
+
+    assert select_speech_format(formats, duration=600, min_abr=32)["format_id"] == "speech"
+
+
+def test_sizes_are_estimated_from_bitrate_and_duration():
+    # A reported size beats an estimate only when it is actually smaller
+    formats = [audio("reported", 64, filesize=10_000_000), audio("estimated", 48)]
+
+    assert estimated_size(formats[1], 600) == 48 * 1000 / 8 * 600
+    assert select_speech_format(formats, duration=600, min_abr=32)["format_id"] == "estimated"
+    assert select_speech_format(formats, duration=None, min_abr=32)["format_id"] == "reported"
+
+
+def test_selector_uses_the_duration_it_is_given():
+    # yt-dlp's context carries the formats only
+    formats = [audio("reported", 64, filesize=10_000_000), audio("estimated", 48)]
+
+    chosen = list(speech_format_selector(min_abr=32, duration=600)({"formats": formats}))
+
+    assert [fmt["format_id"] for fmt in chosen] == ["estimated"]
+
+
+def test_below_the_floor_the_best_stream_is_used():
+    formats = [audio("a", 16), audio("b", 24)]
+
+    assert select_speech_format(formats, duration=600, min_abr=32)["format_id"] == "b"
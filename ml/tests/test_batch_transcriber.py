@@ -0,0 +1,137 @@
+import pytest
+
+from ml.services import batch_transcriber, youtube_transcriber
+from ml.services.batch_transcriber import BatchStore, BatchTranscriber, DONE
+from ml.services.transcript_store import get_transcript_store
+
+
+class FakeCache:
+    def pin(self, name):
+        pass
+
+    def unpin(self, name):
+        pass
+
+
+class FakeTranscriber:
+    """Stands in for YouTubeTranscriber; ``captions`` lists the videos with a caption track."""
+
+    calls = []
+    captions = set()
+
+    def __init__(self, whisper_model_size="base"):
+        self.whisper_model_size = whisper_model_size
+        self.audio_cache = FakeCache()
+
+    @staticmethod
+    def get_video_id(url):
+        return url.rsplit("=", 1)[-1]
+
+    def get_captions(self, url, language=None, allow_auto=False):
+        self.calls.append(("captions", self.get_video_id(url), allow_auto))
+        if self.get_video_id(url) not in self.captions:
+            return None
+        return {"text": " captions", "segments": [{"start": 0.0, "end": 1.0, "text": " captions"}],
+                "language": "en", "transcript_source": "manual_captions"}
+
+    def download_audio(self, url, duration=None):
+        self.calls.append(("download", self.get_video_id(url)))
+        return f"/tmp/{self.get_video_id(url)}.mp3"
+
+    def transcribe(self, audio_file, language=None, decode_options=None):
+        self.calls.append(("transcribe", self.whisper_model_size, decode_options))
+        return {"text": " whisper", "segments": [{"start": 0.0, "end": 1.0, "text": " whisper"}], "language": "en"}
+
+    def rerun_low_confidence(self, result, model_size, decode_options=None):
+        self.calls.append(("rerun", model_size, result["audio_file"]))
+        return {"model": model_size, "segments": 0}
+
+    def summarize_transcript(self, transcript):
+        self.calls.append(("summary", transcript))
+        return {"summary": "short", "model": "fake"}
+
+
+def entries(*video_ids):
+    return [{"video_id": video_id, "url": f"https://www.youtube.com/watch?v={video_id}", "title": None,
+             "duration": 60} for video_id in video_ids]
+
+
+@pytest.fixture
+def transcriber(tmp_path, monkeypatch):
+    monkeypatch.setenv("TRANSCRIPT_DB_PATH", str(tmp_path / "transcripts.db"))
+    get_transcript_store.cache_clear()
+    monkeypatch.setattr(youtube_transcriber, "YouTubeTranscriber", FakeTranscriber)
+    monkeypatch.setattr(FakeTranscriber, "calls", [])
+    monkeypatch.setattr(FakeTranscriber, "captions", set())
+    transcriber = BatchTranscriber(BatchStore(str(tmp_path / "batch.db")))
+    # Jobs are run by the tests, not a background thread
+    monkeypatch.setattr(transcriber, "_ensure_runner", lambda: None)
+    yield transcriber
+    get_transcript_store.cache_clear()
+
+
+def expanded(monkeypatch, *video_ids):
+    requests = []
+
+    def expand_url(url, single_video=False):
+        requests.append((url, single_video))
+        return entries(*video_ids)
+
+    monkeypatch.setattr(batch_transcriber, "expand_url", expand_url)
+    return requests
+
+
+def test_jobs_keep_their_options(transcriber, monkeypatch):
+    requests = expanded(monkeypatch, "a")
+
+    job = transcriber.submit("https://www.youtube.com/watch?v=a&list=L",
+                             options={"preset": "fast", "rerun_model": None}, single_video=True)
+
+    assert requests == [("https://www.youtube.com/watch?v=a&list=L", True)]
+    assert transcriber.store.get_job(job["job_id"])["options"] == {"preset": "fast"}
+
+
+@pytest.mark.parametrize("options", [
+    {"preset": "fastest"},
+    {"decode_options": {"temperature": None}},
+    {"pipelined": True},
+])
+def test_invalid_options_are_rejected_before_expanding(transcriber, monkeypatch, options):
+    requests = expanded(monkeypatch, "a")
+
+    with pytest.raises(ValueError):
+        transcriber.submit("https://www.youtube.com/watch?v=a", options=options)
+    assert requests == []
+
+
+def test_items_are_transcribed_with_the_job_options(transcriber, monkeypatch):
+    expanded(monkeypatch, "a")
+    job = transcriber.submit("https://www.youtube.com/watch?v=a", whisper_model_size="tiny",
+                             options={"preset": "fast", "decode_options": {"beam_size": 2}, "rerun_model": "small",
+                                      "generate_summary": True})
+
+    transcriber._run_job(job["job_id"])
+
+    (item,) = transcriber.store.get_items(job["job_id"])
+    assert item["status"] == DONE
+    transcribe = next(call for call in FakeTranscriber.calls if call[0] == "transcribe")
+    assert transcribe[2]["beam_size"] == 2 and transcribe[2]["condition_on_previous_text"] is False
+    assert ("rerun", "small", "/tmp/a.mp3") in FakeTranscriber.calls
+    assert item["details"] == {"transcript_source": "whisper", "rerun": {"model": "small", "segments": 0},
+                               "summary": {"summary": "short", "model": "fake"}}
+
+
+def test_items_with_captions_skip_the_download(transcriber, monkeypatch):
+    expanded(monkeypatch, "a", "b")
+    FakeTranscriber.captions = {"a"}
+    job = transcriber.submit("https://www.youtube.com/playlist?list=L",
+                             options={"use_captions": True, "allow_auto_captions": True})
+
+    transcriber._run_job(job["job_id"])
+
+    items = transcriber.store.get_items(job["job_id"])
+    assert [item["status"] for item in items] == [DONE, DONE]
+    assert [item["details"]["transcript_source"] for item in items] == ["manual_captions", "whisper"]
+    assert ("download", "a") not in FakeTranscriber.calls
+    assert ("captions", "b", True) in FakeTranscriber.calls
+    assert get_transcript_store().get_video("a")["whisper_model"] == "manual_captions"
@@ -0,0 +1,64 @@
+from ml.services.captions import select_track, original_language
+
+
+def tracks(*langs):
+    return {lang: [{"ext": "vtt", "url": f"https://example.com/{lang}.vtt"}] for lang in langs}
+
+
+def test_manual_track_in_the_original_language_is_preferred():
+    info = {"language": "de", "subtitles": tracks("en", "fr", "de")}
+
+    assert select_track(info)[:2] == ("manual_captions", "de")
+
+
+def test_requested_language_beats_the_original_language():
+    info = {"language": "de", "subtitles": tracks("en", "de")}
+
+    assert select_track(info, "english")[:2] == ("manual_captions", "en")
+
+
+def test_manual_tracks_are_preferred_over_auto_captions():
+    info = {"language": "en", "subtitles": tracks("en"), "automatic_captions": tracks("en-orig", "en")}
+
+    assert select_track(info, allow_auto=True)[:2] == ("manual_captions", "en")
+
+
+def test_auto_captions_prefer_the_speech_recognition_track():
+    info = {"language": "en", "automatic_captions": tracks("de", "en", "en-orig")}
+
+    assert select_track(info, allow_auto=True)[:2] == ("auto_captions", "en-orig")
+
+
+def test_auto_captions_in_other_languages_are_translations():
+    info = {"language": "en", "automatic_captions": tracks("de", "en-orig")}
+
+    assert select_track(info, "german", allow_auto=True) is None
+
+
+def test_auto_captions_are_not_used_when_the_original_language_is_unknown():
+    info = {"language": None, "automatic_captions": tracks("de", "fr")}
+
+    assert original_language(info) is None
+    assert select_track(info, allow_auto=True) is None
+    assert select_track(info, "german", allow_auto=True) is None
+
+
+def test_original_language_falls_back_to_the_orig_track():
+    info = {"language": None, "automatic_captions": tracks("de", "ja-orig", "ja")}
+
+    assert original_language(info) == "ja"
+    assert select_track(info, allow_auto=True)[:2] == ("auto_captions", "ja-orig")
+
+
+def test_auto_captions_require_allow_auto():
+    info = {"language": "en", "automatic_captions": tracks("en-orig")}
+
+    assert select_track(info) is None
+
+
+def test_formats_without_a_url_are_skipped():
+    info = {"language": "en", "subtitles": {
+        "en": [{"ext": "json3"}, {"ext": "vtt", "url": "https://example.com/en.vtt"}],
+    }}
+
+    assert select_track(info)[2]["ext"] == "vtt"
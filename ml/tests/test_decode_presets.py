@@ -0,0 +1,45 @@
+import pytest
+
+from ml.services.decode_presets import resolve_decode_options, PRESETS, TEMPERATURES
+
+
+def test_overrides_replace_the_preset_options():
+    options = resolve_decode_options("fast", {"beam_size": 3, "temperature": [0, 0.5], "word_timestamps": True})
+
+    assert options["beam_size"] == 3
+    assert options["temperature"] == (0.0, 0.5)
+    assert options["word_timestamps"] is True
+    assert options["condition_on_previous_text"] == PRESETS["fast"]["condition_on_previous_text"]
+
+
+def test_single_temperature_becomes_a_chain():
+    assert resolve_decode_options("accurate")["temperature"] == TEMPERATURES
+    assert resolve_decode_options("accurate", {"temperature": 0.2})["temperature"] == (0.2,)
+
+
+def test_thresholds_and_beam_size_may_be_null():
+    options = resolve_decode_options("accurate", {"compression_ratio_threshold": None, "beam_size": None,
+                                                  "best_of": None})
+
+    assert options["compression_ratio_threshold"] is None
+    assert options["beam_size"] is None
+
+
+@pytest.mark.parametrize("overrides", [
+    {"temperature": None},
+    {"temperature": []},
+    {"condition_on_previous_text": None},
+    {"word_timestamps": None},
+    {"word_timestamps": "yes"},
+    {"beam_size": 0},
+    {"patience": 1.0},
+    {"unknown": 1},
+])
+def test_invalid_overrides_are_rejected(overrides):
+    with pytest.raises(ValueError):
+        resolve_decode_options("fast", overrides)
+
+
+def test_unknown_preset_is_rejected():
+    with pytest.raises(ValueError):
+        resolve_decode_options("fastest")
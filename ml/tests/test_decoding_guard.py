@@ -0,0 +1,256 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from ml.services import decoding_guard
+from ml.services.decoding_guard import (DecodingGuard, RepetitionStop, compression_ratio, guard_for,
+                                        ngram_repeat_share, transcribe_audio, transcribe_windows,
+                                        COMPRESSION, MIN_CHECK_TOKENS, CHECK_EVERY_TOKENS, REPEATED_WINDOW,
+                                        SAMPLE_RATE, HOP_LENGTH)
+
+TEMPERATURES = (0.0, 0.2, 0.4, 0.6)
+LOOP = " la la la la" * 30
+FRAMES_PER_SECOND = SAMPLE_RATE // HOP_LENGTH
+
+
+class FakeTokenizer:
+    """One token per word, then end-of-text, then 20 ms timestamp tokens."""
+
+    eot = 10000
+    timestamp_begin = 10001
+
+    def __init__(self):
+        self.words = []
+
+    def encode(self, text):
+        tokens = []
+        for word in text.split():
+            if word not in self.words:
+                self.words.append(word)
+            tokens.append(self.words.index(word))
+        return tokens
+
+    def decode(self, tokens):
+        return "".join(f" {self.words[token]}" for token in tokens if token < self.eot)
+
+    def timestamp(self, seconds):
+        return self.timestamp_begin + round(seconds / 0.02)
+
+
+class FakeModel:
+    """Whisper stand-in whose samples hold the second they belong to.
+
+    A window starting at a second in ``loops`` repeats one phrase when decoded
+    below the temperature given for it. A window starting at a second in
+    ``unfinished`` ends with a segment cut off 20 seconds in.
+    """
+
+    device = "cpu"
+
+    def __init__(self, loops=None, unfinished=(), avg_logprob=lambda temperature: -0.2):
+        self.loops = loops or {}
+        self.unfinished = set(unfinished)
+        self.avg_logprob = avg_logprob
+        self.tokenizer = FakeTokenizer()
+        self.calls = []
+
+    def decode(self, audio, options, stop=None):
+        first = int(audio[0])
+        temperature = options["temperature"]
+        tokenizer = self.tokenizer
+        if first in self.loops and temperature < self.loops[first]:
+            text = LOOP
+        else:
+            text = f" second {first}"
+        tokens = [tokenizer.timestamp(0.0)] + tokenizer.encode(text)
+        if first in self.unfinished:
+            tokens += [tokenizer.timestamp(20.0), tokenizer.timestamp(20.0)] + tokenizer.encode(" cut off")
+        else:
+            tokens.append(tokenizer.timestamp(len(audio) / SAMPLE_RATE))
+
+        # Generate token by token, as DecodingTask does, with the guard's filter applied to each step
+        generated = []
+        repetition_stop = RepetitionStop(stop, tokenizer, 0) if stop else None
+        for token in tokens:
+            if repetition_stop:
+                logits = np.zeros((1, tokenizer.timestamp_begin + 1501))
+                repetition_stop.apply(logits, np.array([generated]))
+                if logits[0].argmax() == tokenizer.eot and logits[0, 0] == -np.inf:
+                    break
+            generated.append(token)
+
+        self.calls.append((first, temperature, tokenizer.decode(options.get("prompt") or []) or None,
+                           len(generated)))
+        text = tokenizer.decode(generated)
+        return SimpleNamespace(tokens=generated, text=text, temperature=temperature,
+                               avg_logprob=self.avg_logprob(temperature),
+                               compression_ratio=compression_ratio(text), no_speech_prob=0.1, language="en")
+
+    def transcribe(self, audio, temperature=0.0, **options):
+        self.calls.append((int(audio[0]), temperature, options.get("initial_prompt"), None))
+        return {"text": f" second {int(audio[0])}", "segments": [], "language": "en"}
+
+
+@pytest.fixture(autouse=True)
+def fake_whisper(monkeypatch):
+    monkeypatch.setattr(decoding_guard, "window_mel", lambda model, audio: audio)
+    monkeypatch.setattr(decoding_guard, "window_tokenizer", lambda model, language: model.tokenizer)
+    monkeypatch.setattr(decoding_guard, "decode_mel", lambda model, mel, options, stop=None: [
+        model.decode(window, options, stop) for window in mel])
+
+
+def recording(seconds):
+    return np.repeat(np.arange(seconds, dtype=np.float32), SAMPLE_RATE)
+
+
+def guard(**kwargs):
+    return DecodingGuard("tiny", **kwargs)
+
+
+def test_looping_text_is_flagged():
+    assert ngram_repeat_share(LOOP) > 0.9
+    assert ngram_repeat_share("the quick brown fox jumps over the lazy dog and runs far away") == 0.0
+    assert guard().check(LOOP, compression_ratio(LOOP)) is not None
+    assert guard().check(" a line of speech", 1.0) is None
+
+
+@pytest.mark.parametrize("text", [
+    " hallelujah hallelujah hallelujah hallelujah hallelujah",
+    " row row row your boat gently down the stream merrily merrily merrily merrily life is but a dream" * 2,
+])
+def test_repetitive_speech_is_left_to_whispers_fallback(text):
+    # Whisper retries these at a higher temperature, but they are not runaway loops
+    assert compression_ratio(text) > 2.4
+    assert guard().check(text, compression_ratio(text)) is None
+
+
+def test_window_repeating_the_previous_one_is_flagged():
+    text = " the same sentence once more"
+
+    assert guard().check(text, 1.0, previous_text=text) == REPEATED_WINDOW
+
+
+def test_guard_is_off_unless_enabled(monkeypatch):
+    monkeypatch.delenv("TRANSCRIBE_GUARD_ENABLED", raising=False)
+    assert guard_for("tiny") is None
+
+    monkeypatch.setenv("TRANSCRIBE_GUARD_ENABLED", "true")
+    assert isinstance(guard_for("tiny"), DecodingGuard)
+
+
+def test_windows_are_offset_and_prompted_by_the_text_so_far():
+    model = FakeModel()
+
+    result = transcribe_audio(model, recording(75), guard=guard(), temperature=TEMPERATURES)
+
+    assert [segment["start"] for segment in result["segments"]] == [0.0, 30.0, 60.0]
+    assert [segment["end"] for segment in result["segments"]] == [30.0, 60.0, 75.0]
+    assert [segment["seek"] for segment in result["segments"]] == [0, 30 * FRAMES_PER_SECOND,
+                                                                   60 * FRAMES_PER_SECOND]
+    assert [segment["id"] for segment in result["segments"]] == [0, 1, 2]
+    assert [call[2] for call in model.calls] == [None, " second 0", " second 0 second 30"]
+    assert result["text"] == " second 0 second 30 second 60"
+    assert result["guard"]["windows_skipped"] == 0
+
+
+def test_segment_cut_off_by_the_window_edge_starts_the_next_window():
+    model = FakeModel(unfinished={0})
+
+    result = transcribe_windows(model, lambda seek, samples: (recording(60)[seek:seek + samples],
+                                                              seek + samples >= 60 * SAMPLE_RATE))
+
+    # Each stretch of audio is decoded once, apart from the cut-off segment
+    assert [call[0] for call in model.calls] == [0, 20, 50]
+    assert [(segment["start"], segment["end"]) for segment in result["segments"]] == [
+        (0.0, 20.0), (20.0, 50.0), (50.0, 60.0)]
+    assert result["text"] == " second 0 second 20 second 50"
+
+
+def test_looping_window_is_cut_short_and_recovered_at_a_higher_temperature():
+    model = FakeModel(loops={30: 0.2})
+
+    result = transcribe_audio(model, recording(75), guard=guard(), temperature=TEMPERATURES)
+
+    attempts = [call for call in model.calls if call[0] == 30]
+    assert [call[1] for call in attempts] == [0.0, 0.2]
+    # The looping attempt was stopped as soon as it was checked, not decoded to the end of the window
+    assert attempts[0][3] == MIN_CHECK_TOKENS
+    assert result["segments"][1]["text"] == " second 30"
+    assert result["guard"]["windows_recovered"] == 1
+    assert result["guard"]["windows_skipped"] == 0
+
+
+def test_window_still_looping_after_the_retries_is_skipped_as_a_gap():
+    model = FakeModel(loops={30: 1.0})
+
+    result = transcribe_audio(model, recording(75), guard=guard(max_retries=1), temperature=TEMPERATURES)
+
+    # One retry, then the rest of the fallback chain is not tried
+    assert [call[1] for call in model.calls if call[0] == 30] == [0.0, 0.2]
+    gap = result["segments"][1]
+    assert gap["gap"] and gap["reason"] == COMPRESSION
+    assert (gap["start"], gap["end"]) == (30.0, 60.0)
+    assert gap["seek"] == 30 * FRAMES_PER_SECOND
+    assert gap["text"] == "" and gap["tokens"] == []
+    assert gap["temperature"] == 0.2
+    assert gap["compression_ratio"] > 3.0
+    assert {"id", "avg_logprob", "no_speech_prob"} <= set(gap)
+    assert [segment["id"] for segment in result["segments"]] == [0, 1, 2]
+    assert result["text"] == " second 0 second 60"
+    # The loop is not handed on to the next window as a prompt
+    assert model.calls[-1][:3] == (60, 0.0, None)
+    assert result["guard"]["windows_skipped"] == 1
+
+
+def test_window_is_skipped_on_the_last_temperature():
+    model = FakeModel(loops={0: 1.0})
+
+    result = transcribe_audio(model, recording(20), guard=guard(), temperature=(0.0,))
+
+    assert len(model.calls) == 1
+    assert result["segments"][0]["gap"]
+
+
+def test_streamed_windows_report_their_progress():
+    audio = recording(45)
+    progress = []
+
+    def read(seek, samples):
+        return audio[seek:seek + samples], seek + samples >= len(audio)
+
+    result = transcribe_windows(FakeModel(), read, "en", on_window=lambda seek, busy: progress.append(seek))
+
+    assert progress == [30 * SAMPLE_RATE, 45 * SAMPLE_RATE]
+    assert result["text"] == " second 0 second 30"
+    assert "guard" not in result
+
+
+def test_without_a_guard_whisper_transcribes_the_whole_recording():
+    model = FakeModel()
+
+    result = transcribe_audio(model, recording(75), temperature=TEMPERATURES)
+
+    assert model.calls == [(0, TEMPERATURES, None, None)]
+    assert "guard" not in result
+
+
+@pytest.mark.parametrize("thresholds", [{}, {"compression_ratio_threshold": None}])
+def test_unlikely_but_not_looping_output_falls_back(thresholds):
+    model = FakeModel(avg_logprob=lambda temperature: -2.0 if temperature < 0.4 else -0.5)
+
+    transcribe_audio(model, recording(10), guard=guard(), temperature=TEMPERATURES, **thresholds)
+
+    assert [call[1] for call in model.calls] == [0.0, 0.2, 0.4]
+
+
+def test_stop_only_checks_every_few_tokens():
+    tokenizer = FakeTokenizer()
+    checked = []
+    stop = RepetitionStop(lambda text: checked.append(text), tokenizer, 2)
+    tokens = [tokenizer.eot + 1] * 2 + tokenizer.encode(LOOP)
+
+    for length in range(2, len(tokens)):
+        stop.apply(np.zeros((1, tokenizer.timestamp_begin)), np.array([tokens[:length]]))
+
+    assert [len(text.split()) for text in checked][:2] == [MIN_CHECK_TOKENS, MIN_CHECK_TOKENS + CHECK_EVERY_TOKENS]
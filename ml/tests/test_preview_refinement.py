@@ -0,0 +1,195 @@
+import os
+
+import numpy as np
+import pytest
+
+from ml.services import preview_refinement
+from ml.services.audio_cache import get_audio_cache
+from ml.services.decode_presets import resolve_decode_options
+from ml.services.preview_refinement import (PreviewRefiner, RefinementStore, check_callback_url,
+                                            needs_sequential_decode, mel_name, DONE, FAILED)
+
+
+class FakeMel:
+    """A spectrogram as log_mel returns it, a tensor with a ``cpu()`` copy."""
+
+    def __init__(self, array):
+        self.array = array
+        self.shape = array.shape
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+
+class FakeBatcher:
+    def __init__(self, calls, model_size):
+        self.calls, self.model_size = calls, model_size
+        self.n_mels = 128 if model_size == "large-v3" else 80
+
+    def log_mel(self, audio_file):
+        self.calls.append(("log_mel", self.model_size))
+        return FakeMel(np.full((self.n_mels, 10), len(self.calls), dtype=np.float32))
+
+    def transcribe_mel(self, mel, language=None, **options):
+        self.calls.append(("batched", self.model_size, options, float(np.asarray(mel.numpy())[0, 0])))
+        return {"text": " hello", "segments": [{"start": 0.0, "end": 1.0, "text": " hello"}], "language": "en"}
+
+
+@pytest.fixture
+def calls(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setenv("TRANSCRIPT_DB_PATH", str(tmp_path / "transcripts.db"))
+    preview_refinement.get_transcript_store.cache_clear()
+    monkeypatch.setattr(preview_refinement, "get_inference_batcher",
+                        lambda model_size, device: FakeBatcher(calls, model_size))
+
+    def transcribe_sequential(audio_file, model_size, device, language, options):
+        calls.append(("sequential", model_size, options))
+        return {"text": " hello", "segments": [], "language": language}
+
+    monkeypatch.setattr(preview_refinement, "transcribe_sequential", transcribe_sequential)
+    monkeypatch.setattr(preview_refinement, "load_mel", lambda path: FakeMel(np.load(path)))
+    yield calls
+    preview_refinement.get_transcript_store.cache_clear()
+
+
+@pytest.fixture
+def refiner(tmp_path, monkeypatch):
+    refiner = PreviewRefiner(RefinementStore(str(tmp_path / "refinements.db")), preview_model="tiny")
+    # Jobs are run by the tests, not a background thread
+    monkeypatch.setattr(refiner, "_ensure_runner", lambda: None)
+    return refiner
+
+
+@pytest.fixture
+def audio_file(tmp_path):
+    cache = get_audio_cache(str(tmp_path / "audio"))
+    path = cache.path_for("vid.mp3")
+    with open(path, "wb") as f:
+        f.write(b"\0" * 100)
+    cache.add("vid.mp3")
+    yield path
+    cache.stop()
+
+
+def test_audio_stays_pinned_until_the_refinement_has_run(refiner, calls, audio_file, tmp_path):
+    cache = get_audio_cache(str(tmp_path / "audio"))
+    result = refiner.preview("https://youtu.be/vid", "vid", audio_file, "small", "cpu", None,
+                             resolve_decode_options("fast"))
+    job_id = result["refinement"]["job_id"]
+
+    # The audio and the preview's spectrogram
+    assert cache.stats()["pinned"] == 2
+    assert refiner._jobs.get_nowait() == job_id
+
+    refiner._run_job(job_id)
+
+    assert cache.stats()["pinned"] == 0
+    assert cache.stats()["entries"] == 1
+    assert not os.path.exists(cache.path_for(mel_name(job_id)))
+    assert refiner.store.get_job(job_id)["status"] == DONE
+
+
+def test_failed_refinement_releases_its_audio(refiner, calls, audio_file, tmp_path, monkeypatch):
+    cache = get_audio_cache(str(tmp_path / "audio"))
+    job_id = refiner.preview("https://youtu.be/vid", "vid", audio_file, "small", "cpu", None,
+                             resolve_decode_options("fast"))["refinement"]["job_id"]
+
+    def fail(job_id):
+        raise RuntimeError("model failed to load")
+
+    monkeypatch.setattr(refiner, "_refine", fail)
+    refiner._run_job(job_id)
+
+    assert cache.stats()["pinned"] == 0
+    assert refiner.store.get_job(job_id)["status"] == FAILED
+
+
+@pytest.mark.parametrize("preset, path", [("fast", "batched"), ("balanced", "sequential"), ("accurate", "sequential")])
+def test_refinement_applies_the_requested_decode_options(refiner, calls, audio_file, preset, path):
+    options = resolve_decode_options(preset)
+    job_id = refiner.preview("https://youtu.be/vid", "vid", audio_file, "small", "cpu", "en",
+                             options)["refinement"]["job_id"]
+    refiner._run_job(job_id)
+
+    # The preview is always batched; the refinement only when the options allow it
+    calls = [call for call in calls if call[0] != "log_mel"]
+    assert calls[0][:2] == ("batched", "tiny")
+    assert calls[1][:2] == (path, "small")
+    if path == "sequential":
+        assert calls[1][2]["condition_on_previous_text"] == options["condition_on_previous_text"]
+        assert calls[1][2]["word_timestamps"] == options["word_timestamps"]
+
+
+def test_batched_refinement_reuses_the_preview_spectrogram(refiner, calls, audio_file):
+    job_id = refiner.preview("https://youtu.be/vid", "vid", audio_file, "small", "cpu", "en",
+                             resolve_decode_options("fast"))["refinement"]["job_id"]
+    refiner._run_job(job_id)
+
+    assert [call[0] for call in calls] == ["log_mel", "batched", "batched"]
+    # Both passes decoded the spectrogram computed for the preview
+    assert calls[1][3] == calls[2][3] == 1.0
+
+
+def test_spectrogram_is_recomputed_for_a_model_with_other_mel_bins(refiner, calls, audio_file):
+    job_id = refiner.preview("https://youtu.be/vid", "vid", audio_file, "large-v3", "cpu", "en",
+                             resolve_decode_options("fast"))["refinement"]["job_id"]
+    refiner._run_job(job_id)
+
+    assert [call[:2] for call in calls] == [("log_mel", "tiny"), ("batched", "tiny"),
+                                            ("log_mel", "large-v3"), ("batched", "large-v3")]
+
+
+def test_sequential_refinement_keeps_no_spectrogram(refiner, calls, audio_file, tmp_path):
+    cache = get_audio_cache(str(tmp_path / "audio"))
+    job_id = refiner.preview("https://youtu.be/vid", "vid", audio_file, "small", "cpu", "en",
+                             resolve_decode_options("balanced"))["refinement"]["job_id"]
+
+    assert not os.path.exists(cache.path_for(mel_name(job_id)))
+    assert cache.stats()["pinned"] == 1
+
+
+def test_sequential_decode_is_needed_for_conditioning_or_word_timestamps():
+    assert not needs_sequential_decode(resolve_decode_options("fast"))
+    assert needs_sequential_decode(resolve_decode_options("fast", {"word_timestamps": True}))
+    assert needs_sequential_decode(resolve_decode_options("fast", {"condition_on_previous_text": True}))
+
+
+def test_callbacks_are_disabled_without_allowed_hosts(monkeypatch):
+    monkeypatch.delenv("REFINEMENT_CALLBACK_HOSTS", raising=False)
+
+    with pytest.raises(ValueError):
+        check_callback_url("https://hooks.example.com/refined")
+
+
+@pytest.mark.parametrize("url", [
+    "http://169.254.169.254/latest/meta-data",
+    "http://localhost:5000/youtube/batch",
+    "https://hooks.example.com.attacker.net/refined",
+    "file:///etc/passwd",
+    "hooks.example.com/refined",
+])
+def test_callbacks_to_other_hosts_are_rejected(monkeypatch, url):
+    monkeypatch.setenv("REFINEMENT_CALLBACK_HOSTS", "hooks.example.com")
+
+    with pytest.raises(ValueError):
+        check_callback_url(url)
+
+
+def test_callbacks_to_allowed_hosts_are_accepted(monkeypatch):
+    monkeypatch.setenv("REFINEMENT_CALLBACK_HOSTS", "hooks.example.com, other.example.org")
+
+    check_callback_url("https://Hooks.Example.com:8443/refined?token=1")
+    check_callback_url("http://other.example.org/refined")
+
+
+def test_preview_rejects_a_disallowed_callback(refiner, calls, audio_file, monkeypatch):
+    monkeypatch.delenv("REFINEMENT_CALLBACK_HOSTS", raising=False)
+
+    with pytest.raises(ValueError):
+        refiner.preview("https://youtu.be/vid", "vid", audio_file, "small", "cpu", None,
+                        resolve_decode_options("fast"), callback_url="http://10.0.0.1/hook")
+    assert calls == []
@@ -0,0 +1,73 @@
+import pytest
+
+from ml.services.transcript_store import TranscriptStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TranscriptStore(str(tmp_path / "transcripts.db"))
+
+
+def segment(start, end, text):
+    return {"start": start, "end": end, "text": text}
+
+
+def page_through(store, video_id, limit):
+    """Collect every segment of a video by following next_cursor."""
+    seen, cursor = [], None
+    while True:
+        page = store.get_segments(video_id, after=cursor, limit=limit)
+        seen.extend(page["segments"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return seen
+
+
+def test_pagination_returns_segments_sharing_a_start_time(store):
+    store.save_transcript("vid", "https://youtu.be/vid", [
+        segment(0.0, 1.0, "first"),
+        segment(0.0, 1.5, "second"),
+        segment(2.0, 3.0, "third"),
+    ])
+
+    seen = page_through(store, "vid", limit=1)
+
+    assert [s["seq"] for s in seen] == [0, 1, 2]
+    assert [s["text"] for s in seen] == ["first", "second", "third"]
+
+
+def test_pagination_covers_every_segment_once(store):
+    segments = [segment(i // 3, i // 3 + 0.5, f"segment {i}") for i in range(10)]
+    store.save_transcript("vid", "https://youtu.be/vid", segments)
+
+    for limit in (1, 2, 3, 4, 10, 20):
+        assert [s["seq"] for s in page_through(store, "vid", limit)] == list(range(10))
+
+
+def test_last_page_has_no_cursor(store):
+    store.save_transcript("vid", "https://youtu.be/vid", [segment(0, 1, "a"), segment(1, 2, "b")])
+
+    page = store.get_segments("vid", limit=5)
+
+    assert len(page["segments"]) == 2
+    assert page["next_cursor"] is None
+
+
+def test_malformed_cursor_is_rejected(store):
+    store.save_transcript("vid", "https://youtu.be/vid", [segment(0, 1, "a")])
+
+    with pytest.raises(ValueError):
+        store.get_segments("vid", after="1500")
+
+
+def test_search_pages_by_rowid(store):
+    store.save_transcript("vid", "https://youtu.be/vid", [
+        segment(i, i + 1, f"hello world {i}") for i in range(5)
+    ])
+
+    first = store.search("hello world", limit=3)
+    second = store.search("hello world", limit=3, after=first["next_cursor"])
+
+    assert len(first["hits"]) == 3
+    assert len(second["hits"]) == 2
+    assert second["next_cursor"] is None
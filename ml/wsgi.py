@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+WSGI entry point for the ML service
+
+ml/app.py is shadowed by the ml/app package, so it is loaded by path. Serve it
+with the production settings in ml/gunicorn.conf.py:
+
+    gunicorn --config ml/gunicorn.conf.py ml.wsgi:app
+"""
+
+import os
+import importlib.util
+
+_spec = importlib.util.spec_from_file_location("ml_service", os.path.join(os.path.dirname(__file__), "app.py"))
+_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_module)
+
+app = _module.app